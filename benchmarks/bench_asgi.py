@@ -0,0 +1,272 @@
+"""
+ASGI / WSGI 读路径压测：500 个并发客户端反复请求角色详情页（/read/read_single_character/<id>），
+比较同步视图（WSGI，线程池）与 async 视图（ASGI，单事件循环 + 数据库线程池）的吞吐（请求/秒）和延迟（p50 / p99）。
+
+默认在进程内直接调用 WSGI / ASGI application（不经网络），在临时目录的 SQLite 库上运行（sqlite-replica 配置）：
+- 每条 SQL 额外 sleep --db-latency 毫秒，模拟访问远端 MySQL 的往返；
+- WSGI 用 --wsgi-threads 个线程处理请求（相当于 gunicorn --threads），客户端排队时间计入延迟；
+- 默认关闭 Query 结果缓存（--cache 打开），测的是真正访问数据库的路径；
+- 每种方式在单独的子进程中运行（JTW_SERVER 决定 read/ 使用哪套视图）。
+
+也可以压测已经启动的服务（--url），例如分别启动
+    gunicorn jtw_info_management.wsgi --threads 32
+    uvicorn jtw_info_management.asgi:application
+后执行：
+    python benchmarks/bench_asgi.py --url http://127.0.0.1:8000 --max-id 200
+用法：
+    python benchmarks/bench_asgi.py
+    python benchmarks/bench_asgi.py --clients 500 --seconds 10 --db-latency 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+PATH = '/read/read_single_character/{}'
+HOST = 'localhost'
+
+
+# ----------------------------------------------------------------------
+# 数据准备（父进程）
+# ----------------------------------------------------------------------
+def setup_django(work_dir: str, server: str):
+    os.environ['JTW_DB_PROFILE'] = 'sqlite-replica'
+    os.environ['JTW_SQLITE_DIR'] = work_dir
+    os.environ['JTW_SERVER'] = server
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jtw_info_management.settings')
+    import django
+    django.setup()
+
+
+def seed(work_dir: str, characters: int):
+    setup_django(work_dir, 'wsgi')
+    from django.core.management import call_command
+    from create.models import Character, Character_Relationship, Relationship_Type, Weapon
+
+    call_command('migrate', verbosity=0)
+    rng = random.Random(0)
+    Character.objects.bulk_create(
+        [Character(name=f'角色{i}', race='仙', ability='神通' * 5, intro='简介' * 50, organization='无组织')
+         for i in range(1, characters + 1)], batch_size=2000)
+    types = Relationship_Type.objects.bulk_create([Relationship_Type(type=name) for name in ('师徒', '朋友', '敌对')])
+    ids = list(Character.objects.values_list('id', flat=True))
+    pairs = {tuple(sorted(rng.sample(ids, 2))) for _ in range(characters * 3)}
+    Character_Relationship.objects.bulk_create(
+        [Character_Relationship(from_character_id=a, to_character_id=b, relationship_type=rng.choice(types),
+                                pair_low=a, pair_high=b) for a, b in pairs], batch_size=2000)
+    Weapon.objects.bulk_create(
+        [Weapon(name=f'兵器{i}', description='', owner_character_id=rng.choice(ids)) for i in range(characters // 4)],
+        batch_size=2000)
+    call_command('sync_replica', stdout=open(os.devnull, 'w'))
+    return max(ids)
+
+
+# ----------------------------------------------------------------------
+# 子进程：进程内调用 application
+# ----------------------------------------------------------------------
+def _install_latency(seconds: float):
+    from django.db.backends.signals import connection_created
+
+    def slow(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def on_created(sender, connection, **kwargs):
+        connection.execute_wrappers.append(slow)
+
+    connection_created.connect(on_created, weak=False)
+
+
+def _disable_query_cache():
+    from create.tools import Query
+    Query.cache._lookup = lambda key, depends: ((), False, None)
+    Query.cache._store = lambda key, versions, value: None
+
+
+async def _drive(call, clients: int, seconds: float, max_id: int):
+    """clients 个客户端各自循环请求，直到 seconds 秒后不再发出新请求；返回 (延迟列表, 出错数, 实际耗时)。"""
+    latencies, errors = [], 0
+    start_time = time.perf_counter()
+    deadline = start_time + seconds
+
+    async def client(seed_value):
+        nonlocal errors
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await call(PATH.format(rng.randint(1, max_id)))
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - start_time
+
+
+def run_wsgi(args):
+    from django.core.wsgi import get_wsgi_application
+    from wsgiref.util import setup_testing_defaults
+
+    application = get_wsgi_application()
+    pool = ThreadPoolExecutor(max_workers=args.wsgi_threads)
+
+    def request(path):
+        environ = {'PATH_INFO': path, 'HTTP_HOST': HOST, 'REQUEST_METHOD': 'GET'}
+        setup_testing_defaults(environ)
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = int(status.split()[0])
+
+        body = application(environ, start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        return result['status']
+
+    async def call(path):
+        return await asyncio.get_running_loop().run_in_executor(pool, request, path)
+
+    return asyncio.run(_drive(call, args.clients, args.seconds, args.max_id))
+
+
+def run_asgi(args):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    async def call(path):
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+                 'headers': [(b'host', HOST.encode())], 'client': ('127.0.0.1', 0), 'server': (HOST, 80)}
+        disconnected = asyncio.Event()
+        sent = {'request': False}
+        status = {}
+
+        async def receive():
+            if not sent['request']:
+                sent['request'] = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+
+        await application(scope, receive, send)
+        disconnected.set()
+        return status['code']
+
+    return asyncio.run(_drive(call, args.clients, args.seconds, args.max_id))
+
+
+def child(args):
+    setup_django(args.work_dir, args.child)
+    from django.conf import settings
+    # 关闭 DEBUG：不记录每条 SQL（connection.queries），更接近生产
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [HOST]
+    _install_latency(args.db_latency / 1000)
+    if not args.cache:
+        _disable_query_cache()
+    # 等过复制延迟窗口，让读查询路由到副本（与生产配置一致）；变更戳首次读取时以当前时间初始化
+    from create.stamps import get_stamps
+    get_stamps('character', 'character_relationship', 'relationship_type', 'weapon')
+    time.sleep(getattr(settings, 'REPLICA_LAG_SECONDS', 2.0))
+    latencies, errors, elapsed = (run_asgi if args.child == 'asgi' else run_wsgi)(args)
+    print(json.dumps({'latencies': latencies, 'errors': errors, 'elapsed': elapsed}))
+
+
+# ----------------------------------------------------------------------
+# --url：经网络压测已经启动的服务（HTTP/1.1 keep-alive）
+# ----------------------------------------------------------------------
+def run_http(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    pool = asyncio.Queue()
+
+    async def call(path):
+        reader, writer = await pool.get() if not pool.empty() else await asyncio.open_connection(host, port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n\r\n'.encode())
+        status_line = await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        await reader.readexactly(length)
+        pool.put_nowait((reader, writer))
+        return int(status_line.split()[1])
+
+    return asyncio.run(_drive(call, args.clients, args.seconds, args.max_id))
+
+
+def summarize(label, latencies, errors, seconds):
+    latencies.sort()
+    count = len(latencies)
+    p50 = latencies[count // 2] * 1000 if count else 0
+    p99 = latencies[min(int(count * 0.99), count - 1)] * 1000 if count else 0
+    print(f"{label:>6} {count:>8} {count / seconds:>10.0f} {p50:>9.1f} {p99:>9.1f} {errors:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ASGI / WSGI 读路径压测')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--characters', type=int, default=2000)
+    parser.add_argument('--db-latency', type=float, default=5, help='每条 SQL 额外的延迟（毫秒）')
+    parser.add_argument('--wsgi-threads', type=int, default=32)
+    parser.add_argument('--cache', action='store_true', help='打开 Query 结果缓存')
+    parser.add_argument('--url', help='压测已启动的服务，如 http://127.0.0.1:8000')
+    parser.add_argument('--max-id', type=int, default=None, help='--url 时请求的最大角色 id')
+    parser.add_argument('--child', choices=('wsgi', 'asgi'), help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    header = f"{'方式':>6} {'请求数':>8} {'请求/秒':>10} {'p50(ms)':>9} {'p99(ms)':>9} {'出错':>6}"
+    if args.url:
+        args.max_id = args.max_id or 100
+        print(header)
+        summarize('http', *run_http(args))
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='jtw_asgi_')
+    try:
+        max_id = seed(work_dir, args.characters)
+        print(f"{args.characters} 个角色，{args.clients} 个并发客户端，每条 SQL +{args.db_latency:g}ms，"
+              f"WSGI {args.wsgi_threads} 线程，结果缓存{'开' if args.cache else '关'}")
+        print(header)
+        for mode in ('wsgi', 'asgi'):
+            command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--work-dir', work_dir,
+                       '--clients', str(args.clients), '--seconds', str(args.seconds),
+                       '--db-latency', str(args.db_latency), '--wsgi-threads', str(args.wsgi_threads)]
+            command += ['--max-id', str(max_id)] + (['--cache'] if args.cache else [])
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            summarize(mode, result['latencies'], result['errors'], result['elapsed'])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
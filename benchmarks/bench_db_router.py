@@ -0,0 +1,120 @@
+"""
+读写分离基准：在临时目录里用 sqlite-replica 配置（主库 / 副本两个 SQLite 文件），
+若干读线程反复执行角色列表查询，同时一个写线程不停地在主库上提交更新，
+比较“全部读主库”与“读副本”两种路由下读查询的吞吐与延迟（p50 / p99）以及写入吞吐。
+
+写线程用 QuerySet.update()（不触发 signals、不刷新变更戳），否则路由器会因“表刚写过”把读查询送回主库。
+    python benchmarks/bench_db_router.py
+    python benchmarks/bench_db_router.py --characters 20000 --readers 4 --seconds 5
+"""
+import argparse
+import contextvars
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+WORK_DIR = tempfile.mkdtemp(prefix='jtw_router_')
+os.environ['JTW_DB_PROFILE'] = 'sqlite-replica'
+os.environ['JTW_SQLITE_DIR'] = WORK_DIR
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jtw_info_management.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections, router, transaction
+
+from create.models import Character
+from create.stamps import get_stamps
+from jtw_info_management.db_routers import replica_reads
+
+PAGE = 200
+
+
+def seed(count: int):
+    call_command('migrate', verbosity=0)
+    Character.objects.bulk_create(
+        [Character(name=f'角色{i}', race='仙', ability='', intro='简介' * 20, organization='无组织')
+         for i in range(count)], batch_size=2000)
+    call_command('sync_replica', stdout=open(os.devnull, 'w'))
+
+
+def reader(use_replica: bool, stop: threading.Event, latencies: list, count: int):
+    after = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        if use_replica:
+            with replica_reads():
+                rows = list(Character.objects.filter(id__gt=after).order_by('id').values('id', 'name', 'intro')[:PAGE])
+        else:
+            rows = list(Character.objects.filter(id__gt=after).order_by('id').values('id', 'name', 'intro')[:PAGE])
+        latencies.append(time.perf_counter() - start)
+        after = rows[-1]['id'] if len(rows) == PAGE else 0
+    connection.close()
+
+
+def writer(stop: threading.Event, done: list, count: int):
+    i = 0
+    while not stop.is_set():
+        with transaction.atomic():
+            Character.objects.filter(id__gt=(i * 50) % count, id__lte=(i * 50) % count + 50).update(ability=f'改{i}')
+        i += 1
+    done.append(i)
+    connection.close()
+
+
+def run(use_replica: bool, readers: int, seconds: float, count: int):
+    stop = threading.Event()
+    latencies = [[] for _ in range(readers)]
+    writes = []
+    threads = [threading.Thread(target=reader, args=(use_replica, stop, latencies[i], count)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer, args=(stop, writes, count)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    merged = sorted(value for part in latencies for value in part)
+    return {
+        'reads/s': len(merged) / seconds,
+        'p50(ms)': merged[len(merged) // 2] * 1000,
+        'p99(ms)': merged[int(len(merged) * 0.99)] * 1000,
+        'writes/s': writes[0] / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='主库 / 副本读写分离基准（SQLite）')
+    parser.add_argument('--characters', type=int, default=20000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    # 在单独的上下文里灌数据：本上下文写过库后，路由器会把它之后的读查询都固定到主库
+    contextvars.copy_context().run(seed, args.characters)
+    # 变更戳初始化为“当前时间”，等过复制延迟窗口后读查询才会被路由到副本
+    get_stamps('character')
+    time.sleep(getattr(settings, 'REPLICA_LAG_SECONDS', 2.0))
+    with replica_reads():
+        print(f"工作目录 {WORK_DIR}，读查询路由到：{router.db_for_read(Character)}")
+
+    print(f"{'路由':>8} {'读/秒':>10} {'p50(ms)':>9} {'p99(ms)':>9} {'写/秒':>9}")
+    for label, use_replica in (('主库', False), ('副本', True)):
+        result = run(use_replica, args.readers, args.seconds, args.characters)
+        print(f"{label:>8} {result['reads/s']:>10.0f} {result['p50(ms)']:>9.2f} {result['p99(ms)']:>9.2f} "
+              f"{result['writes/s']:>9.0f}")
+    for alias in connections:
+        connections[alias].close()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
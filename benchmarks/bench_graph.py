@@ -0,0 +1,94 @@
+"""
+人物关系图基准：在合成的大图上测 create.graph.RelationGraph 的构建、最短路径、k 跳子图与 hub() 耗时。
+
+用法（无需数据库；合成边直接喂给 CSR 构建，不经过 Character_Relationship）：
+    python benchmarks/bench_graph.py
+    python benchmarks/bench_graph.py --edges 100000 1000000 --queries 500
+
+合成图为随机稀疏图（节点数 = 边数 / 2，平均度数约 4），另加少量高度数的“主角”节点，
+与人物关系图的形状相近；每条边随机取 20 种关系类型之一。
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jtw_info_management.settings')
+
+import django
+
+django.setup()
+
+from create import stamps
+from create.graph import RelationGraph
+
+RELATIONSHIP_TYPES = 20
+HUBS = 50
+
+
+def synthetic_rows(edges: int, seed: int = 0):
+    """(关系 id, from id, to id, 类型 id)；约 5% 的边连到 HUBS 个主角节点上。"""
+    rng = random.Random(seed)
+    nodes = max(edges // 2, HUBS + 2)
+    rows = []
+    for edge_id in range(1, edges + 1):
+        a = rng.randrange(1, HUBS + 1) if rng.random() < 0.05 else rng.randrange(1, nodes + 1)
+        b = rng.randrange(1, nodes + 1)
+        while b == a:
+            b = rng.randrange(1, nodes + 1)
+        rows.append((edge_id, a, b, rng.randrange(1, RELATIONSHIP_TYPES + 1)))
+    return nodes, rows
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人物关系图（CSR + 双向 BFS）耗时基准')
+    parser.add_argument('--edges', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200, help='每种查询的次数')
+    args = parser.parse_args()
+
+    print(f"{'边数':>8} {'构建(s)':>8} {'路径中位(ms)':>12} {'路径p95(ms)':>11} {'平均跳数':>8} "
+          f"{'子图中位(ms)':>12} {'hub首次(ms)':>11} {'hub缓存(ms)':>11}")
+    for edges in args.edges:
+        nodes, rows = synthetic_rows(edges)
+        graph = RelationGraph()
+        start = time.perf_counter()
+        graph._build(rows)
+        build = time.perf_counter() - start
+        # 标记为已载入：查询时变更戳不变，不会去数据库重载
+        graph._stamp = stamps.get_stamp('character_relationship')
+        del rows
+
+        rng = random.Random(1)
+        path_ms, hops = [], []
+        for _ in range(args.queries):
+            path, elapsed = timed(graph.shortest_path, rng.randrange(1, nodes + 1), rng.randrange(1, nodes + 1))
+            path_ms.append(elapsed)
+            if path:
+                hops.append(len(path))
+        ego_ms = [timed(graph.ego_network, rng.randrange(1, HUBS + 1), depth=2, max_nodes=200)[1]
+                  for _ in range(args.queries)]
+        _, hub_first = timed(graph.hub)
+        _, hub_cached = timed(graph.hub)
+
+        print(f"{edges:>10} {build:>10.2f} {statistics.median(path_ms):>14.2f} {percentile(path_ms, 0.95):>13.2f} "
+              f"{statistics.mean(hops) if hops else 0:>11.1f} {statistics.median(ego_ms):>14.2f} "
+              f"{hub_first:>13.2f} {hub_cached:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
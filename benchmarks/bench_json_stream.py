@@ -0,0 +1,93 @@
+"""
+流式 JSON 读取基准：生成合成的人物导出文件（默认 500 万条），测逐条解析 / 校验并分批的吞吐（条/秒）与峰值内存。
+
+每项测量在单独的子进程中进行，峰值内存（ru_maxrss）互不影响；流式读取的峰值内存应与文件大小无关。
+无需数据库。--compare-load 另测 json.load 整体载入作对照（大文件时内存占用很高，慎用）。
+    python benchmarks/bench_json_stream.py
+    python benchmarks/bench_json_stream.py --records 100000 1000000 5000000 --compare-load
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from create.jsonstream import iter_json_array, RecordReader, batched
+
+CHARSET = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光'
+RACES = ('仙', '佛', '妖', '人', '龙')
+RELATIONS = ('师徒', '朋友', '敌对', '君臣')
+BATCH_SIZE = 5000
+
+
+def write_synthetic(path: str, count: int, seed: int = 0):
+    """按 character.json 的格式逐条写出，不在内存中构造整个列表。"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[\n')
+        for i in range(count):
+            record = {
+                'name': f'人{i}',
+                'type': rng.choice(RACES),
+                'ability': ''.join(rng.choice(CHARSET) for _ in range(8)),
+                'introduction': ''.join(rng.choice(CHARSET) for _ in range(rng.randint(20, 60))),
+                'organization': '无组织',
+                'superiors': {f'人{rng.randrange(count)}': rng.choice(RELATIONS)} if i % 2 else {},
+            }
+            file.write(json.dumps(record, ensure_ascii=False, indent=2))
+            file.write(',\n' if i < count - 1 else '\n')
+        file.write(']\n')
+
+
+def _measure(mode: str, path: str, queue):
+    start = time.perf_counter()
+    if mode == 'stream':
+        count = sum(1 for _ in iter_json_array(path))
+    elif mode == 'validate+batch':
+        count = sum(len(batch) for batch in batched(RecordReader(path, ('name',)), BATCH_SIZE))
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            count = len(json.load(file))
+    seconds = time.perf_counter() - start
+    queue.put((count, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+
+def measure(mode: str, path: str):
+    """在子进程中运行一项测量，返回 (条数, 耗时秒, 峰值内存 MB)。"""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(mode, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流式 JSON 读取吞吐 / 内存基准')
+    parser.add_argument('--records', type=int, nargs='+', default=[5_000_000])
+    parser.add_argument('--compare-load', action='store_true', help='另测 json.load 整体载入')
+    args = parser.parse_args()
+
+    modes = ['stream', 'validate+batch'] + (['json.load'] if args.compare_load else [])
+    print(f"{'条数':>10} {'文件(MB)':>10} {'方式':>16} {'耗时(s)':>8} {'条/秒':>10} {'峰值内存(MB)':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.records:
+            path = os.path.join(directory, f'character_{count}.json')
+            write_synthetic(path, count)
+            size = os.path.getsize(path) / (1 << 20)
+            for mode in modes:
+                parsed, seconds, peak = measure(mode, path)
+                assert parsed == count
+                print(f"{count:>10} {size:>10.1f} {mode:>16} {seconds:>8.2f} {count / seconds:>10.0f} {peak:>12}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+服务端布局基准：比较 1k / 10k / 100k 节点时 create.layout.compute_layout 的耗时。
+
+用法（无需数据库）：
+    python benchmarks/bench_layout.py
+    python benchmarks/bench_layout.py --sizes 1000 10000 --iterations 50
+
+合成图为随机稀疏图，平均度数约 4（与人物关系图的稀疏程度相近）。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from create.layout import compute_layout, ITERATIONS, EXACT_MAX_NODES
+
+
+def synthetic_graph(n: int, avg_degree: float = 4.0, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    m = int(n * avg_degree / 2)
+    src = rng.integers(0, n, size=m)
+    dst = rng.integers(0, n, size=m)
+    keep = src != dst
+    return src[keep], dst[keep]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务端力导向布局耗时基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    args = parser.parse_args()
+
+    print(f"{'节点数':>8} {'边数':>8} {'斥力算法':>8} {'总耗时(s)':>10} {'每次迭代(ms)':>12}")
+    for n in args.sizes:
+        src, dst = synthetic_graph(n)
+        start = time.perf_counter()
+        compute_layout(n, src, dst, iterations=args.iterations)
+        elapsed = time.perf_counter() - start
+        method = '精确' if n <= EXACT_MAX_NODES else '网格'
+        print(f"{n:>10} {len(src):>10} {method:>10} {elapsed:>12.2f} {elapsed / args.iterations * 1000:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""
+媒体文件服务压测：比较原来的 django.views.static.serve（static()）与 read/media.py 的 serve_media，
+以及 serve_media + X-Accel-Redirect（由本地的 nginx 替身发送文件），报告吞吐（MB/s）与服务端每请求 CPU 时间。
+
+服务端在子进程中运行一个多线程 WSGI 服务器（wsgiref），行为与 gunicorn 一致：
+- 提供 wsgi.file_wrapper，响应是整个打开的文件时用 socket.sendfile（os.sendfile）发送，内容不经过 Python；
+  --no-sendfile 时退回逐块 read + write（wsgiref / runserver 的行为）；
+- 充当 nginx 替身：响应带 X-Accel-Redirect 时，从 MEDIA_ROOT 取出对应文件（含 Range）用 sendfile 发送。
+CPU 时间为服务端进程在压测期间的 user + sys。
+
+场景：
+- full：每次下载整个文件；
+- revalidate：带 If-None-Match / If-Modified-Since 重新验证（浏览器缓存过期后的请求）；
+- range：随机 64 KB 的 Range 请求（视频拖动、断点续传）；static() 不支持 Range，每次返回整个文件。
+
+用法：
+    python benchmarks/bench_media.py
+    python benchmarks/bench_media.py --size-kb 4096 --clients 8 --seconds 5
+"""
+import argparse
+import hashlib
+import http.client
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+from wsgiref.util import FileWrapper
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+MODES = ('static', 'media', 'accel')
+SCENARIOS = ('full', 'revalidate', 'range')
+RANGE_SIZE = 64 * 1024
+ACCEL_PREFIX = '/_accel/'
+
+
+# ----------------------------------------------------------------------
+# 服务端（子进程）
+# ----------------------------------------------------------------------
+class SendfileHandler(ServerHandler):
+    """响应为 wsgi.file_wrapper 且文件有 fileno 时，用 socket.sendfile 从文件当前位置发送 Content-Length 字节。"""
+    use_sendfile = True
+
+    def sendfile(self):
+        filelike = self.result.filelike
+        try:
+            fileno = filelike.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return False
+        if not self.use_sendfile:
+            return False
+        length = dict((k.lower(), v) for k, v in self.headers.items()).get('content-length')
+        offset = filelike.tell()
+        count = int(length) if length is not None else os.fstat(fileno).st_size - offset
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        self.request_handler.connection.sendfile(filelike, offset, count)
+        self.bytes_sent += count
+        return True
+
+
+class RequestHandler(WSGIRequestHandler):
+
+    def handle(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.parse_request():
+            return
+        handler = SendfileHandler(self.rfile, self.wfile, self.get_stderr(), self.get_environ(), multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def accel_stand_in(app, media_root):
+    """nginx 替身：把 X-Accel-Redirect 响应换成对应文件（internal location alias 到 MEDIA_ROOT）。"""
+    from read.media import _byte_range
+
+    def wrapped(environ, start_response):
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'], captured['headers'] = status, headers
+            return lambda data: None
+
+        body = app(environ, capture)
+        headers = dict(captured['headers'])
+        target = headers.pop('X-Accel-Redirect', None)
+        if target is None or not target.startswith(ACCEL_PREFIX):
+            start_response(captured['status'], captured['headers'])
+            return body
+        if hasattr(body, 'close'):
+            body.close()
+        file = open(os.path.join(media_root, target[len(ACCEL_PREFIX):]), 'rb')
+        size = os.fstat(file.fileno()).st_size
+        status, start, length = '200 OK', 0, size
+        byte_range = _byte_range(environ['HTTP_RANGE'], size) if 'HTTP_RANGE' in environ else None
+        if byte_range and byte_range[0] is not None:
+            start, length = byte_range
+            status = '206 Partial Content'
+            headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+        file.seek(start)
+        headers['Content-Length'] = str(length)
+        start_response(status, list(headers.items()))
+        return environ['wsgi.file_wrapper'](file)
+
+    return wrapped
+
+
+def serve(args):
+    os.environ['JTW_DB_PROFILE'] = 'sqlite-replica'
+    os.environ['JTW_SQLITE_DIR'] = args.work_dir
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jtw_info_management.settings')
+    import django
+    from django.conf import settings
+
+    django.setup()
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import path
+    from django.views.static import serve as static_serve
+    from read.media import serve_media
+
+    media_root = os.path.join(args.work_dir, 'media')
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    settings.MEDIA_ROOT = media_root
+    settings.MEDIA_ACCEL_REDIRECT = ACCEL_PREFIX if args.serve == 'accel' else None
+    settings.ROOT_URLCONF = __name__
+    global urlpatterns
+    urlpatterns = [
+        path('static-media/<path:path>', static_serve, {'document_root': media_root}),
+        path('media/<path:path>', serve_media),
+    ]
+    SendfileHandler.use_sendfile = not args.no_sendfile
+    application = accel_stand_in(get_wsgi_application(), media_root)
+
+    server = Server(('127.0.0.1', 0), RequestHandler)
+    server.set_app(application)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(json.dumps({'port': server.server_address[1]}), flush=True)
+    # 父进程每发一行 'cpu' 就报告一次本进程 CPU 时间；stdin 关闭后退出
+    for _ in sys.stdin:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        print(json.dumps({'cpu': usage.ru_utime + usage.ru_stime}), flush=True)
+    server.shutdown()
+
+
+# ----------------------------------------------------------------------
+# 客户端（父进程）
+# ----------------------------------------------------------------------
+def make_file(work_dir: str, size_kb: int) -> str:
+    data = random.Random(0).randbytes(size_kb * 1024)
+    digest = hashlib.sha256(data).hexdigest()
+    name = f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+    path = os.path.join(work_dir, 'media', name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+    return name
+
+
+def load(port: int, url: str, scenario: str, size: int, clients: int, seconds: float):
+    """clients 个线程持续请求 seconds 秒，返回 (请求数, 收到的字节数, 出错数, 实际耗时)。"""
+    validators = {}
+    if scenario == 'revalidate':
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request('GET', url)
+        response = connection.getresponse()
+        response.read()
+        validators = {'If-None-Match': response.getheader('ETag'),
+                      'If-Modified-Since': response.getheader('Last-Modified')}
+        validators = {key: value for key, value in validators.items() if value}
+        connection.close()
+    totals = {'requests': 0, 'bytes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(seed):
+        rng = random.Random(seed)
+        requests = received = errors = 0
+        while time.perf_counter() < deadline:
+            headers = dict(validators)
+            if scenario == 'range':
+                start = rng.randrange(0, size - RANGE_SIZE)
+                headers['Range'] = f'bytes={start}-{start + RANGE_SIZE - 1}'
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            try:
+                connection.request('GET', url, headers=headers)
+                response = connection.getresponse()
+                received += len(response.read())
+                errors += response.status not in (200, 206, 304)
+            except OSError:
+                errors += 1
+            finally:
+                connection.close()
+            requests += 1
+        with lock:
+            totals['requests'] += requests
+            totals['bytes'] += received
+            totals['errors'] += errors
+
+    start_time = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals['requests'], totals['bytes'], totals['errors'], time.perf_counter() - start_time
+
+
+def run_mode(args, mode: str, name: str, size: int):
+    command = [sys.executable, os.path.abspath(__file__), '--serve', mode, '--work-dir', args.work_dir]
+    command += ['--no-sendfile'] if args.no_sendfile else []
+    server = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        port = json.loads(server.stdout.readline())['port']
+
+        def cpu():
+            server.stdin.write('cpu\n')
+            server.stdin.flush()
+            return json.loads(server.stdout.readline())['cpu']
+
+        url = ('/static-media/' if mode == 'static' else '/media/') + name
+        for scenario in SCENARIOS:
+            load(port, url, scenario, size, 1, 0.2)  # 预热
+            before = cpu()
+            requests, received, errors, elapsed = load(port, url, scenario, size, args.clients, args.seconds)
+            used = cpu() - before
+            print(f"{mode:>7} {scenario:>10} {requests:>8} {requests / elapsed:>9.0f} "
+                  f"{received / elapsed / (1 << 20):>9.1f} {used / max(requests, 1) * 1000:>11.3f} {errors:>6}")
+    finally:
+        server.stdin.close()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='媒体文件服务压测')
+    parser.add_argument('--size-kb', type=int, default=1024, help='测试文件大小（KB）')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--no-sendfile', action='store_true', help='服务器不使用 sendfile（wsgiref / runserver 的行为）')
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    args.work_dir = tempfile.mkdtemp(prefix='jtw_media_')
+    try:
+        name = make_file(args.work_dir, args.size_kb)
+        print(f"文件 {args.size_kb} KB，{args.clients} 个并发客户端，每个场景 {args.seconds:g}s，"
+              f"sendfile {'关' if args.no_sendfile else '开'}")
+        print(f"{'方式':>7} {'场景':>10} {'请求数':>8} {'请求/秒':>9} {'MB/s':>9} {'CPU ms/请求':>11} {'出错':>6}")
+        for mode in MODES:
+            run_mode(args, mode, name, args.size_kb * 1024)
+    finally:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+角色提及流水线基准：100 回章节要略 + 1 万个合成角色名（一半截取自章节原文），测 Aho-Corasick 建机 / 扫描 / 共现矩阵耗时。
+
+用法（无需数据库；章节文本取自 initial_data 中的 chapter 数据，找不到时用合成文本）：
+    python benchmarks/bench_mentions.py
+    python benchmarks/bench_mentions.py --names 10000 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jtw_info_management.settings')
+
+import django
+
+django.setup()
+
+from create.mentions import build_automaton, count_mentions, rank_pairs, sparse
+
+# 合成文本 / 名字所用的常用字
+CHARSET = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光'
+
+
+def load_chapters():
+    """initial_data 中的 100 回要略；不存在时生成 100 篇合成文本。"""
+    for root, _, files in os.walk(os.path.join(BASE_DIR, 'initial_data')):
+        for name in files:
+            if 'chapter' in name.lower() and name.endswith('.json'):
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    data = json.load(f)
+                texts = [item.get('summary', '') if isinstance(item, dict) else str(item)
+                         for item in (data if isinstance(data, list) else data.values())]
+                if texts:
+                    return texts
+    rng = random.Random(0)
+    return [''.join(rng.choice(CHARSET) for _ in range(300)) for _ in range(100)]
+
+
+def synthetic_names(count: int, chapters, seed: int = 0):
+    """一半截取自章节文本（保证有命中），一半随机拼字。"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(1, count + 1):
+        length = rng.randint(2, 4)
+        text = rng.choice(chapters)
+        if i % 2 and len(text) > length:
+            start = rng.randrange(len(text) - length)
+            names.append((i, text[start:start + length]))
+        else:
+            names.append((i, ''.join(rng.choice(CHARSET) for _ in range(length))))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='角色提及 / 共现流水线耗时基准')
+    parser.add_argument('--names', type=int, nargs='+', default=[10000])
+    args = parser.parse_args()
+
+    chapters = load_chapters()
+    total_chars = sum(len(text) for text in chapters)
+    print(f"文本：{len(chapters)} 篇，共 {total_chars} 字；共现矩阵：{'scipy.sparse' if sparse else '纯 Python'}")
+    print(f"{'名字数':>8} {'节点数':>8} {'建机(s)':>8} {'扫描(s)':>8} {'提及数':>8} {'共现 top20(s)':>12} {'第一名':>8}")
+    for count in args.names:
+        names = synthetic_names(count, chapters)
+
+        start = time.perf_counter()
+        automaton = build_automaton(names)
+        built = time.perf_counter()
+        mentions = []
+        for doc, text in enumerate(chapters, 1):
+            mentions.extend((cid, doc) for cid in count_mentions(automaton, text))
+        scanned = time.perf_counter()
+        top = rank_pairs(mentions, limit=20)
+        done = time.perf_counter()
+
+        print(f"{count:>8} {len(automaton):>8} {built - start:>8.3f} {scanned - built:>8.3f} "
+              f"{len(mentions):>8} {done - scanned:>12.3f} {top[0][2] if top else 0:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CreateConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "create"
+
+    def ready(self):
+        # 注册模型写入信号（刷新变更戳、维护各类缓存）
+        from . import signals  # noqa: F401
@@ -0,0 +1,174 @@
+"""
+异步读路径：ASGI 部署下 read/ 的 async 视图（read/async_views.py）使用的 AsyncQuery。
+
+Django 的异步 ORM（aget / async for 等）内部是 sync_to_async(thread_sensitive=True)：同一请求的所有查询
+排队进同一个线程，asyncio.gather 几个查询并不会并发执行。这里把每个子查询写成小的同步函数，
+用 sync_to_async(thread_sensitive=False) 交给专用的数据库线程池（ASYNC_DB_THREADS 个线程，
+即最多这么多个数据库连接）执行：
+- single_character 的角色本身、出关系、入关系、持有武器四个查询用 asyncio.gather 并发；
+- 其余方法整体放进线程池执行同步的 Query 方法，事件循环不被慢查询阻塞；
+- 快照（create/snapshot.py）与结果缓存都要先读变更戳（文件缓存 / redis 等后端的 I/O），这一步同样放进线程池，
+  快照可用或缓存命中时在这一次线程切换中直接作答；结果缓存与同步 Query 共享。
+子查询在 replica_reads 范围内执行，配置了只读副本时走副本（见 jtw_info_management/db_routers.py）。
+"""
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from jtw_info_management.db_routers import replica_reads
+from .images import variant_urls
+from .models import Character, Character_Relationship, Weapon
+from .snapshot import Snapshot, SnapshotQuery, snapshot_store
+from .tools import Query, PAGE_SIZE
+
+# 数据库线程池：线程数即异步读路径最多占用的数据库连接数
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'ASYNC_DB_THREADS', 8), thread_name_prefix='jtw-db')
+
+
+def _recycle_connections():
+    """
+    线程池中的线程长期存在，连接在线程内复用（连接数即线程数）；只关闭出过错且已不可用的连接，下次使用时重连。
+    不按 CONN_MAX_AGE 回收：CONN_MAX_AGE=0 时每个子查询都要重新建连，开销比查询本身还大。
+    """
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None and conn.errors_occurred and not conn.is_usable():
+            conn.close()
+
+
+def in_db_thread(func: Callable) -> Callable:
+    """把同步的 ORM 函数包装成协程函数，在数据库线程池中（只读范围内）执行。"""
+    def call(*args, **kwargs):
+        _recycle_connections()
+        with replica_reads():
+            return func(*args, **kwargs)
+    return sync_to_async(call, thread_sensitive=False, executor=_executor)
+
+
+def _character_row(character_id) -> Optional[Dict[str, Any]]:
+    return Character.objects.filter(id=character_id).values('id', 'name', 'intro', 'ability', 'image',
+                                                                 'image_variants').first()
+
+
+def _outgoing(character_id) -> List[tuple]:
+    return list(Character_Relationship.objects.filter(from_character_id=character_id).order_by('id')
+                .values_list('to_character_id', 'to_character__name', 'relationship_type__type'))
+
+
+def _incoming(character_id) -> List[tuple]:
+    return list(Character_Relationship.objects.filter(to_character_id=character_id).order_by('id')
+                .values_list('from_character_id', 'from_character__name', 'relationship_type__type'))
+
+
+def _weapons(character_id) -> List[Dict[str, Any]]:
+    return list(Weapon.objects.filter(owner_character_id=character_id).order_by('id').values('id', 'name'))
+
+
+class AsyncQuery:
+    """与 Query 同名、同返回结构的协程方法；query 为同步实现（Query 或快照优先的 SnapshotQuery）。"""
+
+    def __init__(self, query: Query):
+        self.query = query
+
+    def _snapshot(self) -> Optional[Snapshot]:
+        return snapshot_store.current() if isinstance(self.query, SnapshotQuery) else None
+
+    def _answer(self, name: str, args: tuple, depends) -> Tuple[bool, Any]:
+        """
+        快照 → 结果缓存（在线程池中执行）：能作答时返回 (True, 结果)，
+        否则返回 (False, 查缓存时读到的变更戳版本)，供查询完成后写入缓存。
+        """
+        snapshot = self._snapshot()
+        if snapshot is not None and hasattr(Snapshot, name):
+            return True, getattr(snapshot, name)(*args)
+        if depends is None:
+            return False, None
+        versions, hit, value = Query.cache.lookup((name, args, ()), depends)
+        return (True, value) if hit else (False, versions)
+
+    async def _cached(self, name: str, args: tuple, compute: Callable[[], Any]) -> Any:
+        depends = getattr(getattr(Query, name), 'depends', None)
+        found, value = await in_db_thread(self._answer)(name, args, depends)
+        if found:
+            return value
+        result = await compute()
+        if depends is not None:
+            Query.cache.store((name, args, ()), value, result)
+        return result
+
+    async def _call(self, name: str, *args) -> Any:
+        """快照 → 结果缓存 → 数据库线程池中执行同步实现。"""
+        if getattr(getattr(Query, name), 'depends', None) is None:
+            return await self._cached(name, args, lambda: in_db_thread(getattr(self.query, name))(*args))
+        # 与 cached_query 相同的缓存键；线程池里执行去掉缓存 / 路由包装的原始方法，避免重复查缓存
+        compute = inspect.unwrap(getattr(Query, name))
+        return await self._cached(name, args, lambda: in_db_thread(compute)(self.query, *args))
+
+    async def single_character(self, character_id) -> Dict[str, Any]:
+        """返回结构同 Query.single_character；角色、出关系、入关系、武器四个查询并发执行。"""
+        return await self._cached('single_character', (int(character_id),),
+                                  lambda: self._single_character(character_id))
+
+    async def _single_character(self, character_id) -> Dict[str, Any]:
+        character, outgoing, incoming, weapons = await asyncio.gather(
+            in_db_thread(_character_row)(character_id),
+            in_db_thread(_outgoing)(character_id),
+            in_db_thread(_incoming)(character_id),
+            in_db_thread(_weapons)(character_id),
+        )
+        if character is None:
+            raise ObjectDoesNotExist(f"未找到 ID 为 {character_id} 的角色")
+        relationships = [{'direction': 'from', 'related_character': {'id': other_id, 'name': name}, 'type': kind}
+                         for other_id, name, kind in outgoing]
+        relationships += [{'direction': 'to', 'related_character': {'id': other_id, 'name': name}, 'type': kind}
+                          for other_id, name, kind in incoming]
+        return {
+            'id': character['id'],
+            'name': character['name'],
+            'intro': character['intro'],
+            'ability': character['ability'],
+            'image': default_storage.url(character['image']) if character['image'] else None,
+            'images': variant_urls(character['image'], character['image_variants']),
+            'relationships': relationships,
+            'weapons': weapons,
+        }
+
+    async def single_chapter(self, chapter_id) -> Dict[str, Any]:
+        return await self._call('single_chapter', chapter_id)
+
+    async def single_location(self, location_id) -> Dict[str, Any]:
+        return await self._call('single_location', location_id)
+
+    async def all_calamity(self) -> List[Dict[str, Any]]:
+        return await self._call('all_calamity')
+
+    async def all_character(self) -> List[Dict[str, Any]]:
+        return await self._call('all_character')
+
+    async def all_chaptertitle(self) -> List[Dict[str, Any]]:
+        return await self._call('all_chaptertitle')
+
+    async def page_character(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        return await self._call('page_character', after, limit)
+
+    async def page_chaptertitle(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        return await self._call('page_chaptertitle', after, limit)
+
+    async def page_weapon(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        return await self._call('page_weapon', after, limit)
+
+    async def cooccurrence(self, limit: int = 20, character_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self._call('cooccurrence', limit, character_id)
+
+    async def relationship_path(self, from_id: int, to_id: int) -> Optional[List[Dict[str, Any]]]:
+        return await self._call('relationship_path', from_id, to_id)
+
+    async def relationship_subgraph(self, center_id: int, depth: int = 2, max_nodes: int = 200,
+                                    types: Optional[List[str]] = None) -> Dict[str, Any]:
+        return await self._call('relationship_subgraph', center_id, depth, max_nodes, types)
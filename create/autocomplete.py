@@ -0,0 +1,178 @@
+"""
+名称自动补全：角色 / 武器 / 地点名的前缀树（trie），供更新、删除表单边输入边查询。
+
+原先这些表单每次请求都 values_list('name').distinct() 整表取出、把所有名字塞进下拉框；
+现在每种名称在进程内建一棵前缀树（首次查询时整表载入一次），表单只请求前 N 个匹配。
+
+- 每个节点缓存子树中排名最前的 TOP_K 个名字（名字越短越靠前，同长按字典序），
+  查询只需沿前缀走到节点直接取出，耗时与表大小无关；
+- 安装了 pypinyin 时，另按拼音首字母建一棵树：输入 “swk” 也能找到 “孙悟空”；
+- 名字的新增 / 改名 / 删除由 signals 增量维护；其他进程的修改通过 'names:<kind>' 变更戳发现并整树重建。
+"""
+import threading
+from typing import Dict, List, Optional
+
+from . import stamps
+from .models import Character, Weapon, Location
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # pypinyin 未安装：不支持拼音首字母补全
+    lazy_pinyin = None
+
+# 可补全的名称：kind -> 模型
+NAME_KINDS = {
+    'character': Character,
+    'weapon': Weapon,
+    'location': Location,
+}
+# 每个节点缓存的候选数，也是单次查询的上限
+TOP_K = 20
+
+
+def name_stamp(kind: str) -> str:
+    """名称集合的变更戳名，如 'names:character'；只在名字新增 / 改名 / 删除时刷新。"""
+    return f'names:{kind}'
+
+
+def _rank(name: str):
+    return len(name), name
+
+
+def initials(name: str) -> str:
+    """拼音首字母（“孙悟空” → “swk”）；未安装 pypinyin 时返回空串。"""
+    if lazy_pinyin is None or not name:
+        return ''
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors='ignore')).lower()
+
+
+class _Node:
+    __slots__ = ('children', 'terminals', 'top')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.terminals: set = set()     # 键恰好在此结束的名字
+        self.top: List[str] = []        # 子树中排名前 TOP_K 的名字（已排序）
+
+
+class PrefixTrie:
+    """键（名字本身或拼音首字母）-> 名字 的前缀树，同一个名字可以挂在多个键下。"""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, key: str, name: str):
+        node = self.root
+        path = [node]
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            path.append(node)
+        node.terminals.add(name)
+        rank = _rank(name)
+        for node in path:
+            if name in node.top:
+                continue
+            if len(node.top) < TOP_K or rank < _rank(node.top[-1]):
+                node.top.append(name)
+                node.top.sort(key=_rank)
+                del node.top[TOP_K:]
+
+    def remove(self, key: str, name: str):
+        node = self.root
+        path = [(None, node)]
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return
+            path.append((char, node))
+        node.terminals.discard(name)
+        # 自底向上：名字在某节点的 top 中时，用自身终结名字 + 子节点的 top 重新合并
+        for depth in range(len(path) - 1, -1, -1):
+            char, node = path[depth]
+            if name in node.top:
+                candidates = set(node.terminals)
+                for child in node.children.values():
+                    candidates.update(child.top)
+                node.top = sorted(candidates, key=_rank)[:TOP_K]
+            if depth and not node.terminals and not node.children:
+                del path[depth - 1][1].children[char]
+
+    def complete(self, prefix: str) -> List[str]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top
+
+
+class NameIndex:
+    """一种名称（如角色名）的补全索引：名字树 + 拼音首字母树，名字带引用计数（同名多行）。"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._counts: Optional[Dict[str, int]] = None
+        self._stamp: Optional[int] = None
+        self._names = PrefixTrie()
+        self._initials = PrefixTrie()
+
+    def _add(self, name: str):
+        count = self._counts.get(name, 0)
+        self._counts[name] = count + 1
+        if count == 0:
+            self._names.insert(name.lower(), name)
+            key = initials(name)
+            if key:
+                self._initials.insert(key, name)
+
+    def _discard(self, name: str):
+        count = self._counts.get(name, 0)
+        if count > 1:
+            self._counts[name] = count - 1
+        elif count == 1:
+            del self._counts[name]
+            self._names.remove(name.lower(), name)
+            key = initials(name)
+            if key:
+                self._initials.remove(key, name)
+
+    def _ensure_fresh(self):
+        current = stamps.get_stamp(name_stamp(self.kind))
+        if self._counts is None or self._stamp != current:
+            self._counts, self._names, self._initials = {}, PrefixTrie(), PrefixTrie()
+            names = NAME_KINDS[self.kind].objects.values_list('name', flat=True)
+            for name in names.iterator(chunk_size=5000):
+                if name:
+                    self._add(name)
+            self._stamp = current
+
+    def on_renamed(self, old_name: Optional[str], new_name: Optional[str]):
+        """signals 回调：old_name 为 None 表示新增，new_name 为 None 表示删除（仅在索引已建立时）。"""
+        with self._lock:
+            if self._counts is None:
+                return
+            if old_name:
+                self._discard(old_name)
+            if new_name:
+                self._add(new_name)
+            self._stamp = stamps.get_stamp(name_stamp(self.kind))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        prefix = (prefix or '').strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            self._ensure_fresh()
+            matches = list(self._names.complete(prefix))
+            if prefix.isascii():
+                matches.extend(self._initials.complete(prefix))
+        return sorted(set(matches), key=_rank)[:min(limit, TOP_K)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'names': len(self._counts or ())}
+
+
+# 进程内唯一的各类补全索引
+name_indexes = {kind: NameIndex(kind) for kind in NAME_KINDS}
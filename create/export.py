@@ -0,0 +1,216 @@
+"""
+流式导出：把各表按主键分页读出，逐块写成 JSONL 或紧凑的列式二进制文件，内存占用与表大小无关。
+
+读取用按主键的键集分页（WHERE pk > 上一块末尾 ORDER BY pk LIMIT n）：MySQL 驱动默认会把整个
+结果集取到客户端，QuerySet.iterator() 在 MySQL 上并不能限制内存；键集分页在各数据库上都只持有一块，
+且每块都走主键索引，不会像 OFFSET 那样越翻越慢。
+
+格式：
+- jsonl：每行一个 JSON 对象，键为字段的 attname（外键为 owner_character_id 等），时间为 ISO 字符串；
+- columnar（.jtwc）：
+      b'JTWC' + 版本(1 字节) + uint32 头长度 + 头(JSON：表名、列名、列类型)
+      若干块：uint32 行数，随后每列一段 uint32 长度 + zlib(列数据)；行数为 0 的块表示结束
+  列数据 = 空值位图 + 值：int / datetime（UTC 微秒）为 int64 数组，str 为 uint32 长度数组 + UTF-8 字节，
+  json（如 image_variants）同 str，内容为 JSON 文本。
+  整数按小端存储。read_columnar() 可读回。
+
+    python manage.py export_data --format columnar --out export/
+"""
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from django.db import models
+
+from .models import (Character, Weapon, Location, Chapter, Chapter_Location, Calamity,
+                     Character_Relationship)
+
+# 可导出的表：表名（model_name）-> 模型
+EXPORT_MODELS = {model._meta.model_name: model for model in (
+    Character, Weapon, Location, Chapter, Chapter_Location, Calamity, Character_Relationship)}
+FORMATS = ('jsonl', 'columnar')
+EXTENSIONS = {'jsonl': '.jsonl', 'columnar': '.jtwc'}
+CHUNK_SIZE = 5000
+
+MAGIC = b'JTWC'
+VERSION = 1
+_UINT32 = struct.Struct('<I')
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def columns(model) -> List[Tuple[str, str]]:
+    """[(attname, 类型)]，主键在第一列；类型为 'int' / 'datetime' / 'json' / 'str'。"""
+    result = []
+    for field in model._meta.concrete_fields:
+        target = field.target_field if field.is_relation else field
+        if isinstance(target, (models.AutoField, models.IntegerField)):
+            kind = 'int'
+        elif isinstance(field, models.DateTimeField):
+            kind = 'datetime'
+        elif isinstance(field, models.JSONField):
+            kind = 'json'
+        else:
+            kind = 'str'
+        result.append((field.attname, kind))
+    pk = model._meta.pk.attname
+    result.sort(key=lambda column: column[0] != pk)
+    return result
+
+
+def iter_chunks(model, names: List[str], chunk_size: int = CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """按主键键集分页，逐块产出 values_list 元组；names[0] 须为主键。"""
+    queryset = model.objects.order_by('pk').values_list(*names)
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def _microseconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _ints(values) -> array:
+    data = array('q', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data
+
+
+def encode_column(kind: str, values: List[Any]) -> bytes:
+    """一列一块的列数据（未压缩）：空值位图 + 值。"""
+    bitmap = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value is None:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    if kind == 'int':
+        return bytes(bitmap) + _ints(0 if v is None else v for v in values).tobytes()
+    if kind == 'datetime':
+        return bytes(bitmap) + _ints(0 if v is None else _microseconds(v) for v in values).tobytes()
+    if kind == 'json':
+        values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+    encoded = [b'' if v is None else str(v).encode('utf-8') for v in values]
+    lengths = array('I', map(len, encoded))
+    if sys.byteorder == 'big':
+        lengths.byteswap()
+    return bytes(bitmap) + lengths.tobytes() + b''.join(encoded)
+
+
+def decode_column(kind: str, data: bytes, count: int) -> List[Any]:
+    bitmap_size = (count + 7) // 8
+    nulls = [data[i >> 3] >> (i & 7) & 1 for i in range(count)]
+    body = memoryview(data)[bitmap_size:]
+    if kind in ('int', 'datetime'):
+        numbers = array('q')
+        numbers.frombytes(body[:count * 8])
+        if sys.byteorder == 'big':
+            numbers.byteswap()
+        if kind == 'int':
+            return [None if null else v for null, v in zip(nulls, numbers)]
+        return [None if null else _EPOCH + timedelta(microseconds=v) for null, v in zip(nulls, numbers)]
+    lengths = array('I')
+    lengths.frombytes(body[:count * 4])
+    if sys.byteorder == 'big':
+        lengths.byteswap()
+    text, pos, values = body[count * 4:], 0, []
+    for null, length in zip(nulls, lengths):
+        values.append(None if null else bytes(text[pos:pos + length]).decode('utf-8'))
+        pos += length
+    if kind == 'json':
+        return [None if v is None else json.loads(v) for v in values]
+    return values
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class JsonlWriter:
+
+    def __init__(self, file, table: str, cols: List[Tuple[str, str]]):
+        self.file = file
+        self.names = [name for name, _ in cols]
+
+    def write(self, rows: List[tuple]):
+        self.file.write(''.join(
+            json.dumps(dict(zip(self.names, row)), ensure_ascii=False, default=_json_default) + '\n' for row in rows
+        ).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class ColumnarWriter:
+
+    def __init__(self, file, table: str, cols: List[Tuple[str, str]], level: int = 1):
+        self.file = file
+        self.cols = cols
+        self.level = level
+        header = json.dumps({'table': table, 'columns': [{'name': n, 'type': k} for n, k in cols],
+                             'compression': 'zlib'}, ensure_ascii=False).encode('utf-8')
+        file.write(MAGIC + bytes([VERSION]) + _UINT32.pack(len(header)) + header)
+
+    def write(self, rows: List[tuple]):
+        parts = [_UINT32.pack(len(rows))]
+        for index, (_, kind) in enumerate(self.cols):
+            data = zlib.compress(encode_column(kind, [row[index] for row in rows]), self.level)
+            parts += [_UINT32.pack(len(data)), data]
+        self.file.write(b''.join(parts))
+
+    def close(self):
+        self.file.write(_UINT32.pack(0))
+
+
+WRITERS = {'jsonl': JsonlWriter, 'columnar': ColumnarWriter}
+
+
+def read_columnar(path: str) -> Tuple[Dict[str, Any], Iterator[List[tuple]]]:
+    """读回 .jtwc 文件：返回 (头, 逐块产出行元组列表的迭代器)。"""
+    file = open(path, 'rb')
+    if file.read(4) != MAGIC or file.read(1)[0] != VERSION:
+        file.close()
+        raise ValueError(f"{path} 不是 JTWC v{VERSION} 文件")
+    header = json.loads(file.read(_UINT32.unpack(file.read(4))[0]).decode('utf-8'))
+    kinds = [column['type'] for column in header['columns']]
+
+    def blocks():
+        with file:
+            while True:
+                count = _UINT32.unpack(file.read(4))[0]
+                if not count:
+                    return
+                cols = [decode_column(kind, zlib.decompress(file.read(_UINT32.unpack(file.read(4))[0])), count)
+                        for kind in kinds]
+                yield list(zip(*cols))
+
+    return header, blocks()
+
+
+def export_table(table: str, directory: str, fmt: str = 'jsonl', chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """导出一张表到 directory/<表名>.<扩展名>，返回 {'table', 'path', 'rows', 'bytes', 'seconds'}。"""
+    model = EXPORT_MODELS[table]
+    cols = columns(model)
+    path = os.path.join(directory, table + EXTENSIONS[fmt])
+    start = time.perf_counter()
+    rows = 0
+    with open(path, 'wb') as file:
+        writer = WRITERS[fmt](file, table, cols)
+        for chunk in iter_chunks(model, [name for name, _ in cols], chunk_size):
+            writer.write(chunk)
+            rows += len(chunk)
+        writer.close()
+    return {'table': table, 'path': path, 'rows': rows, 'bytes': os.path.getsize(path),
+            'seconds': time.perf_counter() - start}
@@ -0,0 +1,135 @@
+"""
+模板片段缓存：按所依赖的实体缓存渲染好的 HTML 片段（角色卡片网格、章节正文、关系列表等）。
+
+每个片段声明自己依赖的变更戳名（与 signals.row_stamps 一致，如 'character:12'、'chapter:3'，
+也可以是整表名如 'location'）：
+- 进程内维护“依赖 → 片段”反向索引，signals 在某个角色 / 章节写入时只逐出引用了它的片段；
+- 取片段时再比对一次依赖的变更戳，其他进程写入的数据同样不会返回过期片段；
+- 总字符数超过上限时按 LRU 淘汰；按片段名记录命中 / 未命中次数。
+
+模板中通过 read/templatetags/fragment_cache.py 的 {% fragment %} 标签使用。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Set, Tuple
+
+from django.conf import settings
+
+from . import stamps
+
+# 片段缓存默认的总字符数上限，可在 settings.FRAGMENT_CACHE_MAX_CHARS 中覆盖
+DEFAULT_MAX_CHARS = 4 * 1024 * 1024
+
+
+class FragmentCache:
+    """
+    key = (片段名, 依赖名元组, 额外区分参数)，value = (依赖变更戳元组, html)。
+    _entries 为 OrderedDict，末尾是最近使用的片段；_by_dep 为 依赖名 -> {key} 反向索引。
+    """
+
+    def __init__(self, max_chars: int = None):
+        self._max_chars = max_chars
+        self._entries: 'OrderedDict[Tuple, Tuple[Tuple[int, ...], str]]' = OrderedDict()
+        self._by_dep: Dict[str, Set[Tuple]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+
+    @property
+    def max_chars(self) -> int:
+        if self._max_chars is None:
+            return getattr(settings, 'FRAGMENT_CACHE_MAX_CHARS', DEFAULT_MAX_CHARS)
+        return self._max_chars
+
+    # ------------------------------------------------------------------
+    # 内部：增删条目（调用方持有锁）
+    # ------------------------------------------------------------------
+    def _drop(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry[1])
+        for dep in key[1]:
+            keys = self._by_dep.get(dep)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_dep[dep]
+
+    def _count(self, name: str, field: str):
+        counter = self._stats.setdefault(name, {'hits': 0, 'misses': 0})
+        counter[field] += 1
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    def get_or_render(self, name: str, depends: Iterable[str], render: Callable[[], str], vary: Tuple = ()) -> str:
+        """
+        取出片段 name；未缓存或依赖已变化时调用 render() 重新渲染并缓存。
+        depends 为变更戳名，vary 为其他影响输出但不对应数据写入的参数（如语言）。
+        """
+        depends = tuple(sorted(set(depends)))
+        key = (name, depends, vary)
+        current = stamps.get_stamps(*depends)
+        versions = tuple(current[dep] for dep in depends)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self._count(name, 'hits')
+                return entry[1]
+            self._count(name, 'misses')
+
+        # 渲染放在锁外：片段里可能还有 Query 调用；先读变更戳再渲染，期间有写入则下次自然失效
+        html = render()
+        if len(html) > self.max_chars:
+            return html
+
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (versions, html)
+            self._size += len(html)
+            for dep in depends:
+                self._by_dep.setdefault(dep, set()).add(key)
+            while self._size > self.max_chars and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return html
+
+    def invalidate(self, *names: str) -> int:
+        """signals 回调：逐出引用了这些变更戳名的片段，返回逐出的片段数。"""
+        with self._lock:
+            keys = set()
+            for name in names:
+                keys.update(self._by_dep.get(name, ()))
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fragments = {}
+            for name, counter in self._stats.items():
+                total = counter['hits'] + counter['misses']
+                fragments[name] = dict(counter, hit_rate=round(counter['hits'] / total, 4) if total else 0.0)
+            return {
+                'entries': len(self._entries),
+                'chars': self._size,
+                'max_chars': self.max_chars,
+                'evictions': self.evictions,
+                'fragments': fragments,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_dep.clear()
+            self._stats.clear()
+            self._size = 0
+            self.evictions = 0
+
+
+# 进程内唯一的片段缓存
+fragment_cache = FragmentCache()
@@ -0,0 +1,316 @@
+"""
+人物关系图引擎：把 Character_Relationship 一次性载入内存，以 CSR（压缩稀疏行）数组存储邻接表。
+
+- 角色 id 映射为连续下标 0..n-1；
+- offsets[i]..offsets[i+1] 是下标 i 的邻居在 neighbors 中的区间；
+- neighbors / rel_types / edge_ids / forward 为平行数组（array 模块，紧凑且无 Python 对象开销），
+  forward=1 表示该边按 from→to 方向存储，0 表示反向（查路径时关系按无向处理）。
+
+写入不触发整图重建：signals 把新增 / 删除的边记在增量层（_added / _removed）里，
+增量层超过阈值时在内存中重新压实成 CSR。其他进程的写入通过变更戳发现，此时从数据库整体重载。
+"""
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple, Any, Iterable
+
+from . import stamps
+from .models import Character_Relationship
+
+# 增量层超过 CSR 边数的该比例（且至少 COMPACT_MIN 条）时重新压实
+COMPACT_RATIO = 0.1
+COMPACT_MIN = 1024
+
+# (邻居下标, 关系类型 id, 关系 id, 是否正向)
+Edge = Tuple[int, int, int, int]
+
+
+class RelationGraph:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stamp: Optional[int] = None
+        self._reset()
+
+    def _reset(self):
+        self._index: Dict[int, int] = {}     # 角色 id -> 下标
+        self._ids = array('l')               # 下标 -> 角色 id
+        self._offsets = array('l', [0])
+        self._neighbors = array('l')
+        self._rel_types = array('l')
+        self._edge_ids = array('l')
+        self._forward = array('b')
+        self._edge_ends: Dict[int, Tuple[int, int, int]] = {}  # 关系 id -> (from 下标, to 下标, 类型 id)
+        self._added: Dict[int, List[Edge]] = {}
+        self._removed = set()
+        self._hub: Optional[int] = None       # hub() 的结果，图有变化时清空
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+    def _node(self, character_id: int) -> int:
+        idx = self._index.get(character_id)
+        if idx is None:
+            idx = len(self._ids)
+            self._index[character_id] = idx
+            self._ids.append(character_id)
+        return idx
+
+    def _build(self, rows: Iterable[Tuple[int, int, int, int]]):
+        """由 (关系 id, from id, to id, 类型 id) 行构建 CSR：计数 → 前缀和 → 填充，两遍线性扫描。"""
+        self._reset()
+        for edge_id, from_id, to_id, type_id in rows:
+            self._edge_ends[edge_id] = (self._node(from_id), self._node(to_id), type_id)
+
+        n = len(self._ids)
+        degree = array('l', bytes(array('l').itemsize * (n + 1)))
+        for a, b, _ in self._edge_ends.values():
+            degree[a + 1] += 1
+            degree[b + 1] += 1
+        for i in range(n):
+            degree[i + 1] += degree[i]
+        self._offsets = degree
+
+        total = degree[n]
+        self._neighbors = array('l', bytes(array('l').itemsize * total))
+        self._rel_types = array('l', bytes(array('l').itemsize * total))
+        self._edge_ids = array('l', bytes(array('l').itemsize * total))
+        self._forward = array('b', bytes(total))
+        cursor = array('l', degree[:n])
+        for edge_id, (a, b, type_id) in self._edge_ends.items():
+            for src, dst, forward in ((a, b, 1), (b, a, 0)):
+                pos = cursor[src]
+                cursor[src] += 1
+                self._neighbors[pos] = dst
+                self._rel_types[pos] = type_id
+                self._edge_ids[pos] = edge_id
+                self._forward[pos] = forward
+
+    def _load(self):
+        stamp = stamps.get_stamp('character_relationship')
+        rows = Character_Relationship.objects.values_list(
+            'id', 'from_character_id', 'to_character_id', 'relationship_type_id').iterator(chunk_size=10000)
+        self._build(rows)
+        self._stamp = stamp
+
+    def _compact(self):
+        """把增量层并入 CSR（纯内存操作，不访问数据库）。"""
+        ids = self._ids
+        rows = [(edge_id, ids[a], ids[b], type_id) for edge_id, (a, b, type_id) in self._edge_ends.items()]
+        self._build(rows)
+
+    def _ensure_fresh(self):
+        if self._stamp != stamps.get_stamp('character_relationship'):
+            self._load()
+
+    # ------------------------------------------------------------------
+    # 增量维护（signals 回调）
+    # ------------------------------------------------------------------
+    def on_saved(self, rel: Character_Relationship):
+        with self._lock:
+            if self._stamp is None:
+                return  # 尚未载入，首次查询时会整体加载
+            self._discard(rel.id)
+            a, b = self._node(rel.from_character_id), self._node(rel.to_character_id)
+            self._edge_ends[rel.id] = (a, b, rel.relationship_type_id)
+            self._added.setdefault(a, []).append((b, rel.relationship_type_id, rel.id, 1))
+            self._added.setdefault(b, []).append((a, rel.relationship_type_id, rel.id, 0))
+            self._after_change()
+
+    def on_deleted(self, rel: Character_Relationship):
+        with self._lock:
+            if self._stamp is None:
+                return
+            self._discard(rel.id)
+            self._after_change()
+
+    def _discard(self, edge_id: int):
+        ends = self._edge_ends.pop(edge_id, None)
+        if ends is None:
+            return
+        self._removed.add(edge_id)
+        for node in ends[:2]:
+            if node in self._added:
+                self._added[node] = [edge for edge in self._added[node] if edge[2] != edge_id]
+
+    def _after_change(self):
+        delta = len(self._removed) + sum(len(edges) for edges in self._added.values()) // 2
+        if delta > max(COMPACT_MIN, COMPACT_RATIO * len(self._neighbors) / 2):
+            self._compact()
+        self._hub = None
+        self._stamp = stamps.get_stamp('character_relationship')
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def _edges(self, u: int):
+        """遍历下标 u 的所有边 (邻居, 类型, 关系 id, 是否正向)：CSR 区间 + 增量层。"""
+        if u + 1 < len(self._offsets):
+            start, end = self._offsets[u], self._offsets[u + 1]
+            if self._removed:
+                removed = self._removed
+                for pos in range(start, end):
+                    if self._edge_ids[pos] not in removed:
+                        yield self._neighbors[pos], self._rel_types[pos], self._edge_ids[pos], self._forward[pos]
+            else:
+                yield from zip(self._neighbors[start:end], self._rel_types[start:end],
+                               self._edge_ids[start:end], self._forward[start:end])
+        if u in self._added:
+            yield from self._added[u]
+
+    def neighbors(self, character_id: int) -> List[Dict[str, int]]:
+        """角色的所有直接关系：[{'character_id', 'type_id', 'relationship_id', 'forward'}]"""
+        with self._lock:
+            self._ensure_fresh()
+            u = self._index.get(character_id)
+            if u is None:
+                return []
+            return [{'character_id': self._ids[v], 'type_id': t, 'relationship_id': e, 'forward': bool(f)}
+                    for v, t, e, f in self._edges(u)]
+
+    def shortest_path(self, from_id: int, to_id: int, max_depth: int = 12) -> Optional[List[Dict[str, Any]]]:
+        """
+        双向 BFS 求两个角色之间的最短关系链（关系按无向处理）。
+        返回逐跳列表 [{'from': id, 'to': id, 'type_id': int, 'relationship_id': int, 'forward': bool}, ...]，
+        forward=True 表示关系在库中就是 from→to 方向；同一角色返回 []，不连通或超过 max_depth 跳返回 None。
+        """
+        with self._lock:
+            self._ensure_fresh()
+            s, t = self._index.get(from_id), self._index.get(to_id)
+            if s is None or t is None:
+                return None
+            if s == t:
+                return []
+
+            # parent[node] = (上一跳下标, 类型, 关系 id, 边在“靠近起点 → node”方向上是否正向)
+            parents = ({s: None}, {t: None})
+            frontiers = ([s], [t])
+            depth = 0
+            while frontiers[0] and frontiers[1] and depth < max_depth:
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                mine, other = parents[side], parents[1 - side]
+                next_frontier = []
+                for u in frontiers[side]:
+                    for v, type_id, edge_id, forward in self._edges(u):
+                        if v in mine:
+                            continue
+                        mine[v] = (u, type_id, edge_id, forward)
+                        if v in other:
+                            return self._join(parents, v)
+                        next_frontier.append(v)
+                frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+                depth += 1
+            return None
+
+    def _join(self, parents, meet: int) -> List[Dict[str, Any]]:
+        ids = self._ids
+        steps = []
+        # 起点一侧：从相遇点回溯到起点，每跳方向为 上一跳 → 当前
+        node = meet
+        while parents[0][node] is not None:
+            prev, type_id, edge_id, forward = parents[0][node]
+            steps.append({'from': ids[prev], 'to': ids[node], 'type_id': type_id,
+                          'relationship_id': edge_id, 'forward': bool(forward)})
+            node = prev
+        steps.reverse()
+        # 终点一侧：从相遇点走向终点，记录的边方向是 终点侧上一跳 → 当前，需要取反
+        node = meet
+        while parents[1][node] is not None:
+            prev, type_id, edge_id, forward = parents[1][node]
+            steps.append({'from': ids[node], 'to': ids[prev], 'type_id': type_id,
+                          'relationship_id': edge_id, 'forward': not forward})
+            node = prev
+        return steps
+
+    def ego_network(self, center_id: int, depth: int = 2, max_nodes: int = 200,
+                    type_ids: Optional[Iterable[int]] = None, unique_pairs: bool = False) -> Dict[str, Any]:
+        """
+        以 center_id 为中心的 k 跳邻域子图：按 BFS 层序收点，最多 depth 跳、max_nodes 个角色，
+        type_ids 非空时只沿这些关系类型扩展。代价只与局部度数相关，与全图规模无关。
+        返回 {'center': id, 'nodes': [{'id', 'depth'}], 'edges': [{'relationship_id', 'from', 'to', 'type_id'}],
+              'truncated': 是否因 max_nodes 截断}，edges 为子图内所有（满足类型过滤的）关系，按库中方向给出；
+        unique_pairs=True 时同一无向角色对只保留关系 id 最小的一条。
+        """
+        with self._lock:
+            self._ensure_fresh()
+            c = self._index.get(center_id)
+            if c is None:
+                return {'center': center_id, 'nodes': [], 'edges': [], 'truncated': False}
+            allowed = set(type_ids) if type_ids else None
+
+            depths = {c: 0}
+            frontier = [c]
+            truncated = False
+            for level in range(1, depth + 1):
+                next_frontier = []
+                for u in frontier:
+                    for v, type_id, _, _ in self._edges(u):
+                        if v in depths or (allowed is not None and type_id not in allowed):
+                            continue
+                        if len(depths) >= max_nodes:
+                            truncated = True
+                            break
+                        depths[v] = level
+                        next_frontier.append(v)
+                frontier = next_frontier
+
+            ids = self._ids
+            edges = {}
+            for u in depths:
+                for v, type_id, edge_id, forward in self._edges(u):
+                    if v in depths and edge_id not in edges and (allowed is None or type_id in allowed):
+                        a, b = (u, v) if forward else (v, u)
+                        edges[edge_id] = {'relationship_id': edge_id, 'from': ids[a], 'to': ids[b], 'type_id': type_id}
+            edges = sorted(edges.values(), key=lambda edge: edge['relationship_id'])
+            if unique_pairs:
+                pairs = set()
+                unique = []
+                for edge in edges:
+                    pair = (min(edge['from'], edge['to']), max(edge['from'], edge['to']))
+                    if pair not in pairs:
+                        pairs.add(pair)
+                        unique.append(edge)
+                edges = unique
+            return {
+                'center': center_id,
+                'nodes': [{'id': ids[u], 'depth': d} for u, d in depths.items()],
+                'edges': edges,
+                'truncated': truncated,
+            }
+
+    def hub(self) -> Optional[int]:
+        """
+        度数最高的角色 id（关系图页面默认以此为中心）；度数取 CSR 区间长度 + 增量层新增边数。
+        需要遍历所有角色，结果缓存到图下一次变化（重载 / 增删边）为止。
+        """
+        with self._lock:
+            self._ensure_fresh()
+            if not self._ids:
+                return None
+            if self._hub is None:
+                offsets, added = self._offsets, self._added
+                csr_nodes = len(offsets) - 1
+                best = max(range(len(self._ids)), key=lambda u: (offsets[u + 1] - offsets[u] if u < csr_nodes else 0)
+                                                                + len(added.get(u, ())))
+                self._hub = self._ids[best]
+            return self._hub
+
+    def edge_arrays(self) -> Tuple[array, array, array]:
+        """
+        导出当前全图：(下标 -> 角色 id 数组, 边起点下标数组, 边终点下标数组)，供布局计算等批处理使用。
+        """
+        with self._lock:
+            self._ensure_fresh()
+            src, dst = array('l'), array('l')
+            for a, b, _ in self._edge_ends.values():
+                src.append(a)
+                dst.append(b)
+            return array('l', self._ids), src, dst
+
+    def stats(self) -> Dict[str, int]:
+        return {'nodes': len(self._ids), 'edges': len(self._edge_ends),
+                'pending_added': sum(len(edges) for edges in self._added.values()) // 2,
+                'pending_removed': len(self._removed)}
+
+
+# 进程内唯一的关系图实例
+relation_graph = RelationGraph()
@@ -0,0 +1,141 @@
+"""
+角色 / 武器图片的衍生图：上传后在后台线程中生成 card / detail / original 三种尺寸，各有 WebP 和 JPEG 两种格式，
+记录在模型的 image_variants（JSONField）中，模板用 {% picture %} 标签（read/templatetags/image_variants.py）
+按显示宽度选最小的够用尺寸，支持 WebP 的浏览器优先取 WebP。
+
+image_variants 结构（文件名均为 default_storage 中的名字）：
+    {'source': 原图名,
+     'card':     {'width': 160, 'height': ..., 'webp': 'characters/.../wukong.card.webp', 'jpeg': '....card.jpg',
+                  'bytes': {'webp': ..., 'jpeg': ...}},
+     'detail':   {...},
+     'original': {...}}
+source 与当前 image.name 不同（换了图片、衍生图尚未生成）时视为没有衍生图，页面退回原图。
+
+模型 save() 发现 source 与图片不一致时调用 schedule_variants()：事务提交后登记到任务队列（create/jobs.py），
+由 run_jobs worker 处理，上传请求不等待缩放 / 编码。python manage.py build_image_variants 可为已有图片补生成。
+"""
+import io
+import os
+from typing import Any, Dict, Optional
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# 衍生尺寸：名字 -> 最长边像素（None 表示保持原尺寸，只重新编码并去掉元数据），从小到大
+VARIANTS = {'card': 160, 'detail': 600, 'original': None}
+# 格式 -> (Pillow 格式名, 扩展名, 编码参数)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _variant_name(source: str, variant: str, extension: str) -> str:
+    stem, _ = os.path.splitext(source)
+    return f'{stem}.{variant}.{extension}'
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    pillow_format, _, options = FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG 不支持透明：透明部分铺白底
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(source: str, storage=default_storage) -> Dict[str, Any]:
+    """读取 storage 中的原图 source，写出全部衍生图，返回 image_variants 字典。"""
+    with storage.open(source, 'rb') as file:
+        image = Image.open(file)
+        image.load()
+    # 按 EXIF 方向旋正（手机照片），之后的衍生图不再带 EXIF
+    image = ImageOps.exif_transpose(image)
+    variants: Dict[str, Any] = {'source': source}
+    try:
+        for variant, max_edge in VARIANTS.items():
+            resized = image
+            if max_edge is not None and max(image.size) > max_edge:
+                resized = image.copy()
+                resized.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            entry = {'width': resized.width, 'height': resized.height, 'bytes': {}}
+            variants[variant] = entry
+            for fmt, (_, extension, _) in FORMATS.items():
+                data = _encode(resized, fmt)
+                entry[fmt] = storage.save(_variant_name(source, variant, extension), ContentFile(data))
+                entry['bytes'][fmt] = len(data)
+    except Exception:
+        # 已写出的衍生图不会被记录，删除（内容寻址存储下为释放引用）
+        for name in variant_files(variants):
+            storage.delete(name)
+        raise
+    return variants
+
+
+def variant_files(variants: Optional[Dict[str, Any]]):
+    """image_variants 中记录的全部衍生图文件名。"""
+    for variant in VARIANTS:
+        entry = (variants or {}).get(variant) or {}
+        for fmt in FORMATS:
+            if entry.get(fmt):
+                yield entry[fmt]
+
+
+def variant_urls(image_name: Optional[str], variants: Optional[Dict[str, Any]],
+                 storage=default_storage) -> Optional[Dict[str, Any]]:
+    """
+    模板用的衍生图 URL：{'card': {'width', 'height', 'webp': URL, 'jpeg': URL}, ...}；
+    没有图片、或衍生图不是由当前图片生成的，返回 None（页面用原图）。
+    """
+    if not image_name or not variants or variants.get('source') != image_name:
+        return None
+    result = {}
+    for variant in VARIANTS:
+        entry = variants.get(variant)
+        if entry:
+            result[variant] = {'width': entry['width'], 'height': entry['height'],
+                               **{fmt: storage.url(entry[fmt]) for fmt in FORMATS}}
+    return result or None
+
+
+def process_image(model, pk: int, source: str) -> Optional[Dict[str, Any]]:
+    """
+    为 model 的 pk 行的图片 source 生成衍生图并写回 image_variants；图片在生成期间又被换掉时丢弃结果。
+    不经 save() 写回（不会再次触发生成），写回后按 signals.touch 刷新变更戳、片段缓存与快照。
+    变更戳存放在各进程共享的 'stamps' 缓存中（见 create/stamps.py），任务进程写回后，
+    Web 进程里缓存的 single_character（images 为 None）与旧 ETag 都会随之失效。
+    """
+    from .signals import touch
+
+    previous = model.objects.filter(pk=pk).values_list('image_variants', flat=True).first()
+    variants = generate_variants(source)
+    try:
+        updated = model.objects.filter(pk=pk, image=source).update(image_variants=variants)
+    except Exception:
+        for name in variant_files(variants):
+            default_storage.delete(name)
+        raise
+    stale = variant_files(previous) if updated else variant_files(variants)
+    for name in set(stale) - set(variant_files(variants if updated else previous)):
+        default_storage.delete(name)
+    if not updated:
+        print(f"图片已被替换，丢弃衍生图: {model._meta.model_name} {pk} {source}")
+        return None
+    touch(model, model.objects.get(pk=pk))
+    return variants
+
+
+def schedule_variants(instance):
+    """当前事务提交后登记任务，为 instance 的当前图片生成衍生图；同一行连续换图只处理最后一张。"""
+    from .jobs import enqueue
+
+    model = instance._meta.model_name
+    enqueue('image_variants', {'model': model, 'pk': instance.pk, 'source': instance.image.name},
+            key=f'image_variants:{model}:{instance.pk}')
@@ -0,0 +1,233 @@
+"""
+数据库任务队列：写入之后的重活（图片衍生图、读模型快照重建、角色提及重扫、关系图布局等）登记到 Job 表，
+由 python manage.py run_jobs 在后台执行，请求耗时与这些工作无关；不依赖 Redis 等外部消息队列。
+
+- enqueue(kind, payload, key)：在当前事务提交后登记任务（事务回滚则不登记）；
+  key 为幂等键：同一个键已有待执行的任务时只更新其参数，不重复登记；该键的任务正在执行时，
+  只记下 rerun，本次执行结束后按新参数改回待执行再执行一次（执行期间的写入不会被漏掉，
+  也不会有两个 worker 同时执行同一个键）；
+- claim()：用条件 UPDATE（status 与 locked_by / locked_at 仍是读到的值才改成 running）领取任务，
+  多个 worker 进程同时领取也只有一个成功；running 超过 JOB_TIMEOUT 秒的任务视为 worker 已退出，可被重新领取
+  （原 worker 若其实仍在执行，结束时发现任务已被接手，不会覆盖其状态）；
+- 失败后按 JOB_RETRY_DELAY × 2^(次数-1) 秒（最多 JOB_RETRY_MAX_DELAY）退避重试，执行 max_attempts 次仍失败记为 failed；
+- stats()：各状态任务数、各类型待执行数、最早的待执行任务已等待的秒数（read/job_stats 返回）。
+
+任务是 @task 注册的模块级函数，参数为 payload 的各项，须可重复执行（至少执行一次语义）。
+worker 与 Web 是不同的进程，任务中刷新的变更戳要让 Web 进程看到，变更戳缓存须为共享后端（见 create/stamps.py）。
+settings.JOBS_INLINE 为 True 时不经队列，事务提交后在当前线程直接执行（开发 / 没有运行 worker 时）。
+"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+# 任务类型 -> 函数
+TASKS: Dict[str, Callable[..., Any]] = {}
+
+
+def task(kind: str):
+    """注册任务函数：@task('image_variants')。"""
+    def decorator(func):
+        TASKS[kind] = func
+        return func
+    return decorator
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+# ----------------------------------------------------------------------
+# 登记
+# ----------------------------------------------------------------------
+def enqueue(kind: str, payload: Optional[Dict[str, Any]] = None, key: Optional[str] = None,
+            max_attempts: Optional[int] = None) -> None:
+    """当前事务提交后登记任务（不在事务中时立即登记）。"""
+    if kind not in TASKS:
+        raise ValueError(f"未注册的任务类型: {kind}")
+    payload = payload or {}
+    max_attempts = max_attempts or _setting('JOB_MAX_ATTEMPTS', 5)
+    if _setting('JOBS_INLINE', False):
+        transaction.on_commit(lambda: TASKS[kind](**payload), robust=True)
+        return
+    transaction.on_commit(lambda: _insert(kind, payload, key, max_attempts))
+
+
+def _insert(kind: str, payload: Dict[str, Any], key: Optional[str], max_attempts: int) -> None:
+    if key is None:
+        Job.objects.create(kind=kind, payload=payload, max_attempts=max_attempts)
+        return
+    reset = dict(kind=kind, payload=payload, status='pending', attempts=0, max_attempts=max_attempts,
+                 run_after=timezone.now(), locked_by='', locked_at=None, last_error='', finished_at=None,
+                 rerun=False)
+    # 已有同键任务：待执行的只更新参数（不推迟执行时间）；
+    # 执行中的不能改回待执行（否则另一个 worker 会同时再执行一次），只记下执行结束后再执行一次；
+    # 已完成 / 失败的重新置为待执行
+    if Job.objects.filter(key=key, status='pending').update(kind=kind, payload=payload):
+        return
+    if Job.objects.filter(key=key, status='running').update(
+            kind=kind, payload=payload, max_attempts=max_attempts, rerun=True):
+        return
+    if Job.objects.filter(key=key, status__in=('done', 'failed')).update(**reset):
+        return
+    try:
+        with transaction.atomic():
+            Job.objects.create(key=key, **reset)
+    except IntegrityError:
+        # 并发登记了同一个键：对方的任务同样会执行
+        Job.objects.filter(key=key).update(payload=payload)
+
+
+# ----------------------------------------------------------------------
+# 领取与执行
+# ----------------------------------------------------------------------
+def claim(worker: str, limit: int) -> List[int]:
+    """领取最多 limit 个到期的任务，返回任务 id（已置为 running，attempts 加一）。"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('JOB_TIMEOUT', 600))
+    candidates = Job.objects.filter(
+        Q(status='pending', run_after__lte=now) | Q(status='running', locked_at__lt=stale)
+    ).order_by('run_after', 'id').values_list('id', 'status', 'locked_by', 'locked_at')[:limit * 2]
+    claimed = []
+    for job_id, status, locked_by, locked_at in candidates:
+        if len(claimed) >= limit:
+            break
+        # 条件 UPDATE：只有状态与执行者仍是刚读到的那样时才领取成功，其他 worker 先领走则影响 0 行；
+        # 超时任务的状态本来就是 running，须连同读到的 locked_by / locked_at 一起比对，否则两个 worker 都会领取成功
+        updated = Job.objects.filter(id=job_id, status=status, locked_by=locked_by, locked_at=locked_at).update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1)
+        if updated:
+            claimed.append(job_id)
+    return claimed
+
+
+def run_job(job_id: int, worker: str) -> str:
+    """执行一个已领取的任务并记录结果，返回最终状态；线程池 / 进程池中执行。"""
+    close_old_connections()
+    try:
+        job = Job.objects.filter(id=job_id, status='running', locked_by=worker).first()
+        if job is None:
+            return 'skipped'
+        try:
+            TASKS[job.kind](**job.payload)
+        except Exception as e:
+            return _failed(job, worker, e)
+        # 执行期间同键被重新登记（rerun）时不记为完成，改回待执行
+        if not Job.objects.filter(id=job_id, status='running', locked_by=worker, rerun=False).update(
+                status='done', finished_at=timezone.now(), locked_by='', last_error=''):
+            return _rerun(job_id, worker)
+        return 'done'
+    finally:
+        close_old_connections()
+
+
+def _failed(job: Job, worker: str, error: Exception) -> str:
+    message = ''.join(traceback.format_exception(error))[-4000:]
+    if job.attempts >= job.max_attempts:
+        status, run_after = 'failed', job.run_after
+        print(f"任务失败（已执行 {job.attempts} 次，不再重试）: {job}: {error}")
+    else:
+        delay = min(_setting('JOB_RETRY_DELAY', 5) * 2 ** (job.attempts - 1), _setting('JOB_RETRY_MAX_DELAY', 3600))
+        status, run_after = 'pending', timezone.now() + timedelta(seconds=delay)
+        print(f"任务出错，{delay:g}s 后重试: {job}: {error}")
+    if not Job.objects.filter(id=job.id, status='running', locked_by=worker, rerun=False).update(
+            status=status, run_after=run_after, locked_by='', last_error=message,
+            finished_at=timezone.now() if status == 'failed' else None):
+        return _rerun(job.id, worker)
+    return status
+
+
+def _rerun(job_id: int, worker: str) -> str:
+    """
+    执行期间同键又被登记过（rerun 只会在 running 期间由 False 改为 True）：
+    按新登记的参数重新置为待执行，已执行次数清零；任务已被别的 worker 接手时返回 'skipped'。
+    """
+    updated = Job.objects.filter(id=job_id, status='running', locked_by=worker, rerun=True).update(
+        status='pending', rerun=False, attempts=0, run_after=timezone.now(), locked_by='', locked_at=None,
+        last_error='', finished_at=None)
+    return 'pending' if updated else 'skipped'
+
+
+def purge(days: float) -> int:
+    """删除 days 天前完成的任务，返回删除条数。"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Job.objects.filter(status='done', finished_at__lt=cutoff).delete()[0]
+
+
+def stats() -> Dict[str, Any]:
+    """队列深度：各状态任务数、各类型的待执行数、最早的待执行任务已等待的秒数。"""
+    now = timezone.now()
+    counts = dict(Job.objects.order_by().values_list('status').annotate(n=Count('id')))
+    pending = Job.objects.filter(status='pending')
+    oldest = pending.filter(run_after__lte=now).aggregate(oldest=Min('run_after'))['oldest']
+    return {
+        **{status: counts.get(status, 0) for status, _ in Job.STATUS_CHOICES},
+        'pending_by_kind': dict(pending.order_by().values_list('kind').annotate(n=Count('id'))),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
+
+
+# ----------------------------------------------------------------------
+# 任务
+# ----------------------------------------------------------------------
+@task('image_variants')
+def image_variants(model: str, pk: int, source: str):
+    """生成角色 / 武器图片的衍生图（见 create/images.py）。"""
+    from .images import process_image, VARIANTS
+
+    variants = process_image(apps.get_model('create', model), pk, source)
+    if variants:
+        sizes = '，'.join(f"{name} {variants[name]['width']}x{variants[name]['height']}" for name in VARIANTS)
+        print(f"已生成衍生图: {model} {pk}（{sizes}）")
+
+
+@task('rescan_mentions')
+def rescan_mentions(character_id: int):
+    """角色新增 / 改名后重扫各篇文本中该角色的提及（见 create/mentions.py），名字取执行时的最新值。"""
+    from . import mentions
+    from .models import Character
+
+    name = Character.objects.filter(pk=character_id).values_list('name', flat=True).first()
+    # 角色已删除（提及记录随外键级联删除），或提及表尚未生成（不能只写入这一个角色的记录）
+    if name is None or not mentions.is_built():
+        return
+    mentions.rescan_character(character_id, name)
+
+
+@task('graph_layout')
+def graph_layout():
+    """重新计算关系图的服务端布局（见 create/layout.py）。"""
+    from .layout import layout_cache
+
+    nodes = layout_cache.rebuild()
+    if nodes is not None:
+        print(f"已生成关系图布局: {nodes} 个节点")
+
+
+@task('rebuild_snapshot')
+def rebuild_snapshot():
+    """重新生成读模型快照（见 create/snapshot.py）。"""
+    from .snapshot import snapshot_store
+
+    snapshot_store.rebuild()
+
+
+def init_process():
+    """进程池工作进程的 initializer：spawn 方式启动时需要先初始化 Django。"""
+    import django
+
+    if not apps.ready:
+        django.setup()
@@ -0,0 +1,108 @@
+"""
+流式读取 JSON 数组：逐条产出顶层数组里的元素，内存占用与文件大小无关。
+
+json.load 会把整个文件连同全部对象一次性载入内存，几 GB 的人物 / 关系导出文件会把导入机器撑爆。
+这里按块（READ_SIZE）读入文本，用标准库 JSONDecoder.raw_decode（C 实现）逐个解码数组元素，
+已解码的部分随即丢弃，缓冲区只保留未解码的尾部：峰值内存约为 READ_SIZE + 单条记录大小。
+
+    for batch in batched(RecordReader(path, required=('name',)), 5000):
+        Model.objects.bulk_create(...)
+"""
+import json
+import re
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Tuple
+
+# 每次从文件读入的字符数
+READ_SIZE = 1 << 20
+_WHITESPACE = ' \t\n\r'
+_NUMBER_TAIL = re.compile(r'[-+.eE0-9]*')
+# 无效记录最多打印几条
+MAX_WARNINGS = 10
+
+
+def iter_json_array(path: str, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """逐个产出文件顶层 JSON 数组中的元素；文件不是数组或格式错误时抛出 ValueError（json.JSONDecodeError）。"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        buf, pos, eof = '', 0, False
+
+        def fill():
+            """缓冲区丢掉已解码部分再读入一块；读到文件末尾返回 False。"""
+            nonlocal buf, pos, eof
+            chunk = file.read(read_size)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+            return not eof
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip_whitespace()
+        if buf[pos:pos + 1] != '[':
+            raise ValueError(f"{path} 不是列表格式")
+        pos += 1
+        skip_whitespace()
+        if buf[pos:pos + 1] == ']':
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # 数字在块边界被截断时（如 '1.5e' 只解码出 1.5）也能解码成功：数字一直延伸到缓冲区末尾时读入更多再解码
+                complete = eof or not isinstance(value, (int, float)) or _NUMBER_TAIL.match(buf, end).end() < len(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                fill()
+                continue
+            yield value
+            pos = end
+            skip_whitespace()
+            delimiter = buf[pos:pos + 1]
+            pos += 1
+            if delimiter == ']':
+                return
+            if delimiter != ',':
+                raise json.JSONDecodeError("应为 ',' 或 ']'", buf, pos - 1)
+            skip_whitespace()
+
+
+class RecordReader:
+    """
+    逐条产出文件中的有效记录：必须是 dict 且含有 required 中的全部键，其余记录跳过并计数。
+    每次迭代都重新从头读文件，可以对同一个 RecordReader 遍历多遍。
+    """
+
+    def __init__(self, path: str, required: Tuple[str, ...] = ()):
+        self.path = path
+        self.required = required
+        self.read = 0
+        self.invalid = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        self.read = self.invalid = 0
+        for record in iter_json_array(self.path):
+            self.read += 1
+            if isinstance(record, dict) and all(key in record for key in self.required):
+                yield record
+                continue
+            self.invalid += 1
+            if self.invalid <= MAX_WARNINGS:
+                print(f"跳过无效记录: {self.path} 第 {self.read} 条（需为对象且包含 {', '.join(self.required)}）")
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """按固定大小分批（itertools.batched 需 Python 3.12）。"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,184 @@
+"""
+服务端关系图布局：用 NumPy 向量化的 Fruchterman-Reingold 力导向迭代预先算好节点坐标，
+浏览器只需按坐标绘制，不再在访客设备上跑 D3 forceSimulation。
+
+- 节点很少（<= EXACT_MAX_NODES）时斥力逐对精确计算（n×n 矩阵运算）；
+- 节点较多时用网格近似（particle-mesh）：把节点按 CIC 权重撒到网格上，
+  用 FFT 卷积一次算出整张网格上的斥力场，再双线性插值回各节点，单次迭代 O(n + G² log G)；
+- 引力沿边计算，np.bincount 按节点累加到两端。
+
+布局由后台任务计算（create/jobs.py 的 'graph_layout'，节点多时要数秒），不在读请求中计算：
+关系有写入后，读请求登记一次重算任务，在新布局算好之前继续返回上一次算好的坐标。
+算好的坐标连同所依据的关系图变更戳存入共享的变更戳缓存（见 create/stamps.py），
+并刷新 LAYOUT_STAMP，各进程据此重新读取；进程内另缓存一份，不必每次请求都反序列化。
+NumPy 为可选依赖：未安装时 layout_cache.positions() 返回 None，页面退回浏览器端布局；
+还没有算好过任何布局时同样返回 None。
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 未安装：不提供服务端布局
+    np = None
+
+# 精确计算斥力的最大节点数（再大时 n×n 矩阵比网格近似更慢）
+EXACT_MAX_NODES = 300
+# 默认迭代次数
+ITERATIONS = 80
+# 网格近似的最大边长（格点数）
+GRID_MAX = 512
+
+# 共享缓存中保存最近一次布局 (关系图变更戳, 坐标) 的键；布局写入后刷新的变更戳名
+LAYOUT_CACHE_KEY = 'jtw:layout'
+LAYOUT_STAMP = 'graph_layout'
+
+
+def _repulsion_exact(pos, k2):
+    delta = pos[:, None, :] - pos[None, :, :]          # (n, n, 2)
+    dist2 = (delta ** 2).sum(axis=-1)
+    np.fill_diagonal(dist2, np.inf)
+    return (delta * (k2 / np.maximum(dist2, 1e-4))[:, :, None]).sum(axis=1)
+
+
+def _repulsion_grid(pos, k2, grid):
+    """particle-mesh：CIC 撒点 → FFT 卷积得到斥力场 → 双线性插值回节点。"""
+    lo = pos.min(axis=0)
+    span = max(float((pos.max(axis=0) - lo).max()), 1e-6)
+    h = span / (grid - 1)
+    g = (pos - lo) / h                                   # 网格坐标
+    i0 = np.clip(np.floor(g).astype(np.int64), 0, grid - 2)
+    f = g - i0                                           # 格内偏移，用作 CIC 权重
+    wx = (1 - f[:, 0], f[:, 0])
+    wy = (1 - f[:, 1], f[:, 1])
+
+    # 撒点到 (2G, 2G) 的零填充网格上，避免 FFT 循环卷积的周期混叠
+    size = 2 * grid
+    density = np.zeros(size * size)
+    for dx in (0, 1):
+        for dy in (0, 1):
+            idx = (i0[:, 0] + dx) * size + (i0[:, 1] + dy)
+            density += np.bincount(idx, weights=wx[dx] * wy[dy], minlength=size * size)
+    density = density.reshape(size, size)
+
+    # 斥力核：FR 斥力 k²/r，方向为单位向量 → 分量 k² * d / r²
+    offsets = np.fft.fftfreq(size, d=1.0 / size) * h     # 0, h, 2h, ..., -h
+    ox, oy = np.meshgrid(offsets, offsets, indexing='ij')
+    r2 = ox ** 2 + oy ** 2
+    r2[0, 0] = np.inf
+    density_hat = np.fft.rfft2(density)
+    field_x = np.fft.irfft2(density_hat * np.fft.rfft2(k2 * ox / r2), s=(size, size))
+    field_y = np.fft.irfft2(density_hat * np.fft.rfft2(k2 * oy / r2), s=(size, size))
+
+    force = np.zeros_like(pos)
+    for dx in (0, 1):
+        for dy in (0, 1):
+            w = (wx[dx] * wy[dy])[:, None]
+            cx, cy = i0[:, 0] + dx, i0[:, 1] + dy
+            force += w * np.stack((field_x[cx, cy], field_y[cx, cy]), axis=1)
+    return force
+
+
+def compute_layout(n: int, src, dst, iterations: int = ITERATIONS, seed: int = 0):
+    """
+    计算 n 个节点的力导向布局，src / dst 为边两端的节点下标（长度相同的整数序列）。
+    返回 (n, 2) 的 float 数组，坐标已归一化到 [0, 1]。
+    """
+    if np is None:
+        raise ImportError('服务端布局需要安装 NumPy：pip install numpy')
+    if n == 0:
+        return np.zeros((0, 2))
+
+    rng = np.random.default_rng(seed)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    side = np.sqrt(n)
+    pos = rng.uniform(-side, side, size=(n, 2))
+    k = 1.0                                  # 理想边长
+    k2 = k * k
+    grid = int(min(GRID_MAX, max(32, 2 ** np.ceil(np.log2(side * 2)))))
+    temperature = side / 5
+    cooling = (0.01 / temperature) ** (1.0 / max(iterations, 1)) if temperature > 0.01 else 1.0
+
+    for _ in range(iterations):
+        if n <= EXACT_MAX_NODES:
+            disp = _repulsion_exact(pos, k2)
+        else:
+            disp = _repulsion_grid(pos, k2, grid)
+
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt((delta ** 2).sum(axis=1))[:, None]
+            pull = delta * dist / k               # FR 引力 d²/k，方向为单位向量
+            for axis in (0, 1):
+                disp[:, axis] += (np.bincount(dst, weights=pull[:, axis], minlength=n)
+                                  - np.bincount(src, weights=pull[:, axis], minlength=n))
+
+        # 向中心的微弱引力，防止不连通的分量漂散
+        disp -= pos * 0.01
+
+        length = np.sqrt((disp ** 2).sum(axis=1))[:, None]
+        pos += disp / np.maximum(length, 1e-9) * np.minimum(length, temperature)
+        temperature *= cooling
+
+    lo = pos.min(axis=0)
+    span = np.maximum(pos.max(axis=0) - lo, 1e-9)
+    return (pos - lo) / span
+
+
+class LayoutCache:
+    """
+    全图布局缓存：_positions 为最近一次算好的坐标，_stamp 为它所依据的 'character_relationship' 变更戳；
+    _loaded 为读取共享缓存时的 LAYOUT_STAMP，_requested 为已登记过重算任务的关系图变更戳（每个变更戳只登记一次）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp: Optional[int] = None
+        self._positions: Optional[Dict[int, Tuple[float, float]]] = None
+        self._loaded: Optional[int] = None
+        self._requested: Optional[int] = None
+
+    def positions(self) -> Optional[Dict[int, Tuple[float, float]]]:
+        """返回 {角色 id: (x, y)}，坐标在 [0, 1]；关系有写入后可能是上一版布局。未安装 NumPy 或尚未算好时返回 None。"""
+        if np is None:
+            return None
+        from . import stamps
+
+        current = stamps.get_stamps('character_relationship', LAYOUT_STAMP)
+        stamp = current['character_relationship']
+        with self._lock:
+            if self._loaded != current[LAYOUT_STAMP]:
+                # 某个进程写入了新布局（或本进程首次读取）
+                entry = stamps.stamp_cache().get(LAYOUT_CACHE_KEY)
+                if entry is not None:
+                    self._stamp, self._positions = entry
+                self._loaded = current[LAYOUT_STAMP]
+            request = self._stamp != stamp and self._requested != stamp
+            if request:
+                self._requested = stamp
+            positions = self._positions
+        if request:
+            from .jobs import enqueue
+
+            enqueue('graph_layout', key='graph_layout')
+        return positions
+
+    def rebuild(self) -> Optional[int]:
+        """按当前关系图计算布局并写入共享缓存，返回节点数（后台任务中执行）；未安装 NumPy 时返回 None。"""
+        if np is None:
+            return None
+        from . import stamps
+        from .graph import relation_graph
+
+        # 先读变更戳再读边：计算期间有新写入时，布局所依据的变更戳较旧，下次请求会再登记一次
+        stamp = stamps.get_stamp('character_relationship')
+        ids, src, dst = relation_graph.edge_arrays()
+        coords = compute_layout(len(ids), src, dst)
+        positions = {int(cid): (round(float(x), 5), round(float(y), 5)) for cid, (x, y) in zip(ids, coords)}
+        stamps.stamp_cache().set(LAYOUT_CACHE_KEY, (stamp, positions), timeout=None)
+        stamps.bump(LAYOUT_STAMP)
+        return len(positions)
+
+
+layout_cache = LayoutCache()
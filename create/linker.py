@@ -0,0 +1,178 @@
+"""
+实体自动链接：在章节 / 磨难概要中标出角色名、地名，渲染成指向角色页 / 地点页的链接。
+
+- 所有 Character.name、Location.name 预编译成一个 Aho-Corasick 自动机（create/textmatch.py），
+  一次扫描得到全部命中，再按“最左最长”取互不重叠的片段；
+- 标注结果（片段列表）按文本缓存（LRU），有效性取决于：
+  1. 文本本身：条目记下标注时的原文，与本次渲染的文本不同（该章节被编辑过）即失效，不必再读行级变更戳；
+  2. 本进程内：某个名字新增 / 改名 / 删除时，只逐出命中过该实体、或文本中含有新名字的条目，
+     自动机标记为待重建，下次标注时才重新加载名字（写请求中不重建）；
+  3. 跨进程：名字变化另刷新 'entity_names' 变更戳，其他进程发现后整体清空重建。
+  一次渲染中标注多段文本（磨难列表页）时，由模板标签只读一次该变更戳，经 names_stamp 参数传入。
+  只改角色介绍、图片等不影响名字的写入不会让任何标注失效。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe, SafeString
+
+from . import stamps
+from .models import Character, Location
+from .textmatch import Automaton
+
+# 名字集合的变更戳：任何角色 / 地点新增、改名、删除时刷新
+NAMES_STAMP = 'entity_names'
+# 参与链接的实体：kind -> (模型, 详情页 URL 名)；同一片段同时是角色名和地名时优先链接角色
+ENTITY_KINDS = {
+    'character': (Character, 'read_single_character'),
+    'location': (Location, 'read_single_location'),
+}
+_PRIORITY = {kind: i for i, kind in enumerate(ENTITY_KINDS)}
+# 短于此长度的名字不链接（单字误报太多）
+MIN_NAME_LENGTH = 2
+# 最多缓存多少篇文本的标注
+MAX_ENTRIES = 2000
+
+Span = Tuple[int, int, str, int]    # (起始, 结束, kind, 实体 id)
+
+
+def select_spans(matches) -> List[Span]:
+    """从所有（可能重叠的）命中中按最左最长取互不重叠的片段。"""
+    ordered = sorted(matches, key=lambda m: (m[0], m[0] - m[1], _PRIORITY[m[2]], m[3]))
+    spans, last_end = [], 0
+    for start, end, kind, entity_id in ordered:
+        if start >= last_end:
+            spans.append((start, end, kind, entity_id))
+            last_end = end
+    return spans
+
+
+class EntityLinker:
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self._lock = threading.RLock()
+        self._max_entries = max_entries
+        self._automaton: Optional[Automaton] = None
+        self._names: Dict[Tuple[str, int], str] = {}
+        self._names_stamp: Optional[int] = None
+        self._dirty = False                          # 本进程改过名字，自动机待重建
+        # (文本 kind, 文本 id) -> (原文, 片段列表)
+        self._entries: 'OrderedDict[Tuple[str, Any], Tuple[str, List[Span]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # 自动机
+    # ------------------------------------------------------------------
+    def _build(self):
+        names = {}
+        automaton = Automaton()
+        for kind, (model, _) in ENTITY_KINDS.items():
+            for entity_id, name in model.objects.values_list('id', 'name').iterator():
+                names[(kind, entity_id)] = name
+                name = (name or '').strip()
+                if len(name) >= MIN_NAME_LENGTH:
+                    automaton.add(name, (kind, entity_id))
+        self._automaton, self._names = automaton.build(), names
+        self._dirty = False
+
+    def _ensure_fresh(self, current: int):
+        """
+        名字集合在其他进程被修改过（current 为当前的 NAMES_STAMP；或从未构建）时，重建自动机并清空全部标注；
+        只是本进程改过名字时，重建自动机，on_name_changed 未逐出的标注继续有效。
+        """
+        if self._automaton is None or self._names_stamp != current:
+            self._build()
+            self._entries.clear()
+            self._names_stamp = current
+        elif self._dirty:
+            self._build()
+
+    # ------------------------------------------------------------------
+    # signals 回调
+    # ------------------------------------------------------------------
+    def known_name(self, kind: str, entity_id: int) -> Optional[str]:
+        with self._lock:
+            return self._names.get((kind, entity_id)) if self._automaton is not None else None
+
+    def on_name_changed(self, kind: str, entity_id: int, new_name: Optional[str]):
+        """
+        某个实体新增 / 改名（new_name 为新名字）或删除（new_name 为 None）之后调用，
+        调用前 signals 已刷新 NAMES_STAMP。只逐出受影响的标注，其余条目继续有效。
+        """
+        with self._lock:
+            if self._automaton is None:
+                return
+            if new_name is None:
+                self._names.pop((kind, entity_id), None)
+            else:
+                self._names[(kind, entity_id)] = new_name
+            new_name = (new_name or '').strip()
+            for key, (text, spans) in list(self._entries.items()):
+                if any(s[2] == kind and s[3] == entity_id for s in spans) or (
+                        len(new_name) >= MIN_NAME_LENGTH and new_name in text):
+                    del self._entries[key]
+            # 重新加载全部名字、编译自动机留到下次标注时（_ensure_fresh），不占用写请求
+            self._dirty = True
+            self._names_stamp = stamps.get_stamp(NAMES_STAMP)
+
+    def on_text_changed(self, doc_kind: str, doc_id: Any):
+        with self._lock:
+            self._entries.pop((doc_kind, doc_id), None)
+
+    # ------------------------------------------------------------------
+    # 标注
+    # ------------------------------------------------------------------
+    def spans(self, doc_kind: str, doc_id: Any, text: str, names_stamp: Optional[int] = None) -> List[Span]:
+        """
+        返回文本 (doc_kind, doc_id) 中的实体片段 [(起始, 结束, kind, id), ...]，按位置升序。
+        names_stamp 为调用方已读到的 NAMES_STAMP（不传时读取一次）。
+        """
+        text = text or ''
+        if names_stamp is None:
+            names_stamp = stamps.get_stamp(NAMES_STAMP)
+        key = (doc_kind, doc_id)
+        with self._lock:
+            self._ensure_fresh(names_stamp)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == text:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            spans = select_spans((start, end, kind, entity_id)
+                                 for start, end, (kind, entity_id) in self._automaton.finditer(text))
+            self._entries[key] = (text, spans)
+            if len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return spans
+
+    def link(self, doc_kind: str, doc_id: Any, text: str, names_stamp: Optional[int] = None) -> SafeString:
+        """把文本中的实体名渲染成链接，其余部分做 HTML 转义；返回 SafeString（可继续接 |linebreaks）。"""
+        text = text or ''
+        parts, pos = [], 0
+        for start, end, kind, entity_id in self.spans(doc_kind, doc_id, text, names_stamp):
+            parts.append(escape(text[pos:start]))
+            url = reverse(ENTITY_KINDS[kind][1], args=[entity_id])
+            parts.append(f'<a class="entity-link entity-{kind}" href="{url}">{escape(text[start:end])}</a>')
+            pos = end
+        parts.append(escape(text[pos:]))
+        return mark_safe(''.join(parts))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'names': len(self._names),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# 进程内唯一的链接器实例
+entity_linker = EntityLinker()
@@ -0,0 +1,81 @@
+"""
+地点 → 章节反向索引：回答“火焰山出现在哪几回”，无需扫描 Chapter_Location。
+
+Chapter_Location 原本只按 章节 → 地点 方向查询（Query.single_chapter）。这里在首次使用时
+用一条按 (location_id, chapter_id) 排序的查询整表载入，得到 {location_id: 升序的回合号数组}；
+之后 signals 在 Chapter_Location 插入 / 删除时用二分插入增量维护，其他进程的写入通过
+'chapter_location' 变更戳发现并整体重载。
+
+单次查询直接从内存返回；索引未建立时只需走 (location_id, chapter_id) 联合索引的一条查询。
+"""
+import bisect
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from . import stamps
+from .models import Chapter_Location
+
+
+class LocationIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chapters: Dict[int, array] = {}   # location_id -> array('l') 升序回合号
+        self._stamp: Optional[int] = None       # 载入时 'chapter_location' 的变更戳
+
+    def _load(self):
+        stamp = stamps.get_stamp('chapter_location')
+        chapters: Dict[int, array] = {}
+        rows = (Chapter_Location.objects.order_by('location_id', 'chapter_id')
+                .values_list('location_id', 'chapter_id'))
+        for location_id, chapter_number in rows.iterator(chunk_size=5000):
+            chapters.setdefault(location_id, array('l')).append(chapter_number)
+        self._chapters, self._stamp = chapters, stamp
+
+    def _ensure_fresh(self):
+        if self._stamp != stamps.get_stamp('chapter_location'):
+            self._load()
+
+    def on_saved(self, instance):
+        """signals 回调：新增一条章节-地点关联（仅在索引已建立时）。"""
+        with self._lock:
+            if self._stamp is None:
+                return
+            numbers = self._chapters.setdefault(instance.location_id, array('l'))
+            pos = bisect.bisect_left(numbers, instance.chapter_id)
+            if pos == len(numbers) or numbers[pos] != instance.chapter_id:
+                numbers.insert(pos, instance.chapter_id)
+            self._stamp = stamps.get_stamp('chapter_location')
+
+    def on_deleted(self, instance):
+        with self._lock:
+            if self._stamp is None:
+                return
+            numbers = self._chapters.get(instance.location_id)
+            if numbers is not None:
+                pos = bisect.bisect_left(numbers, instance.chapter_id)
+                if pos < len(numbers) and numbers[pos] == instance.chapter_id:
+                    del numbers[pos]
+                if not numbers:
+                    del self._chapters[instance.location_id]
+            self._stamp = stamps.get_stamp('chapter_location')
+
+    def chapters(self, location_id: int) -> List[int]:
+        """返回地点出现过的回合号（升序）；从未出现过时返回空列表。"""
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._chapters.get(location_id, ()))
+
+    def first_appearance(self, location_id: int) -> Optional[int]:
+        """地点首次出现的回合号。"""
+        numbers = self.chapters(location_id)
+        return numbers[0] if numbers else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'locations': len(self._chapters), 'links': sum(len(v) for v in self._chapters.values())}
+
+
+# 进程内唯一的索引实例
+location_index = LocationIndex()
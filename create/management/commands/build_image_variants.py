@@ -0,0 +1,46 @@
+"""
+为已有的角色 / 武器图片生成衍生图（见 create/images.py），并打印各尺寸的总字节数。
+
+    python manage.py build_image_variants
+    python manage.py build_image_variants --force     # 已生成过的也重新生成
+
+之后上传的图片由 save() 在后台自动生成，无需再次执行。
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from create.images import VARIANTS, FORMATS, process_image
+from create.models import Character, Weapon
+
+
+class Command(BaseCommand):
+    help = '为已有的角色 / 武器图片生成 card / detail / original 三种尺寸的 WebP 与 JPEG 衍生图'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='衍生图已是最新的也重新生成')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        done, failed = 0, 0
+        sizes = {(variant, fmt): 0 for variant in VARIANTS for fmt in FORMATS}
+        for model in (Character, Weapon):
+            for pk, image, variants in model.objects.exclude(image='').exclude(image__isnull=True) \
+                    .order_by('pk').values_list('pk', 'image', 'image_variants'):
+                if not options['force'] and (variants or {}).get('source') == image:
+                    continue
+                try:
+                    variants = process_image(model, pk, image)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{model._meta.model_name} {pk} {image}: {e}")
+                    continue
+                if variants:
+                    done += 1
+                    for variant in VARIANTS:
+                        for fmt in FORMATS:
+                            sizes[variant, fmt] += variants[variant]['bytes'][fmt]
+        self.stdout.write(f"生成 {done} 张图片的衍生图，失败 {failed} 张，耗时 {time.perf_counter() - start:.2f}s")
+        for variant in VARIANTS:
+            self.stdout.write(f"  {variant:<8} " + '  '.join(f"{fmt} {sizes[variant, fmt] / 1024:.0f} KB"
+                                                          for fmt in FORMATS))
@@ -0,0 +1,27 @@
+"""
+生成读模型快照（见 create/snapshot.py），写入 settings.READ_SNAPSHOT_PATH 或 --path 指定的文件。
+
+    python manage.py build_snapshot
+    python manage.py build_snapshot --path /var/lib/jtw/read_model.snap
+
+之后的写入由 signals 在事务提交后自动重新生成，无需再次手动执行。
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from create.snapshot import build_snapshot, snapshot_path, RECORDS
+
+
+class Command(BaseCommand):
+    help = '把读模型（角色、章节、地点、磨难、关系及其索引）序列化为可 mmap 的快照文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='快照文件路径（默认 settings.READ_SNAPSHOT_PATH）')
+
+    def handle(self, *args, **options):
+        path = options['path'] or snapshot_path()
+        if not path:
+            raise CommandError('未配置 READ_SNAPSHOT_PATH，请用 --path 指定快照文件路径')
+        stats = build_snapshot(path)
+        counts = '，'.join(f"{name} {stats[name]}" for name in RECORDS)
+        self.stdout.write(f"快照已写入 {stats['path']}（{stats['bytes'] / (1 << 20):.2f} MB，"
+                          f"耗时 {stats['seconds']:.2f}s）：{counts}")
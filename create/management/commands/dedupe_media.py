@@ -0,0 +1,67 @@
+"""
+把启用内容寻址存储（create/storage.py）之前上传的角色 / 武器图片及其衍生图迁入存储：按内容去重，
+改写数据库中的文件名，并打印迁移前后占用的磁盘空间。
+
+    python manage.py dedupe_media
+    python manage.py dedupe_media --delete-legacy     # 迁移后删除原来的文件
+
+可以重复执行，已经迁入的行会跳过。
+"""
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from create.images import VARIANTS, FORMATS
+from create.models import Character, Weapon
+from create.signals import touch
+from create.storage import ContentAddressedStorage, is_immutable
+
+
+class Command(BaseCommand):
+    help = '把旧的角色 / 武器图片按内容去重迁入内容寻址存储'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-legacy', action='store_true', help='迁移后删除原来的文件')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("settings.STORAGES['default'] 不是 create.storage.ContentAddressedStorage")
+        self.legacy = {}
+        rows = 0
+        for model in (Character, Weapon):
+            for pk, image, variants in model.objects.exclude(image='').exclude(image__isnull=True) \
+                    .order_by('pk').values_list('pk', 'image', 'image_variants'):
+                if is_immutable(image) or not default_storage.exists(image):
+                    continue
+                new_image = self._migrate(image)
+                variants = dict(variants or {})
+                if variants.get('source') == image:
+                    variants['source'] = new_image
+                    for variant in VARIANTS:
+                        entry = variants.get(variant)
+                        if entry:
+                            variants[variant] = {**entry, **{fmt: self._migrate(entry[fmt]) for fmt in FORMATS}}
+                model.objects.filter(pk=pk).update(image=new_image, image_variants=variants)
+                touch(model, model.objects.get(pk=pk))
+                rows += 1
+
+        legacy_bytes = sum(self.legacy.values())
+        stats = default_storage.stats()
+        self.stdout.write(f"迁移 {rows} 行、{len(self.legacy)} 个旧文件（{legacy_bytes / 1024:.0f} KB）；"
+                          f"存储现有 {stats['blobs']} 个文件（{stats['bytes'] / 1024:.0f} KB），"
+                          f"被引用 {stats['references']} 次")
+        if options['delete_legacy']:
+            for name in self.legacy:
+                # 绕过引用计数直接删除：旧文件不在 Media_Blob 中
+                os.remove(default_storage.path(name))
+            self.stdout.write(f"已删除 {len(self.legacy)} 个旧文件")
+
+    def _migrate(self, name: str) -> str:
+        """把旧文件存进内容寻址存储（引用计数加一），返回新名字。"""
+        if is_immutable(name):
+            return name
+        with default_storage.open(name, 'rb') as file:
+            new_name = default_storage.save(name, file)
+        self.legacy[name] = default_storage.size(name)
+        return new_name
@@ -0,0 +1,59 @@
+"""
+找出同一无向角色对、同一关系类型的重复关系（A→B 与 B→A、或同向重复录入），保留 id 最小的一条。
+迁移 0022 给关系表加 (pair_low, pair_high, relationship_type) 唯一约束前，库里不能有这样的重复：
+
+    python manage.py dedupe_relationships            # 只列出重复记录
+    python manage.py dedupe_relationships --delete   # 删除重复记录（保留 id 最小的一条）
+    python manage.py migrate
+
+只读取 id / 两端角色 / 关系类型这几列，迁移 0022 之前、之后都可以执行。
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from create import stamps
+from create.models import Character_Relationship
+
+
+def find_duplicates():
+    """返回 [(重复的关系 id, 保留的关系 id, 两端角色 id)]。"""
+    kept = {}
+    duplicates = []
+    rows = Character_Relationship.objects.order_by('id').values_list(
+        'id', 'from_character_id', 'to_character_id', 'relationship_type_id')
+    for rel_id, from_id, to_id, type_id in rows.iterator(chunk_size=10000):
+        key = (min(from_id, to_id), max(from_id, to_id), type_id)
+        if key in kept:
+            duplicates.append((rel_id, kept[key], (from_id, to_id)))
+        else:
+            kept[key] = rel_id
+    return duplicates
+
+
+class Command(BaseCommand):
+    help = '列出 / 删除同一无向角色对、同一关系类型的重复关系'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='删除重复记录（保留 id 最小的一条）')
+
+    def handle(self, *args, **options):
+        duplicates = find_duplicates()
+        if not duplicates:
+            self.stdout.write("没有重复的关系")
+            return
+        for rel_id, kept_id, _ in duplicates:
+            self.stdout.write(f"  关系 {rel_id} 与关系 {kept_id} 重复")
+        if not options['delete']:
+            self.stdout.write(f"共 {len(duplicates)} 条重复关系；加 --delete 删除")
+            return
+        ids = [rel_id for rel_id, _, _ in duplicates]
+        table = connection.ops.quote_name(Character_Relationship._meta.db_table)
+        # 直接执行 DELETE：QuerySet.delete() 会读出整行，迁移 0022 之前表里还没有 pair_low / pair_high 列
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(ids), 1000):
+                batch = ids[start:start + 1000]
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+        # 不经过 signals：按 signals.row_stamps 的约定刷新关系表与两端角色关系列表的变更戳
+        characters = {cid for _, _, pair in duplicates for cid in pair}
+        stamps.bump('character_relationship', *(f'character_rel:{cid}' for cid in characters))
+        self.stdout.write(f"已删除 {len(ids)} 条重复关系：{', '.join(map(str, ids))}")
@@ -0,0 +1,87 @@
+"""
+后台任务 worker：不断领取 Job 表中到期的任务（见 create/jobs.py），交给线程池或进程池执行。
+
+    python manage.py run_jobs                          # JOB_WORKERS 个线程
+    python manage.py run_jobs --pool process --workers 4
+    python manage.py run_jobs --once                   # 执行完当前到期的任务后退出（cron / 部署脚本用）
+
+可以同时运行多个 worker（多台机器也可以），任务按条件 UPDATE 领取，不会重复执行。
+Ctrl-C / SIGTERM 后不再领取新任务，等正在执行的任务结束再退出。
+"""
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from create import jobs, stamps
+
+# 两次清理已完成任务之间的秒数
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = '执行后台任务队列中的任务（图片衍生图、快照重建等）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOB_WORKERS', 2))
+        parser.add_argument('--pool', choices=('thread', 'process'), default=getattr(settings, 'JOB_POOL', 'thread'))
+        parser.add_argument('--poll', type=float, default=1.0, help='没有任务时的轮询间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='执行完当前到期的任务后退出')
+
+    def handle(self, *args, **options):
+        workers, worker = max(options['workers'], 1), jobs.worker_name()
+        if options['pool'] == 'process':
+            # 子进程不能继承父进程的数据库连接
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=jobs.init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jtw-job')
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        self.stdout.write(f"worker {worker} 启动：{options['pool']} × {workers}，队列 {jobs.stats()}")
+        if isinstance(stamps.stamp_cache(), LocMemCache):
+            # 变更戳（create/stamps.py）只在本进程可见：worker 中的写入不会让 Web 进程的缓存 / 快照失效
+            self.stderr.write("警告：变更戳缓存（settings.CACHES['stamps']）为进程内的 LocMemCache，worker 刷新的变更戳对 Web 进程不可见，"
+                              "请配置共享缓存后端（memcached / redis / 文件缓存）")
+
+        results, in_flight, last_purge = {}, set(), 0.0
+        try:
+            while True:
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purged = jobs.purge(getattr(settings, 'JOB_KEEP_DAYS', 7))
+                    if purged:
+                        self.stdout.write(f"清理已完成任务 {purged} 个")
+                    last_purge = time.monotonic()
+                claimed = []
+                if not self.stopping and len(in_flight) < workers:
+                    try:
+                        claimed = jobs.claim(worker, workers - len(in_flight))
+                    except DatabaseError as e:
+                        self.stderr.write(f"领取任务失败，稍后重试: {e}")
+                        connections.close_all()
+                for job_id in claimed:
+                    in_flight.add(pool.submit(jobs.run_job, job_id, worker))
+                if not in_flight and (self.stopping or options['once']):
+                    break
+                # 刚领到任务时只等一个任务结束就再领；队列空时按轮询间隔等待
+                done, in_flight = wait(in_flight, timeout=None if len(in_flight) >= workers else
+                                       (0 if claimed else options['poll']), return_when=FIRST_COMPLETED)
+                if not in_flight and not done and not claimed:
+                    time.sleep(options['poll'])
+                for future in done:
+                    status = future.exception() and 'error' or future.result()
+                    results[status] = results.get(status, 0) + 1
+        except KeyboardInterrupt:
+            self.stdout.write('收到中断，等待正在执行的任务结束……')
+            wait(in_flight)
+        finally:
+            pool.shutdown(wait=True)
+        summary = '，'.join(f"{status} {count}" for status, count in sorted(results.items())) or '无'
+        self.stdout.write(f"worker {worker} 退出：{summary}")
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,55 @@
+"""
+本地读写分离演练用：把 SQLite 主库整库复制到 SQLite 副本（JTW_DB_PROFILE=sqlite-replica，见 settings.py）。
+
+    python manage.py sync_replica                 # 复制一次
+    python manage.py sync_replica --interval 1    # 每秒复制一次，模拟有延迟的异步复制
+
+用 sqlite3 的在线备份接口复制，主库可以同时被读写。MySQL 副本由数据库自身的复制维护，不需要本命令。
+"""
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from jtw_info_management.db_routers import replica_alias
+
+
+def copy_sqlite(source: str, target: str) -> float:
+    """把 source 库整库备份到 target，返回耗时（秒）。"""
+    start = time.perf_counter()
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = '把 SQLite 主库复制到 SQLite 副本（本地读写分离演练用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='大于 0 时每隔这么多秒复制一次，直到 Ctrl-C')
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            raise CommandError('DATABASES 中没有副本，请设置 JTW_DB_PROFILE=sqlite-replica')
+        primary, replica = connections['default'].settings_dict, connections[alias].settings_dict
+        if not (primary['ENGINE'].endswith('sqlite3') and replica['ENGINE'].endswith('sqlite3')):
+            raise CommandError('主库和副本都必须是 SQLite；MySQL 副本由数据库复制维护')
+
+        interval = options['interval']
+        while True:
+            seconds = copy_sqlite(str(primary['NAME']), str(replica['NAME']))
+            self.stdout.write(f"已复制 {primary['NAME']} -> {replica['NAME']}（{seconds * 1000:.0f} ms）")
+            if interval <= 0:
+                return
+            try:
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,215 @@
+"""
+角色提及与共现：回答“哪些角色同时出现的章节最多”。
+
+流程：
+1. 用全部角色名构建一个 Aho-Corasick 自动机（create/textmatch.py），一次扫描每篇
+   Chapter.summary / Calamity.summary，得到 角色 × 文本 的出现次数，写入 Character_Mention；
+2. 由提及表构造稀疏的 角色 × 章节 0/1 矩阵 M，共现矩阵即 C = M·Mᵀ（对角线为各角色出现的章节数）。
+   安装了 SciPy 时用 scipy.sparse 计算，否则退回纯 Python 按章节两两计数，结果相同。
+
+增量维护（由 signals 调用，仅在提及表已生成后）：
+- 单个章节 / 磨难写入：用缓存的全名自动机只重扫这一篇；
+- 单个角色新增 / 改名：只用该角色的名字重扫各篇，只改写该角色的提及记录；要扫描全部文本，
+  由 signals 登记到后台任务队列（create/jobs.py 的 rescan_mentions），不在写请求中执行。
+匹配是重叠的（见 textmatch），因此增量结果与全量重建一致。
+
+全量重建：python manage.py build_mentions
+"""
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import stamps
+from .models import Chapter, Calamity, Character, Character_Mention
+from .textmatch import Automaton
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # SciPy 未安装：共现矩阵退回纯 Python 计数
+    np = None
+    sparse = None
+
+# 参与扫描的文本：来源 -> (模型, 主键字段)
+SOURCES = {
+    'chapter': (Chapter, 'chapter_number'),
+    'calamity': (Calamity, 'id'),
+}
+# 短于此长度的名字（单字）误报太多，不参与匹配
+MIN_NAME_LENGTH = 2
+BATCH_SIZE = 2000
+
+_lock = threading.Lock()
+_automaton: Tuple[Optional[int], Optional[Automaton]] = (None, None)   # ('character' 变更戳, 自动机)
+_built: Tuple[Optional[int], bool] = (None, False)                        # ('character_mention' 变更戳, 是否已生成)
+
+
+def build_automaton(names: Iterable[Tuple[int, str]]) -> Automaton:
+    """由 (角色 id, 名字) 构建自动机；同名角色各自都会被计数。"""
+    automaton = Automaton()
+    for character_id, name in names:
+        name = (name or '').strip()
+        if len(name) >= MIN_NAME_LENGTH:
+            automaton.add(name, character_id)
+    return automaton.build()
+
+
+def count_mentions(automaton: Automaton, text: str) -> Counter:
+    """返回 {角色 id: 出现次数}。"""
+    return Counter(value for _, _, value in automaton.finditer(text or ''))
+
+
+def character_automaton() -> Automaton:
+    """当前全部角色名的自动机，按 'character' 变更戳缓存。"""
+    global _automaton
+    stamp = stamps.get_stamp('character')
+    with _lock:
+        if _automaton[0] != stamp:
+            _automaton = (stamp, build_automaton(Character.objects.values_list('id', 'name').iterator()))
+        return _automaton[1]
+
+
+def is_built() -> bool:
+    """
+    提及表是否已生成过（未生成时 signals 不做增量维护）。
+    每次写入角色 / 章节 / 磨难都要判断一次，结果按 'character_mention' 变更戳缓存，不必每次查询数据库。
+    """
+    global _built
+    stamp = stamps.get_stamp('character_mention')
+    if _built[0] != stamp:
+        _built = (stamp, Character_Mention.objects.exists())
+    return _built[1]
+
+
+def _documents(kind: str):
+    model, key = SOURCES[kind]
+    return model.objects.values_list(key, 'summary').iterator(chunk_size=BATCH_SIZE)
+
+
+def _rows(kind: str, doc_id: int, counts: Counter) -> List[Character_Mention]:
+    return [Character_Mention(character_id=cid, source=kind, source_id=doc_id, count=n)
+            for cid, n in counts.items()]
+
+
+def rebuild_all() -> Dict[str, int]:
+    """全量重建提及表，返回 {'names', 'documents', 'mentions'} 统计。"""
+    automaton = character_automaton()
+    rows: List[Character_Mention] = []
+    documents = 0
+    for kind in SOURCES:
+        for doc_id, summary in _documents(kind):
+            rows.extend(_rows(kind, doc_id, count_mentions(automaton, summary)))
+            documents += 1
+    with transaction.atomic():
+        Character_Mention.objects.all().delete()
+        Character_Mention.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    stamps.bump('character_mention')
+    return {'names': automaton.patterns, 'documents': documents, 'mentions': len(rows)}
+
+
+def rescan_document(kind: str, doc_id: int, text: str):
+    """重扫单篇文本（章节 / 磨难写入后）。"""
+    counts = count_mentions(character_automaton(), text)
+    with transaction.atomic():
+        Character_Mention.objects.filter(source=kind, source_id=doc_id).delete()
+        Character_Mention.objects.bulk_create(_rows(kind, doc_id, counts))
+    stamps.bump('character_mention')
+
+
+def remove_document(kind: str, doc_id: int):
+    Character_Mention.objects.filter(source=kind, source_id=doc_id).delete()
+    stamps.bump('character_mention')
+
+
+def rescan_character(character_id: int, name: str):
+    """角色新增 / 改名后，只用这一个名字重扫各篇文本，只改写该角色的提及记录。"""
+    automaton = build_automaton([(character_id, name)])
+    rows = []
+    for kind in SOURCES:
+        for doc_id, summary in _documents(kind):
+            count = count_mentions(automaton, summary)[character_id]
+            if count:
+                rows.append(Character_Mention(character_id=character_id, source=kind, source_id=doc_id, count=count))
+    with transaction.atomic():
+        Character_Mention.objects.filter(character_id=character_id).delete()
+        Character_Mention.objects.bulk_create(rows)
+    stamps.bump('character_mention')
+
+
+# ----------------------------------------------------------------------
+# 共现
+# ----------------------------------------------------------------------
+def cooccurrence_pairs(mentions: Iterable[Tuple[int, Any]]):
+    """
+    mentions 为 (角色 id, 文本键) 序列，返回三个等长序列 (角色 a, 角色 b, 共同出现的文本数)，a < b。
+    有 SciPy 时为 NumPy 数组（C = M·Mᵀ 的上三角），否则为列表。
+    """
+    mentions = set(mentions)
+    if sparse is not None and mentions:
+        characters = np.array(sorted({cid for cid, _ in mentions}), dtype=np.int64)
+        row_of = {cid: i for i, cid in enumerate(characters.tolist())}
+        col_of: Dict[Any, int] = {}
+        rows = np.fromiter((row_of[cid] for cid, _ in mentions), dtype=np.int64, count=len(mentions))
+        cols = np.fromiter((col_of.setdefault(doc, len(col_of)) for _, doc in mentions),
+                           dtype=np.int64, count=len(mentions))
+        matrix = sparse.csr_matrix((np.ones(len(mentions), dtype=np.int32), (rows, cols)),
+                                   shape=(len(characters), len(col_of)))
+        shared = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+        return characters[shared.row], characters[shared.col], shared.data
+
+    by_document: Dict[Any, List[int]] = {}
+    for cid, doc in mentions:
+        by_document.setdefault(doc, []).append(cid)
+    pairs: Counter = Counter()
+    for cids in by_document.values():
+        cids.sort()
+        for i, a in enumerate(cids):
+            for b in cids[i + 1:]:
+                pairs[(a, b)] += 1
+    return [a for a, _ in pairs], [b for _, b in pairs], list(pairs.values())
+
+
+def rank_pairs(mentions: Iterable[Tuple[int, Any]], limit: int = 20,
+               character_id: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    按共同出现数降序（相同时按角色 id 升序）取前 limit 对：[(角色 a, 角色 b, 共同出现数), ...]。
+    character_id 不为空时只保留含该角色的角色对，并把该角色放在 a。
+    """
+    first, second, counts = cooccurrence_pairs(mentions)
+    if np is not None and isinstance(counts, np.ndarray):
+        if character_id is not None:
+            keep = (first == character_id) | (second == character_id)
+            first, second, counts = first[keep], second[keep], counts[keep]
+            second = np.where(first == character_id, second, first)
+            first = np.full_like(second, character_id)
+        order = np.lexsort((second, first, -counts))[:limit]
+        return [(int(first[i]), int(second[i]), int(counts[i])) for i in order]
+
+    triples = list(zip(first, second, counts))
+    if character_id is not None:
+        triples = [(character_id, b if a == character_id else a, n) for a, b, n in triples if character_id in (a, b)]
+    triples.sort(key=lambda item: (-item[2], item[0], item[1]))
+    return triples[:limit]
+
+
+def top_cooccurrence(limit: int = 20, character_id: Optional[int] = None,
+                     kinds: Tuple[str, ...] = ('chapter',)) -> List[Tuple[int, int, int]]:
+    """
+    共同出现文本数最多的角色对：[(角色 a, 角色 b, 共同出现数), ...]，按共同出现数降序。
+    character_id 不为空时只看与该角色同时出现的角色（返回的 a 恒为该角色）。
+    """
+    mentions = Character_Mention.objects.filter(source__in=kinds)
+    if character_id is not None:
+        # 只取该角色出现过的文本，按来源分别过滤（章节号与磨难 id 会重叠）
+        docs: Dict[str, List[int]] = {}
+        for kind, doc_id in mentions.filter(character_id=character_id).values_list('source', 'source_id'):
+            docs.setdefault(kind, []).append(doc_id)
+        condition = Q(pk__in=[])
+        for kind, doc_ids in docs.items():
+            condition |= Q(source=kind, source_id__in=doc_ids)
+        mentions = mentions.filter(condition)
+    rows = mentions.values_list('character_id', 'source', 'source_id').iterator()
+    return rank_pairs(((cid, (kind, doc_id)) for cid, kind, doc_id in rows), limit, character_id)
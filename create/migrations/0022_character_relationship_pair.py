@@ -0,0 +1,70 @@
+# Generated by Django 5.0 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+def check_no_duplicates(apps, schema_editor):
+    """
+    唯一约束要求同一无向对、同一关系类型只有一条记录。有重复时在改表之前停止迁移（不自动删除数据），
+    由 python manage.py dedupe_relationships 列出 / 删除后再迁移。
+    """
+    Character_Relationship = apps.get_model("create", "Character_Relationship")
+    seen = set()
+    duplicates = []
+    rows = Character_Relationship.objects.order_by("id").values_list(
+        "id", "from_character_id", "to_character_id", "relationship_type_id")
+    for rel_id, from_id, to_id, type_id in rows.iterator():
+        key = (min(from_id, to_id), max(from_id, to_id), type_id)
+        if key in seen:
+            duplicates.append(rel_id)
+        seen.add(key)
+    if duplicates:
+        raise RuntimeError(
+            f"character_relationship 中有 {len(duplicates)} 条重复关系（同一无向角色对、同一关系类型），"
+            f"id: {', '.join(map(str, duplicates[:20]))}{' …' if len(duplicates) > 20 else ''}。"
+            "请先执行 python manage.py dedupe_relationships 查看，"
+            "确认后用 python manage.py dedupe_relationships --delete 删除，再重新执行 migrate。"
+        )
+
+
+def fill_canonical_pair(apps, schema_editor):
+    """回填无向规范键（重复记录已由 check_no_duplicates 排除）。"""
+    Character_Relationship = apps.get_model("create", "Character_Relationship")
+    for rel in Character_Relationship.objects.order_by("id").iterator():
+        low = min(rel.from_character_id, rel.to_character_id)
+        high = max(rel.from_character_id, rel.to_character_id)
+        Character_Relationship.objects.filter(id=rel.id).update(pair_low=low, pair_high=high)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0021_remove_character_relationship_subordinate_and_more"),
+    ]
+
+    operations = [
+        # 放在改表之前：MySQL 的 DDL 不在事务中，检查失败时表结构保持不变，删除重复后可直接重新迁移
+        migrations.RunPython(check_no_duplicates, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="character_relationship",
+            name="pair_high",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="规范键：较大角色 ID"
+            ),
+        ),
+        migrations.AddField(
+            model_name="character_relationship",
+            name="pair_low",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="规范键：较小角色 ID"
+            ),
+        ),
+        migrations.RunPython(fill_canonical_pair, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="character_relationship",
+            constraint=models.UniqueConstraint(
+                fields=("pair_low", "pair_high", "relationship_type"),
+                name="unique_relationship_pair_type",
+            ),
+        ),
+    ]
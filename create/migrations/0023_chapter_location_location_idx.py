@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0022_character_relationship_pair"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chapter_location",
+            index=models.Index(
+                fields=["location", "chapter"], name="chapter_loc_location_idx"
+            ),
+        ),
+    ]
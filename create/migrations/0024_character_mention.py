@@ -0,0 +1,59 @@
+# Generated by Django 5.0 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0023_chapter_location_location_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Character_Mention",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("chapter", "章节"), ("calamity", "磨难")],
+                        max_length=10,
+                        verbose_name="来源",
+                    ),
+                ),
+                ("source_id", models.IntegerField(verbose_name="来源编号")),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=1, verbose_name="出现次数"),
+                ),
+                (
+                    "character",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mentions",
+                        to="create.character",
+                        verbose_name="角色",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "角色提及",
+                "verbose_name_plural": "角色提及列表",
+                "db_table": "character_mention",
+                "indexes": [
+                    models.Index(
+                        fields=["source", "source_id"],
+                        name="character_mention_source_idx",
+                    )
+                ],
+                "unique_together": {("character", "source", "source_id")},
+            },
+        ),
+    ]
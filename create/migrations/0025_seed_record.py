@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0024_character_mention"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Seed_Record",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("source", models.CharField(max_length=20, verbose_name="来源")),
+                ("key", models.CharField(max_length=255, verbose_name="自然键")),
+                ("digest", models.CharField(max_length=40, verbose_name="内容哈希")),
+                (
+                    "object_id",
+                    models.IntegerField(blank=True, null=True, verbose_name="对象主键"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="同步时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "初始数据同步记录",
+                "verbose_name_plural": "初始数据同步记录",
+                "db_table": "seed_record",
+                "unique_together": {("source", "key")},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0025_seed_record"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="character",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, verbose_name="图片衍生图"),
+        ),
+        migrations.AddField(
+            model_name="weapon",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, verbose_name="图片衍生图"),
+        ),
+    ]
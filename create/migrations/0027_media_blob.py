@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-18 20:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0026_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Media_Blob",
+            fields=[
+                (
+                    "digest",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="内容哈希",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, verbose_name="文件名")),
+                ("size", models.BigIntegerField(verbose_name="字节数")),
+                ("refcount", models.IntegerField(default=0, verbose_name="引用次数")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="创建时间"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "媒体文件",
+                "verbose_name_plural": "媒体文件",
+                "db_table": "media_blob",
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-18 21:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0027_media_blob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(max_length=50, verbose_name="任务类型")),
+                ("payload", models.JSONField(blank=True, default=dict, verbose_name="参数")),
+                ("key", models.CharField(blank=True, max_length=200, null=True, unique=True, verbose_name="幂等键")),
+                ("status", models.CharField(choices=[("pending", "待执行"), ("running", "执行中"), ("done", "已完成"), ("failed", "失败")], default="pending", max_length=10, verbose_name="状态")),
+                ("attempts", models.IntegerField(default=0, verbose_name="已执行次数")),
+                ("max_attempts", models.IntegerField(default=5, verbose_name="最多执行次数")),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now, verbose_name="最早执行时间")),
+                ("locked_by", models.CharField(blank=True, default="", max_length=100, verbose_name="执行者")),
+                ("locked_at", models.DateTimeField(blank=True, null=True, verbose_name="开始执行时间")),
+                ("last_error", models.TextField(blank=True, default="", verbose_name="最近错误")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="创建时间")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="完成时间")),
+            ],
+            options={
+                "verbose_name": "后台任务",
+                "verbose_name_plural": "后台任务",
+                "db_table": "job",
+                "indexes": [models.Index(fields=["status", "run_after"], name="job_status_run_after")],
+            },
+        ),
+    ]
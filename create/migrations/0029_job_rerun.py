@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("create", "0028_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="rerun",
+            field=models.BooleanField(default=False, verbose_name="执行后再执行一次"),
+        ),
+    ]
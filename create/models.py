@@ -11,6 +11,7 @@ class Character(models.Model):
     - id: 主键，自增整数（Django 默认 AutoField，从 1 开始自增）。显示时自动补零为 6 位（如 000001）。
     - name: 角色名称，必填。
     - image: 角色图片，支持 PNG/JPG 上传。
+    - image_variants: 图片的各尺寸 WebP / JPEG 衍生图（见 create/images.py）。
     - race: 种族，选择 人/妖/仙。
     - ability: 角色能力描述。
     - intro: 角色介绍。
@@ -36,6 +37,8 @@ class Character(models.Model):
     intro = models.TextField(verbose_name='介绍', help_text='请输入角色详细介绍')
 
     organization = models.CharField(max_length=100, verbose_name='组织名称', help_text='请输入组织名称',default='无组织')
+    # 图片衍生图（card / detail / original × WebP / JPEG），上传后由 create/images.py 在后台生成
+    image_variants = models.JSONField(default=dict, blank=True, verbose_name='图片衍生图')
 
     # 可选字段
     created_at = models.DateTimeField(default=timezone.now, verbose_name='创建时间')
@@ -56,8 +59,11 @@ class Character(models.Model):
         return f"{self.id:06d}"
 
     def save(self, *args, **kwargs):
-        # 可选：保存前图片处理（如缩放），需安装 Pillow
         super().save(*args, **kwargs)
+        # 图片是新上传的（衍生图不是由当前图片生成的）：提交后在后台生成衍生图，不占用请求线程
+        if self.image and self.image_variants.get('source') != self.image.name:
+            from .images import schedule_variants
+            schedule_variants(self)
 
 
 class Weapon(models.Model):
@@ -68,6 +74,7 @@ class Weapon(models.Model):
     - id: 主键，自增整数（Django 默认 AutoField，从 1 开始自增）。显示时自动补零为 6 位（如 000001）。
     - name: 武器名称，必填。
     - image: 武器图片，支持 PNG/JPG 上传。
+    - image_variants: 图片的各尺寸 WebP / JPEG 衍生图（见 create/images.py）。
     - description: 武器描述。
     - owner_character: 拥有者，外键指向 Character 模型。
     - created_at: 创建时间（自动）。
@@ -79,6 +86,8 @@ class Weapon(models.Model):
     name = models.CharField(max_length=100, verbose_name='武器名称', help_text='请输入武器名称')
     image = models.ImageField(upload_to='weapons/%Y/%m/%d/', verbose_name='武器图片',
                               help_text='上传 PNG/JPG 格式图片')
+    # 图片衍生图，同 Character.image_variants
+    image_variants = models.JSONField(default=dict, blank=True, verbose_name='图片衍生图')
     description = models.TextField(verbose_name='描述', help_text='请输入武器详细描述')
     owner_character = models.ForeignKey(Character,
         on_delete=models.SET_NULL,
@@ -109,8 +118,11 @@ class Weapon(models.Model):
         return f"{self.id:06d}"
 
     def save(self, *args, **kwargs):
-        # 可选：保存前图片处理（如缩放），需安装 Pillow
         super().save(*args, **kwargs)
+        # 图片是新上传的（衍生图不是由当前图片生成的）：提交后在后台生成衍生图，不占用请求线程
+        if self.image and self.image_variants.get('source') != self.image.name:
+            from .images import schedule_variants
+            schedule_variants(self)
 
     @classmethod
     def all_weapon(cls,
@@ -150,29 +162,28 @@ class Weapon(models.Model):
             return queryset  # 返回 QuerySet，适合链式调用
 
         # 序列化为字典列表（推荐给 API / 模板使用）
-        result = []
-        for weapon in queryset.select_related('owner_character'):
-            item = {
-                "id": weapon.id,
-                "formatted_id": weapon.formatted_id,
-                "name": weapon.name,
-                "description": weapon.description or "",
-                "created_at": weapon.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "owner": weapon.owner_character,
+        return [weapon.as_dict(include_owner) for weapon in queryset.select_related('owner_character')]
+
+    def as_dict(self, include_owner: bool = True) -> Dict[str, Any]:
+        """单把武器的字典形式（all_weapon 与流式导出共用）"""
+        item = {
+            "id": self.id,
+            "formatted_id": self.formatted_id,
+            "name": self.name,
+            "description": self.description or "",
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "owner": self.owner_character,
+        }
+
+        if include_owner and self.owner_character:
+            item["owner"] = {
+                "id": self.owner_character.id,
+                "name": self.owner_character.name,
+                "avatar": self.owner_character.avatar.url if hasattr(self.owner_character, 'avatar') and self.owner_character.avatar else None
             }
-
-            if include_owner and weapon.owner_character:
-                item["owner"] = {
-                    "id": weapon.owner_character.id,
-                    "name": weapon.owner_character.name,
-                    "avatar": weapon.owner_character.avatar.url if hasattr(weapon.owner_character, 'avatar') and weapon.owner_character.avatar else None
-                }
-            elif include_owner:
-                item["owner"] = {"id": None, "name": "无主", "avatar": None}
-
-            result.append(item)
-
-        return result
+        elif include_owner:
+            item["owner"] = {"id": None, "name": "无主", "avatar": None}
+        return item
 
     # 可选：快速获取 JSON 字符串（用于 API）
     @classmethod
@@ -230,6 +241,9 @@ class Character_Relationship(models.Model):
     - from_character_id: 关系发起方，外键指向 Character 模型。
     - to_character_id: 关系接收方，外键指向 Character 模型。
     - relationship_type_id: 关系类型，外键指向 Relationship_Type 模型。
+    - pair_low / pair_high: 无向规范键，即 min/max(from_character_id, to_character_id)，由 save() 自动维护。
+      (pair_low, pair_high, relationship_type) 上有唯一索引：A→B 与 B→A 的同类关系只能存一条。
+      注意 bulk_create() 不经过 save()，批量写入前需用 canonical_pair() 自行填充。
     """
 
     # 显式定义自增 ID 主键
@@ -263,14 +277,28 @@ class Character_Relationship(models.Model):
         help_text='关系类型',
     )
 
+    # 无向规范键（较小 / 较大的角色 id）
+    pair_low = models.IntegerField(verbose_name='规范键：较小角色 ID', default=0, editable=False)
+    pair_high = models.IntegerField(verbose_name='规范键：较大角色 ID', default=0, editable=False)
+
     class Meta:
         verbose_name = '人物关系'
         verbose_name_plural = '人物关系列表'
+        constraints = [
+            models.UniqueConstraint(fields=['pair_low', 'pair_high', 'relationship_type'],
+                                    name='unique_relationship_pair_type'),
+        ]
 
     def __str__(self):
         return f"{self.from_character.name} → {self.to_character.name} ({self.relationship_type})"
 
+    @staticmethod
+    def canonical_pair(from_character_id: int, to_character_id: int) -> tuple:
+        """返回无向规范键 (较小 id, 较大 id)。"""
+        return min(from_character_id, to_character_id), max(from_character_id, to_character_id)
+
     def save(self, *args, **kwargs):
+        self.pair_low, self.pair_high = self.canonical_pair(self.from_character_id, self.to_character_id)
         super().save(*args, **kwargs)
 
 class Location(models.Model):
@@ -354,6 +382,10 @@ class Chapter_Location(models.Model):
         verbose_name_plural = '章节地点关联列表'
         unique_together = ('chapter', 'location')  # 防止重复关联
         ordering = ['chapter__chapter_number', 'location__name']
+        # 地点 → 章节方向的查询（location_index）走此联合索引，按回合号有序且无需回表
+        indexes = [
+            models.Index(fields=['location', 'chapter'], name='chapter_loc_location_idx'),
+        ]
 
     def __str__(self):
         return f"{self.chapter.title} - {self.location.name}"
@@ -384,3 +416,143 @@ class Relationship_Type(models.Model):
 
     def __str__(self):
         return self.type
+
+
+class Character_Mention(models.Model):
+    """
+    角色-章节提及表：由 create/mentions.py 用 Aho-Corasick 扫描 Chapter.summary / Calamity.summary 生成。
+
+    字段说明：
+    - character: 被提及的角色。
+    - source: 文本来源，'chapter'（章节要略）或 'calamity'（磨难概要）。
+    - source_id: 来源主键（章节为 chapter_number，磨难为 id）。
+    - count: 角色名在该文本中出现的次数。
+    """
+    SOURCE_CHOICES = [
+        ('chapter', '章节'),
+        ('calamity', '磨难'),
+    ]
+
+    id = models.AutoField(primary_key=True, verbose_name='ID')
+    character = models.ForeignKey(
+        'Character',
+        on_delete=models.CASCADE,
+        verbose_name='角色',
+        related_name='mentions'
+    )
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, verbose_name='来源')
+    source_id = models.IntegerField(verbose_name='来源编号')
+    count = models.PositiveIntegerField(default=1, verbose_name='出现次数')
+
+    class Meta:
+        db_table = 'character_mention'
+        verbose_name = '角色提及'
+        verbose_name_plural = '角色提及列表'
+        unique_together = ('character', 'source', 'source_id')
+        # 增量重扫单篇文本时按来源删除旧记录
+        indexes = [
+            models.Index(fields=['source', 'source_id'], name='character_mention_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.character_id} @ {self.source}:{self.source_id} ×{self.count}"
+
+
+class Seed_Record(models.Model):
+    """
+    初始数据同步记录：initial_data 中每条源记录的内容哈希，供 create/seeding.py 增量同步使用。
+
+    字段说明：
+    - source: 数据来源，如 'character'、'weapon'、'relationship'；'file' 表示整文件哈希。
+    - key: 源记录在文件中的自然键（人物 / 武器 / 地名、回合号、磨难序号、关系三元组等）。
+    - digest: 源记录规范化 JSON 的 SHA-1。
+    - object_id: 对应数据库行的主键（整文件哈希为空）。
+    """
+    id = models.AutoField(primary_key=True, verbose_name='ID')
+    source = models.CharField(max_length=20, verbose_name='来源')
+    key = models.CharField(max_length=255, verbose_name='自然键')
+    digest = models.CharField(max_length=40, verbose_name='内容哈希')
+    object_id = models.IntegerField(null=True, blank=True, verbose_name='对象主键')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='同步时间')
+
+    class Meta:
+        db_table = 'seed_record'
+        verbose_name = '初始数据同步记录'
+        verbose_name_plural = '初始数据同步记录'
+        unique_together = ('source', 'key')
+
+    def __str__(self):
+        return f"{self.source}:{self.key} ({self.digest[:8]})"
+
+
+class Media_Blob(models.Model):
+    """
+    内容寻址存储（create/storage.py）中的一个文件：按内容的 SHA-256 只存一份，引用计数归零时删除。
+
+    字段说明：
+    - digest: 文件内容的 SHA-256（十六进制），主键。
+    - name: 文件在存储中的名字，如 'blobs/3f/a2/3fa2....jpg'。
+    - size: 文件字节数。
+    - refcount: 引用次数：每次 save() 加一（一个图片字段 / 一张衍生图各算一次），delete() 减一。
+    - created_at: 首次写入时间。
+    """
+    digest = models.CharField(max_length=64, primary_key=True, verbose_name='内容哈希')
+    name = models.CharField(max_length=255, verbose_name='文件名')
+    size = models.BigIntegerField(verbose_name='字节数')
+    refcount = models.IntegerField(default=0, verbose_name='引用次数')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='创建时间')
+
+    class Meta:
+        db_table = 'media_blob'
+        verbose_name = '媒体文件'
+        verbose_name_plural = '媒体文件'
+
+    def __str__(self):
+        return f"{self.name} ({self.size} 字节, 引用 {self.refcount})"
+
+
+class Job(models.Model):
+    """
+    后台任务队列（create/jobs.py）中的一个任务：写入事务提交后登记，由 python manage.py run_jobs 执行。
+
+    字段说明：
+    - kind: 任务类型，即 create/jobs.py 中 @task 注册的名字，如 'image_variants'。
+    - payload: 任务参数（JSON）。
+    - key: 幂等键：同一个键同时只有一个待执行的任务，重复登记只更新参数（如同一角色连续换图只处理最后一张）。
+    - status: pending 待执行 / running 执行中 / done 已完成 / failed 重试用尽。
+    - attempts: 已执行次数；max_attempts: 最多执行次数。
+    - run_after: 最早执行时间（失败重试按指数退避推后）。
+    - locked_by / locked_at: 执行中的 worker 与开始时间，超过 JOB_TIMEOUT 视为 worker 已退出，任务可被重新领取。
+    - last_error: 最近一次失败的异常信息。
+    - rerun: 执行期间同一个键又被登记：本次执行结束后改回待执行再执行一次（不会被另一个 worker 同时执行）。
+    """
+    STATUS_CHOICES = [
+        ('pending', '待执行'),
+        ('running', '执行中'),
+        ('done', '已完成'),
+        ('failed', '失败'),
+    ]
+
+    id = models.AutoField(primary_key=True, verbose_name='ID')
+    kind = models.CharField(max_length=50, verbose_name='任务类型')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='参数')
+    key = models.CharField(max_length=200, null=True, blank=True, unique=True, verbose_name='幂等键')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    attempts = models.IntegerField(default=0, verbose_name='已执行次数')
+    max_attempts = models.IntegerField(default=5, verbose_name='最多执行次数')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='最早执行时间')
+    locked_by = models.CharField(max_length=100, blank=True, default='', verbose_name='执行者')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='开始执行时间')
+    last_error = models.TextField(blank=True, default='', verbose_name='最近错误')
+    rerun = models.BooleanField(default=False, verbose_name='执行后再执行一次')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='创建时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    class Meta:
+        db_table = 'job'
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        indexes = [models.Index(fields=['status', 'run_after'], name='job_status_run_after')]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status}, 第 {self.attempts} 次)"
@@ -0,0 +1,112 @@
+"""
+导入流水线的规整 / 校验阶段：把解析出的记录分批交给进程池处理，主进程作为唯一的写库方。
+
+批量导入中，每条人物 / 武器记录的字段映射（种族、组织的默认值等）、关系的展开
+（superiors / subordinates → (上级, 下级, 关系)）以及“名字是否存在”的引用检查都是纯 CPU 工作。
+这里把它们写成只依赖记录本身和一个共享名字集合的纯函数：
+- 名字集合在进程池启动时通过 initializer 交给每个工作进程一次（fork 时不复制），不随每批传输；
+- 主进程按提交顺序取回结果并写库，最多保持 workers × 2 批在途，内存占用仍与文件大小无关；
+- workers <= 1、或记录总数不足 PARALLEL_MIN_RECORDS（如自带的几十条 initial_data）时直接在主进程内执行，
+  不启动进程池；进程数不超过批次数。
+
+本模块不访问数据库、不导入 Django 模型，spawn 方式启动的工作进程也能直接导入。
+"""
+import os
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+# 记录总数少于此值时不启动进程池：启动进程、传输名字集合的开销超过并行的收益
+PARALLEL_MIN_RECORDS = 20000
+
+# 工作进程内的共享名字集合（引用检查用）
+_names: FrozenSet[str] = frozenset()
+
+
+def _init_worker(names: FrozenSet[str]):
+    global _names
+    _names = names
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def prepare_characters(batch: List[dict]) -> Tuple[List[dict], int]:
+    """人物记录 → Character 字段（去空白、补默认值），返回 (字段列表, 无效条数)。"""
+    rows, invalid = [], 0
+    for item in batch:
+        name = (item.get('name') or '').strip()
+        if not name:
+            invalid += 1
+            continue
+        rows.append({
+            'name': name,
+            'race': item.get('type', '仙'),
+            'ability': item.get('ability', ''),
+            'intro': item.get('introduction', ''),
+            'organization': item.get('organization', '无组织'),
+        })
+    return rows, invalid
+
+
+def prepare_weapons(batch: List[dict]) -> Tuple[List[Tuple[str, str, str]], int]:
+    """武器记录 → (名称, 介绍, 拥有者名)，拥有者须在名字集合中；返回 (列表, 跳过条数)。"""
+    rows, skipped = [], 0
+    for item in batch:
+        name = item.get('name')
+        owner = (item.get('owner') or '').strip()
+        if not name or owner not in _names or 'introduction' not in item:
+            skipped += 1
+            continue
+        rows.append((name, item['introduction'], owner))
+    return rows, skipped
+
+
+def expand_relationships(batch: List[dict]) -> Tuple[List[Tuple[str, str, str]], int]:
+    """人物记录的 superiors / subordinates → (上级, 下级, 关系)，两端都须在名字集合中；返回 (边, 跳过条数)。"""
+    edges, skipped = [], 0
+    for item in batch:
+        name = item.get('name')
+        if not name:
+            continue
+        candidates = [(sup, name, rel) for sup, rel in (item.get('superiors') or {}).items()]
+        candidates += [(name, sub, rel) for sub, rel in (item.get('subordinates') or {}).items()]
+        for edge in candidates:
+            if edge[0] in _names and edge[1] in _names:
+                edges.append(edge)
+            else:
+                skipped += 1
+    return edges, skipped
+
+
+def parallel_map(func: Callable, batches: Iterable[list], workers: Optional[int] = None,
+                 names: FrozenSet[str] = frozenset()) -> Iterator:
+    """按顺序产出 func(batch) 的结果；func 须为本模块的顶层函数（工作进程按名字导入）。"""
+    workers = default_workers() if workers is None else workers
+    batches = iter(batches)
+    # 先取出开头的批次，数据量确实够大时才启动进程池
+    head, records = [], 0
+    for batch in batches:
+        head.append(batch)
+        records += len(batch)
+        if records >= PARALLEL_MIN_RECORDS and len(head) >= workers:
+            break
+    else:
+        # 全部批次都已取出
+        workers = min(workers, len(head)) if records >= PARALLEL_MIN_RECORDS else 1
+    batches = chain(head, batches)
+    if workers <= 1:
+        _init_worker(names)
+        for batch in batches:
+            yield func(batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(names,)) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(func, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
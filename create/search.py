@@ -0,0 +1,221 @@
+"""
+全文检索：基于字二元组（bigram）的倒排索引 + BM25 排序。
+
+中文没有空格分词，直接把连续汉字切成相邻两字的二元组（“孙悟空” → “孙悟”“悟空”），
+无需分词器即可获得不错的召回；英文 / 数字按单词切分。建索引时另外收录每个汉字的单字，
+单字查询（如“火”“猴”）才能命中多字的文本；多字查询只用二元组，不受单字的干扰。覆盖的字段：
+- Chapter: title + summary
+- Calamity: title + summary
+- Character: name + ability + intro
+- Location: name + description
+- Weapon: name + description
+
+索引在首次查询时从数据库一次性构建，之后由 signals 在模型 save / delete 时增量更新单篇文档。
+其他进程写入的数据通过变更戳发现，按模型整表重建。
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple, Any, Optional
+
+from . import stamps
+from .models import Chapter, Calamity, Character, Location, Weapon
+
+# 汉字连续片段 / 英文数字单词
+_CJK_RUN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+_WORD = re.compile(r'[0-9a-zA-Z]+')
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 标题 / 名称中的词另以此前缀单独建倒排（相当于独立字段），使“孙悟空”优先命中孙悟空本人
+TITLE_PREFIX = '#'
+
+
+def tokenize(text: str) -> List[str]:
+    """把查询切成检索词：汉字二元组（单字片段保留单字）+ 小写英文单词。"""
+    if not text:
+        return []
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(word.lower() for word in _WORD.findall(text))
+    return tokens
+
+
+def index_terms(text: str) -> List[str]:
+    """建索引用的检索词：tokenize() 的结果再加上多字片段中的每个单字。"""
+    if not text:
+        return []
+    tokens = tokenize(text)
+    tokens.extend(char for run in _CJK_RUN.findall(text) if len(run) > 1 for char in run)
+    return tokens
+
+
+# 每种文档：模型、取出的字段、标题字段
+DOC_SOURCES = {
+    'chapter': (Chapter, ('chapter_number', 'title', 'summary'), 'title'),
+    'calamity': (Calamity, ('id', 'title', 'summary'), 'title'),
+    'character': (Character, ('id', 'name', 'ability', 'intro'), 'name'),
+    'location': (Location, ('id', 'name', 'description'), 'name'),
+    'weapon': (Weapon, ('id', 'name', 'description'), 'name'),
+}
+
+MODEL_KINDS = {model: kind for kind, (model, _, _) in DOC_SOURCES.items()}
+
+
+class SearchIndex:
+    """
+    倒排索引：term -> {doc_no: tf}。
+    doc_no 是内部连续编号，文档删除后编号不复用；_doc_terms 记录每篇文档的词频，用于增量删除。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._docs: Dict[int, Dict[str, Any]] = {}    # doc_no -> {'kind', 'id', 'title', 'text'}
+        self._doc_no: Dict[Tuple[str, Any], int] = {}  # (kind, id) -> doc_no
+        self._next_no = 0
+        self._total_len = 0
+        self._stamps: Dict[str, int] = {}               # 建索引时各模型的变更戳
+
+    # ------------------------------------------------------------------
+    # 文档增删
+    # ------------------------------------------------------------------
+    def _remove(self, key: Tuple[str, Any]):
+        doc_no = self._doc_no.pop(key, None)
+        if doc_no is None:
+            return
+        for term in self._doc_terms.pop(doc_no):
+            postings = self._postings[term]
+            del postings[doc_no]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_no)
+        del self._docs[doc_no]
+
+    def _add(self, kind: str, row: Dict[str, Any]):
+        _, fields, title_field = DOC_SOURCES[kind]
+        doc_id = row[fields[0]]
+        key = (kind, doc_id)
+        self._remove(key)
+
+        text = '\n'.join(str(row[field] or '') for field in fields[1:])
+        terms = Counter(index_terms(text))
+        for term in index_terms(str(row[title_field] or '')):
+            terms[TITLE_PREFIX + term] += 1
+        doc_no = self._next_no
+        self._next_no += 1
+
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_no] = tf
+        self._doc_terms[doc_no] = terms
+        length = sum(terms.values())
+        self._doc_len[doc_no] = length
+        self._total_len += length
+        self._docs[doc_no] = {'kind': kind, 'id': doc_id, 'title': row[title_field], 'text': text}
+        self._doc_no[key] = doc_no
+
+    def _rebuild_kind(self, kind: str):
+        model, fields, _ = DOC_SOURCES[kind]
+        stamp = stamps.get_stamp(model._meta.model_name)
+        for key in [key for key in self._doc_no if key[0] == kind]:
+            self._remove(key)
+        for row in model.objects.values(*fields).iterator(chunk_size=2000):
+            self._add(kind, row)
+        self._stamps[kind] = stamp
+
+    def _ensure_fresh(self):
+        """首次使用时建索引；其他进程写入导致变更戳变化时，整表重建对应模型。"""
+        current = stamps.get_stamps(*(model._meta.model_name for model, _, _ in DOC_SOURCES.values()))
+        for kind, (model, _, _) in DOC_SOURCES.items():
+            if self._stamps.get(kind) != current[model._meta.model_name]:
+                self._rebuild_kind(kind)
+
+    def on_saved(self, instance):
+        """signals 回调：单篇文档增量更新（仅在索引已建立时）。"""
+        kind = MODEL_KINDS[type(instance)]
+        with self._lock:
+            if kind not in self._stamps:
+                return
+            _, fields, _ = DOC_SOURCES[kind]
+            self._add(kind, {field: getattr(instance, field) for field in fields})
+            self._stamps[kind] = stamps.get_stamp(type(instance)._meta.model_name)
+
+    def on_deleted(self, instance):
+        kind = MODEL_KINDS[type(instance)]
+        with self._lock:
+            if kind not in self._stamps:
+                return
+            _, fields, _ = DOC_SOURCES[kind]
+            self._remove((kind, getattr(instance, fields[0])))
+            self._stamps[kind] = stamps.get_stamp(type(instance)._meta.model_name)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def search(self, query: str, limit: int = 20, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 检索，返回按得分降序的结果列表：
+        [{'kind': str, 'id': int, 'title': str, 'score': float, 'snippet': str}, ...]
+        kinds 可限定文档类型（如 ['chapter', 'calamity']）。
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            self._ensure_fresh()
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            avg_len = self._total_len / doc_count
+
+            scores: Dict[int, float] = {}
+            for term in terms | {TITLE_PREFIX + term for term in terms}:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc_no, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_no] / avg_len)
+                    scores[doc_no] = scores.get(doc_no, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            if kinds:
+                scores = {doc_no: score for doc_no, score in scores.items() if self._docs[doc_no]['kind'] in kinds}
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [self._result(doc_no, score, terms) for doc_no, score in top]
+
+    def _result(self, doc_no: int, score: float, terms) -> Dict[str, Any]:
+        doc = self._docs[doc_no]
+        return {
+            'kind': doc['kind'],
+            'id': doc['id'],
+            'title': doc['title'],
+            'score': round(score, 4),
+            'snippet': _snippet(doc['text'], terms),
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {'documents': len(self._docs), 'terms': len(self._postings)}
+
+
+def _snippet(text: str, terms, width: int = 40) -> str:
+    """截取第一个命中词附近的一段文字作为摘要。"""
+    positions = [pos for pos in (text.find(term) for term in terms) if pos >= 0]
+    start = max(min(positions) - width // 2, 0) if positions else 0
+    snippet = text[start:start + width * 2].replace('\n', ' ')
+    return ('…' if start > 0 else '') + snippet + ('…' if start + width * 2 < len(text) else '')
+
+
+# 进程内唯一的索引实例
+search_index = SearchIndex()
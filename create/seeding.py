@@ -0,0 +1,500 @@
+"""
+initial_data 增量同步：按内容哈希只写入发生变化的记录，每晚重复导入时几乎不做任何事。
+
+每个数据源（place / chapter / character ...）的每条源记录规范化为要写入的字段值，
+其 SHA-1 与对应行主键记在 Seed_Record 中。同步时与上次的哈希、以及数据库中按自然键
+（地名、回合号、人物名、关系三元组等）找到的行对比，得到计划：
+- 新增：数据库中没有对应的行；
+- 更新：行存在，但哈希变了、或从未被同步记录过（接管此前逐条 / 批量导入的数据）；
+- 删除：上次同步过、这次文件里已经没有的键（不会删除手工在页面上新增的数据）；
+- 未变：哈希与主键都一致，不写入。
+另对每个数据源依赖的文件整体计算哈希（如武器依赖 weapon.json 与 character.json），
+文件都没变时整个数据源直接跳过，连逐条对比都省去；full=True 时强制逐条对比。
+
+dry_run=True 只打印计划、不写数据库：上游数据源计划新增的名字用占位 id 参与下游解析，
+但不模拟级联删除（如删除人物后其武器 / 关系随之删除）。
+
+    python initialize_databases.py --sync [--dry-run] [--full]
+"""
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+
+from . import mentions
+from .jsonstream import RecordReader
+from .models import (Seed_Record, Continent, Location, Chapter, Chapter_Location, Calamity,
+                     Character, Weapon, Character_Relationship, Relationship_Type)
+from .signals import bump_after_bulk
+
+# 整文件哈希在 Seed_Record 中的来源名
+FILE_SOURCE = 'file'
+BATCH_SIZE = 2000
+# dry-run 每类动作最多列出的键数
+SAMPLE_KEYS = 10
+
+
+def digest(values: Dict[str, Any]) -> str:
+    """规范化 JSON（键排序）的 SHA-1。"""
+    text = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def file_digest(paths: List[str]) -> str:
+    """若干文件内容合在一起的 SHA-1（分块读取）。"""
+    sha1 = hashlib.sha1()
+    for path in paths:
+        sha1.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class SyncContext:
+    """一次同步共享的状态：名字 -> id 映射（dry-run 时含占位 id）。"""
+
+    def __init__(self, data_dir: str, dry_run: bool):
+        self.data_dir = data_dir
+        self.dry_run = dry_run
+        self._ids: Dict[str, Dict[Any, int]] = {}
+        self._placeholder = 0
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.data_dir, file_name)
+
+    def load(self, file_name: str, required: Tuple[str, ...] = ()) -> RecordReader:
+        """流式读取（见 jsonstream），每次遍历重新读文件，不把整个文件留在内存里。"""
+        return RecordReader(self.path(file_name), required)
+
+    def ids(self, kind: str) -> Dict[Any, int]:
+        """kind 为 'continent' / 'location' / 'chapter' / 'character' / 'relation_type'。"""
+        if kind not in self._ids:
+            queries = {
+                'continent': Continent.objects.values_list('name', 'id'),
+                'location': Location.objects.values_list('name', 'id'),
+                'chapter': Chapter.objects.values_list('chapter_number', 'chapter_number'),
+                'character': Character.objects.values_list('name', 'id'),
+                'relation_type': Relationship_Type.objects.values_list('type', 'id'),
+            }
+            ids: Dict[Any, int] = {}
+            for name, pk in queries[kind].iterator(chunk_size=BATCH_SIZE):
+                ids.setdefault(name, pk)
+            self._ids[kind] = ids
+        return self._ids[kind]
+
+    def forget(self, kind: str):
+        self._ids.pop(kind, None)
+
+    def planned(self, kind: str, names):
+        """dry-run：上游计划新增的名字先用负数占位 id，下游据此解析外键。"""
+        ids = self.ids(kind)
+        for name in names:
+            if name not in ids:
+                self._placeholder -= 1
+                ids[name] = self._placeholder
+
+
+class Plan:
+    """单个数据源的同步计划。"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.inserts: List[Tuple[str, str, dict]] = []          # (键, 哈希, 字段)
+        self.updates: List[Tuple[str, str, int, dict]] = []     # (键, 哈希, 主键, 字段)
+        self.adopts: List[Tuple[str, str, int]] = []            # 行内容已一致，只记录哈希：(键, 哈希, 主键)
+        self.deletes: List[Tuple[str, int]] = []                # (键, 主键)
+        self.seeded = set()     # 已有同步记录的键（写入新记录前需先删掉旧的）
+        self.unchanged = 0
+        self.skipped = 0
+        self.file_unchanged = False
+        self.file_digest = ''
+        self.seconds = 0.0
+
+    @property
+    def changes(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+class SeedSource(ABC):
+    """
+    一个数据源：files 为依赖的文件（决定整文件哈希），model 为写入的模型，
+    fields 为更新时写入的字段（为空表示只接管、不改写行）。
+    子类实现 records()（产出 (键, 字段值)，无法解析时字段值为 None）、natural_key()、existing()。
+    """
+    name = ''
+    files: Tuple[str, ...] = ()
+    model = None
+    fields: Tuple[str, ...] = ()
+    # 本数据源的名字供下游解析：SyncContext.ids() 的 kind 与字段值中的名字字段
+    provides: Optional[Tuple[str, str]] = None
+
+    @abstractmethod
+    def records(self, ctx: SyncContext) -> Iterator[Tuple[str, Optional[dict]]]:
+        """产出 (键, 字段值)，无法解析（如引用的人物不存在）时字段值为 None。"""
+
+    @abstractmethod
+    def natural_key(self, values: dict):
+        """字段值对应的自然键（与 existing() 的键一致）。"""
+
+    @abstractmethod
+    def existing(self, ctx: SyncContext) -> Dict[Any, int]:
+        """数据库中 自然键 -> 主键。"""
+
+    def row_stamps(self, pks: List[int]) -> List[str]:
+        """这些行变化时需刷新的行级变更戳（见 signals.row_stamps）。"""
+        return []
+
+    def ensure(self, ctx: SyncContext):
+        """规划前的准备（如补建关系类型），dry-run 时只登记占位 id。"""
+
+
+def _pairs(queryset) -> Dict[Any, int]:
+    result: Dict[Any, int] = {}
+    for *key, pk in queryset.iterator(chunk_size=BATCH_SIZE):
+        result.setdefault(key[0] if len(key) == 1 else tuple(key), pk)
+    return result
+
+
+class LocationSource(SeedSource):
+    name, files, model = 'place', ('place.json',), Location
+    fields = ('description', 'continent_id')
+    provides = ('location', 'name')
+
+    def records(self, ctx):
+        continents = ctx.ids('continent')
+        for item in ctx.load('place.json', ('地名',)):
+            name = (item.get('地名') or '').strip()
+            if name:
+                yield name, {'name': name, 'description': item.get('介绍', ''),
+                             'continent_id': continents.get(item.get('所属大洲'), continents.get('无'))}
+
+    def natural_key(self, values):
+        return values['name']
+
+    def existing(self, ctx):
+        return _pairs(Location.objects.values_list('name', 'id'))
+
+
+class ChapterSource(SeedSource):
+    name, files, model = 'chapter', ('chapter.json',), Chapter
+    fields = ('title', 'summary')
+    provides = ('chapter', 'chapter_number')
+
+    def records(self, ctx):
+        for item in ctx.load('chapter.json', ('chapter', 'title', 'summary')):
+            yield str(item['chapter']), {'chapter_number': item['chapter'], 'title': item['title'],
+                                         'summary': item['summary']}
+
+    def natural_key(self, values):
+        return values['chapter_number']
+
+    def existing(self, ctx):
+        return _pairs(Chapter.objects.values_list('chapter_number', 'chapter_number'))
+
+    def row_stamps(self, pks):
+        return [f'chapter:{n}' for n in pks]
+
+
+class ChapterLocationSource(SeedSource):
+    name, files, model = 'chapter_location', ('chapter.json', 'place.json'), Chapter_Location
+
+    def records(self, ctx):
+        chapters, locations = ctx.ids('chapter'), ctx.ids('location')
+        for item in ctx.load('chapter.json', ('chapter',)):
+            for location in item.get('locations', []):
+                chapter_id, location_id = chapters.get(item['chapter']), locations.get(location)
+                values = None
+                if chapter_id is not None and location_id is not None:
+                    values = {'chapter_id': chapter_id, 'location_id': location_id}
+                yield f"{item['chapter']}|{location}", values
+
+    def natural_key(self, values):
+        return values['chapter_id'], values['location_id']
+
+    def existing(self, ctx):
+        return _pairs(Chapter_Location.objects.values_list('chapter_id', 'location_id', 'id'))
+
+    def row_stamps(self, pks):
+        chapters = Chapter_Location.objects.filter(pk__in=pks).values_list('chapter_id', flat=True)
+        return [f'chapter:{n}' for n in set(chapters)]
+
+
+class CalamitySource(SeedSource):
+    # 磨难没有自然键，以文件中的序号（从 1 开始）为主键，与逐条 / 批量导入一致
+    name, files, model = 'calamity', ('calamity.json',), Calamity
+    fields = ('title', 'summary')
+
+    def records(self, ctx):
+        for i, item in enumerate(ctx.load('calamity.json', ('title', 'summary')), 1):
+            yield str(i), {'id': i, 'title': item['title'], 'summary': item['summary']}
+
+    def natural_key(self, values):
+        return values['id']
+
+    def existing(self, ctx):
+        return _pairs(Calamity.objects.values_list('id', 'id'))
+
+    def row_stamps(self, pks):
+        return [f'calamity:{pk}' for pk in pks]
+
+
+class CharacterSource(SeedSource):
+    name, files, model = 'character', ('character.json',), Character
+    fields = ('race', 'ability', 'intro', 'organization')
+    provides = ('character', 'name')
+
+    def records(self, ctx):
+        for item in ctx.load('character.json'):
+            name = (item.get('name') or '').strip()
+            if name:
+                yield name, {'name': name, 'race': item.get('type', '仙'), 'ability': item.get('ability', ''),
+                             'intro': item.get('introduction', ''),
+                             'organization': item.get('organization', '无组织')}
+
+    def natural_key(self, values):
+        return values['name']
+
+    def existing(self, ctx):
+        return _pairs(Character.objects.values_list('name', 'id'))
+
+    def row_stamps(self, pks):
+        return [f'{prefix}:{pk}' for pk in pks for prefix in ('character', 'character_rel')]
+
+
+class WeaponSource(SeedSource):
+    name, files, model = 'weapon', ('weapon.json', 'character.json'), Weapon
+    fields = ('description', 'owner_character_id')
+
+    def records(self, ctx):
+        owners = ctx.ids('character')
+        for item in ctx.load('weapon.json'):
+            name = item.get('name')
+            if not name:
+                continue
+            owner_id = owners.get((item.get('owner') or '').strip())
+            values = None
+            if owner_id is not None and 'introduction' in item:
+                values = {'name': name, 'description': item['introduction'], 'owner_character_id': owner_id}
+            yield name, values
+
+    def natural_key(self, values):
+        return values['name']
+
+    def existing(self, ctx):
+        return _pairs(Weapon.objects.values_list('name', 'id'))
+
+
+class RelationshipSource(SeedSource):
+    """
+    关系来自 character.json 的 superiors / subordinates。键为 “较小名字|较大名字|关系类型”，
+    与无向唯一键 (pair_low, pair_high, relationship_type) 一一对应；关系行没有可改写的字段，
+    已存在的行只接管、不改写方向。
+    """
+    name, files, model = 'relationship', ('character.json',), Character_Relationship
+
+    def _edges(self, ctx) -> Iterator[Tuple[str, str, str]]:
+        for item in ctx.load('character.json'):
+            name = item.get('name')
+            if not name:
+                continue
+            for superior, rel in (item.get('superiors') or {}).items():
+                yield superior, name, rel
+            for subordinate, rel in (item.get('subordinates') or {}).items():
+                yield name, subordinate, rel
+
+    def ensure(self, ctx):
+        # 只为两端人物都存在的关系补建类型：records() 会跳过其余的关系，它们的类型用不上
+        characters, types = ctx.ids('character'), ctx.ids('relation_type')
+        used = {rel for from_name, to_name, rel in self._edges(ctx)
+                if from_name in characters and to_name in characters}
+        new_types = sorted(used - set(types))
+        if not new_types:
+            return
+        print(f"{'将' if ctx.dry_run else ''}创建新关系类型: {'、'.join(new_types)}")
+        if ctx.dry_run:
+            ctx.planned('relation_type', new_types)
+        else:
+            Relationship_Type.objects.bulk_create([Relationship_Type(type=t, description='') for t in new_types])
+            ctx.forget('relation_type')
+
+    def records(self, ctx):
+        characters, types = ctx.ids('character'), ctx.ids('relation_type')
+        for from_name, to_name, rel in self._edges(ctx):
+            key = '|'.join(sorted((from_name, to_name)) + [rel])
+            from_id, to_id = characters.get(from_name), characters.get(to_name)
+            values = None
+            if from_id is not None and to_id is not None:
+                pair_low, pair_high = Character_Relationship.canonical_pair(from_id, to_id)
+                # bulk_create 不经过 save()，需自行填充无向规范键
+                values = {'from_character_id': from_id, 'to_character_id': to_id,
+                          'relationship_type_id': types[rel], 'pair_low': pair_low, 'pair_high': pair_high}
+            yield key, values
+
+    def natural_key(self, values):
+        return values['pair_low'], values['pair_high'], values['relationship_type_id']
+
+    def existing(self, ctx):
+        return _pairs(Character_Relationship.objects.values_list(
+            'pair_low', 'pair_high', 'relationship_type_id', 'id'))
+
+    def row_stamps(self, pks):
+        pairs = Character_Relationship.objects.filter(pk__in=pks).values_list('from_character_id', 'to_character_id')
+        return [f'character_rel:{cid}' for cid in {cid for pair in pairs for cid in pair}]
+
+
+# 按依赖顺序排列：地点、章节先于章节-地点，人物先于武器与关系
+SOURCES = (LocationSource(), ChapterSource(), ChapterLocationSource(), CalamitySource(),
+           CharacterSource(), WeaponSource(), RelationshipSource())
+
+
+def plan_source(source: SeedSource, ctx: SyncContext, full: bool = False) -> Plan:
+    plan = Plan(source.name)
+    plan.file_digest = file_digest([ctx.path(name) for name in source.files])
+    recorded = Seed_Record.objects.filter(source=FILE_SOURCE, key=source.name).values_list('digest', flat=True).first()
+    if recorded == plan.file_digest and not full:
+        plan.file_unchanged = True
+        return plan
+
+    source.ensure(ctx)
+    seeds = {key: (seed_digest, object_id) for key, seed_digest, object_id in
+             Seed_Record.objects.filter(source=source.name).values_list('key', 'digest', 'object_id')
+             .iterator(chunk_size=BATCH_SIZE)}
+    plan.seeded = set(seeds)
+    existing = source.existing(ctx)
+    seen, claimed = set(), set()
+    for key, values in source.records(ctx):
+        if key in seen:
+            continue
+        seen.add(key)
+        if values is None:
+            plan.skipped += 1
+            continue
+        record_digest = digest(values)
+        pk = existing.get(source.natural_key(values))
+        if pk is None:
+            plan.inserts.append((key, record_digest, values))
+            continue
+        claimed.add(pk)
+        if seeds.get(key) == (record_digest, pk):
+            plan.unchanged += 1
+        else:
+            plan.updates.append((key, record_digest, pk, values))
+    _split_adopts(source, plan)
+    for key, (_, object_id) in seeds.items():
+        if key not in seen:
+            plan.deletes.append((key, None if object_id in claimed else object_id))
+    return plan
+
+
+def _batches(items: list) -> Iterator[list]:
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def _split_adopts(source: SeedSource, plan: Plan):
+    """
+    待更新的行中，数据库内容已与文件一致的（多为首次同步时此前导入的数据）改为只接管：
+    按批取出这些行的当前字段值、同样计算哈希，相同则不必 bulk_update。
+    """
+    if not plan.updates:
+        return
+    columns = list(plan.updates[0][3])
+    updates = []
+    for batch in _batches(plan.updates):
+        current = {row.pop('pk'): digest(row) for row in
+                   source.model.objects.filter(pk__in=[pk for _, _, pk, _ in batch]).values('pk', *columns)}
+        for key, record_digest, pk, values in batch:
+            if current.get(pk) == record_digest:
+                plan.adopts.append((key, record_digest, pk))
+            else:
+                updates.append((key, record_digest, pk, values))
+    plan.updates = updates
+
+
+def apply_plan(source: SeedSource, plan: Plan, ctx: SyncContext) -> List[str]:
+    """执行计划（须在事务中），返回需刷新的行级变更戳。"""
+    model = source.model
+    touched: List[str] = []
+    if plan.deletes:
+        pks = [pk for _, pk in plan.deletes if pk is not None]
+        for batch in _batches(pks):
+            touched += source.row_stamps(batch)
+            # 逐行删除，级联与 signals 照常执行
+            model.objects.filter(pk__in=batch).delete()
+        for batch in _batches([key for key, _ in plan.deletes]):
+            Seed_Record.objects.filter(source=source.name, key__in=batch).delete()
+    if plan.updates and source.fields:
+        rows = [model(pk=pk, **values) for _, _, pk, values in plan.updates]
+        model.objects.bulk_update(rows, source.fields, batch_size=BATCH_SIZE)
+    if plan.inserts:
+        model.objects.bulk_create([model(**values) for _, _, values in plan.inserts], batch_size=BATCH_SIZE)
+
+    # MySQL 的 bulk_create 不回填主键：按自然键重新取一次
+    existing = source.existing(ctx) if plan.inserts else {}
+    records = [(key, record_digest, pk) for key, record_digest, pk, _ in plan.updates]
+    records += [(key, record_digest, existing[source.natural_key(values)])
+                for key, record_digest, values in plan.inserts]
+    touched += source.row_stamps([pk for _, _, pk in records])
+    records += plan.adopts
+    for batch in _batches([key for key, _, _ in records if key in plan.seeded]):
+        Seed_Record.objects.filter(source=source.name, key__in=batch).delete()
+    Seed_Record.objects.bulk_create([Seed_Record(source=source.name, key=key, digest=record_digest, object_id=pk)
+                                     for key, record_digest, pk in records], batch_size=BATCH_SIZE)
+    Seed_Record.objects.update_or_create(source=FILE_SOURCE, key=source.name,
+                                         defaults={'digest': plan.file_digest})
+    if source.provides:
+        ctx.forget(source.provides[0])
+    return touched
+
+
+def sync(data_dir: str, dry_run: bool = False, full: bool = False) -> List[Plan]:
+    """
+    按 SOURCES 顺序逐个数据源规划并（非 dry-run 时）执行，全部在一个事务中；
+    返回各数据源的计划。有写入时刷新变更戳，提及表已生成且人物 / 章节 / 磨难有变化时重建提及表。
+    """
+    ctx = SyncContext(data_dir, dry_run)
+    plans: List[Plan] = []
+    touched: List[str] = []
+    with transaction.atomic():
+        for source in SOURCES:
+            start = time.perf_counter()
+            plan = plan_source(source, ctx, full)
+            if dry_run:
+                if source.provides:
+                    kind, field = source.provides
+                    ctx.planned(kind, [values[field] for _, _, values in plan.inserts])
+            elif not plan.file_unchanged:
+                touched += apply_plan(source, plan, ctx)
+            plan.seconds = time.perf_counter() - start
+            plans.append(plan)
+    changed = {plan.source for plan in plans if plan.changes}
+    if not dry_run and changed:
+        bump_after_bulk(touched)
+        if changed & {'chapter', 'calamity', 'character'} and mentions.is_built():
+            mentions.rebuild_all()
+    return plans
+
+
+def print_plan(plans: List[Plan], dry_run: bool = False):
+    print(f"{'新增':>8}{'更新':>8}{'接管':>8}{'删除':>8}{'未变':>8}{'跳过':>8}{'耗时(s)':>10}  数据源")
+    for plan in plans:
+        if plan.file_unchanged:
+            print(f"{'':>48}{plan.seconds:>10.2f}  {plan.source}（文件未变，跳过）")
+            continue
+        print(f"{len(plan.inserts):>8}{len(plan.updates):>8}{len(plan.adopts):>8}{len(plan.deletes):>8}"
+              f"{plan.unchanged:>8}{plan.skipped:>8}{plan.seconds:>10.2f}  {plan.source}")
+    if not dry_run:
+        return
+    for plan in plans:
+        for action, keys in (('新增', [item[0] for item in plan.inserts]),
+                             ('更新', [item[0] for item in plan.updates]),
+                             ('删除', [item[0] for item in plan.deletes])):
+            if keys:
+                more = f" 等 {len(keys)} 条" if len(keys) > SAMPLE_KEYS else ''
+                print(f"[{plan.source}] {action}: {'、'.join(keys[:SAMPLE_KEYS])}{more}")
+    print('dry-run：未写入数据库')
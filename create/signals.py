@@ -0,0 +1,236 @@
+"""
+模型写入信号：任何读模型相关的表发生 save / delete 时刷新对应的变更戳，
+使 Query 结果缓存等派生数据自动失效，逐出引用了该实体的模板片段，并增量维护进程内的各类索引。
+
+变更戳与进程内索引都在事务提交后才更新：事务回滚时不留下痕迹；也不会有读请求在提交前、
+变更戳已刷新时读到旧数据，再以新变更戳缓存下来。变更戳名（行级戳要查关系表）仍在事务内算好。
+
+注意：QuerySet.update() / bulk_create() 不会触发 post_save，批量写入后需调用 bump_after_bulk()。
+"""
+import copy
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import stamps
+from .search import search_index, MODEL_KINDS as SEARCH_MODELS
+from .graph import relation_graph
+from .fragments import fragment_cache
+from .location_index import location_index
+from . import jobs, mentions
+from .linker import entity_linker, NAMES_STAMP, ENTITY_KINDS
+from .autocomplete import name_indexes, name_stamp, NAME_KINDS
+from .snapshot import snapshot_store, SNAPSHOT_MODELS
+from .images import variant_files
+from .storage import release_file
+from .models import (Character, Weapon, Location, Continent, Chapter, Chapter_Location,
+                     Calamity, Character_Relationship, Relationship_Type)
+
+# 读模型涉及的所有表
+READ_MODELS = (Character, Weapon, Location, Continent, Chapter, Chapter_Location,
+               Calamity, Character_Relationship, Relationship_Type)
+# bump_after_bulk 每次 set_many 的戳数
+BUMP_BATCH_SIZE = 5000
+
+
+def model_stamp(model) -> str:
+    """表级变更戳名，即模型的 model_name（如 'character_relationship'）。"""
+    return model._meta.model_name
+
+
+def row_stamps(sender, instance) -> list:
+    """
+    行级变更戳：单个实体页面（如 read_single_character/<id>）只依赖这些戳，编辑一个角色不会让其他角色页失效。
+    - 'character:<id>'     角色本身
+    - 'character_rel:<id>' 角色的关系列表（关系增删、或关系另一端角色改名）
+    - 'character_weapon:<id>' 角色持有的武器列表
+    - 'chapter:<n>'        章节本身及其地点关联
+    - 'calamity:<id>'      磨难本身
+    """
+    if sender is Character:
+        names = [f'character:{instance.pk}']
+        # 关系列表里展示了对方的名字，改名 / 删除时对方的关系列表也要失效
+        related = Character_Relationship.objects.filter(
+            Q(from_character_id=instance.pk) | Q(to_character_id=instance.pk)
+        ).values_list('from_character_id', 'to_character_id')
+        names += {f'character_rel:{cid}' for pair in related for cid in pair}
+        return names
+    if sender is Character_Relationship:
+        return [f'character_rel:{instance.from_character_id}', f'character_rel:{instance.to_character_id}']
+    if sender is Weapon:
+        # 换了拥有者时原拥有者的武器列表也要失效（原拥有者由 remember_old_name 记下）
+        owners = {instance.owner_character_id, getattr(instance, '_old_owner_id', None)}
+        return [f'character_weapon:{cid}' for cid in owners if cid is not None]
+    if sender is Chapter:
+        return [f'chapter:{instance.pk}']
+    if sender is Calamity:
+        return [f'calamity:{instance.pk}']
+    if sender is Chapter_Location:
+        return [f'chapter:{instance.chapter_id}']
+    return []
+
+
+# 名字参与自动补全的模型（角色 / 武器 / 地点）：model -> kind
+NAMED_MODELS = {model: kind for kind, model in NAME_KINDS.items()}
+# 其中参与实体链接的模型（角色 / 地点）
+LINKED_MODELS = {model: kind for kind, (model, _) in ENTITY_KINDS.items()}
+
+
+def _name_stamps(sender) -> tuple:
+    """名字变化时需刷新的变更戳：补全索引的 'names:<kind>'，以及实体链接的 NAMES_STAMP。"""
+    return (name_stamp(NAMED_MODELS[sender]),) + ((NAMES_STAMP,) if sender in LINKED_MODELS else ())
+
+
+def bump_after_bulk(row_names=()) -> None:
+    """
+    bulk_create / bulk_update 之后调用：刷新所有读模型的表级戳与名字戳，以及给定的行级戳
+    （如 'chapter:<n>'），使缓存与其他进程的索引失效；本进程的索引在下次查询时按变更戳重建。
+    """
+    names = {model_stamp(model) for model in READ_MODELS}
+    for model in NAMED_MODELS:
+        names.update(_name_stamps(model))
+    names = sorted(names.union(row_names))
+
+    def bump():
+        for start in range(0, len(names), BUMP_BATCH_SIZE):
+            stamps.bump(*names[start:start + BUMP_BATCH_SIZE])
+        snapshot_store.schedule_rebuild()
+
+    # 不在事务中时立即执行
+    transaction.on_commit(bump, robust=True)
+
+
+def touch(sender, instance) -> None:
+    """
+    不经 save() 改了某一行（如 create/images.py 写回图片衍生图）之后调用：刷新表级 / 行级变更戳、
+    逐出相关片段并重新生成快照；名字、正文没有变化，各索引无需更新。
+    """
+    names = (model_stamp(sender), *row_stamps(sender, instance))
+
+    def bump():
+        stamps.bump(*names)
+        fragment_cache.invalidate(*names)
+        if sender in SNAPSHOT_MODELS:
+            snapshot_store.schedule_rebuild()
+
+    transaction.on_commit(bump, robust=True)
+
+
+def _name_changed(sender, instance, created: bool) -> bool:
+    """角色 / 武器 / 地点是新建的、或名字与保存前不同（保存前的名字由 remember_old_name 记下）。"""
+    return sender in NAMED_MODELS and (created or getattr(instance, '_old_name', None) != instance.name)
+
+
+def _update_mentions(sender, instance, deleted: bool, name_changed: bool = False):
+    """角色 / 章节 / 磨难写入后增量维护提及表（提及表尚未生成时跳过）。"""
+    if sender not in (Character, Chapter, Calamity) or not mentions.is_built():
+        return
+    if sender is Character:
+        if deleted:
+            # 提及记录已随外键级联删除，只需刷新变更戳
+            stamps.bump('character_mention')
+        elif name_changed:
+            # 只改介绍 / 图片等不影响提及，无需重扫；重扫要读全部文本，交给后台任务
+            jobs.enqueue('rescan_mentions', {'character_id': instance.pk}, key=f'rescan_mentions:{instance.pk}')
+        return
+    kind = 'chapter' if sender is Chapter else 'calamity'
+    if deleted:
+        mentions.remove_document(kind, instance.pk)
+    else:
+        mentions.rescan_document(kind, instance.pk, instance.summary)
+
+
+@receiver(pre_save)
+def remember_old_name(sender, instance, **kwargs):
+    """
+    记下角色 / 武器 / 地点保存前的名字（武器另记拥有者，角色 / 武器另记图片），
+    用于判断名字 / 拥有者是否改变、图片是否被替换（按主键查一次）。
+    """
+    if sender is Weapon and instance.pk is not None:
+        old = sender.objects.filter(pk=instance.pk).values_list('name', 'owner_character_id', 'image').first()
+        instance._old_name, instance._old_owner_id, instance._old_image = old or (None, None, None)
+    elif sender is Character and instance.pk is not None:
+        instance._old_name, instance._old_image = (
+            sender.objects.filter(pk=instance.pk).values_list('name', 'image').first() or (None, None))
+    elif sender in NAMED_MODELS and instance.pk is not None:
+        instance._old_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+def _release_images(sender, instance, deleted: bool):
+    """角色 / 武器的图片被替换时释放原图，删除时释放图片及其衍生图（内容寻址存储下引用归零才删除文件）。"""
+    if sender not in (Character, Weapon):
+        return
+    if deleted:
+        for name in (instance.image.name, *variant_files(instance.image_variants)):
+            release_file(name)
+        return
+    old = getattr(instance, '_old_image', None)
+    if old and old != instance.image.name:
+        # 原图的衍生图由 create/images.py 生成新衍生图后释放
+        release_file(old)
+
+
+@receiver(post_save)
+def on_model_saved(sender, instance, created=False, **kwargs):
+    if sender not in READ_MODELS:
+        return
+    _release_images(sender, instance, deleted=False)
+    # 变更戳名与保存前的名字在事务内取得；刷新变更戳、更新索引放到提交之后（见模块说明）
+    name_changed = _name_changed(sender, instance, created)
+    old_name = None if created else getattr(instance, '_old_name', None)
+    names = (model_stamp(sender), *row_stamps(sender, instance)) + (_name_stamps(sender) if name_changed else ())
+    transaction.on_commit(lambda: _after_saved(sender, instance, names, name_changed, old_name), robust=True)
+
+
+def _after_saved(sender, instance, names, name_changed: bool, old_name):
+    # 先刷新变更戳，再更新索引：索引记录的是更新后的变更戳
+    stamps.bump(*names)
+    fragment_cache.invalidate(*names)
+    if sender in SEARCH_MODELS:
+        search_index.on_saved(instance)
+    if sender is Character_Relationship:
+        relation_graph.on_saved(instance)
+    if sender is Chapter_Location:
+        location_index.on_saved(instance)
+    if name_changed:
+        name_indexes[NAMED_MODELS[sender]].on_renamed(old_name, instance.name)
+    if name_changed and sender in LINKED_MODELS:
+        entity_linker.on_name_changed(LINKED_MODELS[sender], instance.pk, instance.name)
+    if sender in (Chapter, Calamity):
+        entity_linker.on_text_changed(model_stamp(sender), instance.pk)
+    _update_mentions(sender, instance, deleted=False, name_changed=name_changed)
+    if sender in SNAPSHOT_MODELS:
+        snapshot_store.schedule_rebuild()
+
+
+@receiver(post_delete)
+def on_model_deleted(sender, instance, **kwargs):
+    if sender not in READ_MODELS:
+        return
+    _release_images(sender, instance, deleted=True)
+    names = (model_stamp(sender), *row_stamps(sender, instance)) + (_name_stamps(sender) if sender in NAMED_MODELS else ())
+    # delete() 结束时会把 instance 的主键置为 None，提交后的回调使用此刻的副本
+    deleted = copy.copy(instance)
+    transaction.on_commit(lambda: _after_deleted(sender, deleted, names), robust=True)
+
+
+def _after_deleted(sender, instance, names):
+    stamps.bump(*names)
+    fragment_cache.invalidate(*names)
+    if sender in SEARCH_MODELS:
+        search_index.on_deleted(instance)
+    if sender is Character_Relationship:
+        relation_graph.on_deleted(instance)
+    if sender is Chapter_Location:
+        location_index.on_deleted(instance)
+    if sender in NAMED_MODELS:
+        name_indexes[NAMED_MODELS[sender]].on_renamed(instance.name, None)
+    if sender in LINKED_MODELS:
+        entity_linker.on_name_changed(LINKED_MODELS[sender], instance.pk, None)
+    if sender in (Chapter, Calamity):
+        entity_linker.on_text_changed(model_stamp(sender), instance.pk)
+    _update_mentions(sender, instance, deleted=True)
+    if sender in SNAPSHOT_MODELS:
+        snapshot_store.schedule_rebuild()
@@ -0,0 +1,487 @@
+"""
+读模型快照：把 read/ 页面用到的全部数据（角色及其关系和武器、章节及其地点、地点及其出场回合、大陆、磨难、
+关系类型）序列化成一个文件，读进程用 mmap 映射后直接作答，不再访问 MySQL。
+
+文件格式（小端）：
+    b'JTWS' + 版本(1 字节) + 3 字节填充 + uint32 头长度 + 头(JSON)
+    若干定长记录表（按 8 字节对齐），头中记录每张表的 [偏移, 条数, 记录长度]
+    字符串堆：所有文本的 UTF-8 字节依次拼接
+- 记录中的文本存为 (堆内偏移 uint64, 字节长度 uint32)，读取时对 mmap 的 memoryview 切片后解码，切片本身不复制；
+- 主记录表按 id 升序，按 id 查找用二分；角色的关系和武器、章节的地点、地点的出场回合存在各自的明细表里，
+  主记录只记 [起始下标, 条数]；
+- 多个工作进程映射同一个文件，共享操作系统页缓存中的同一份页面。
+
+一致性：头中记录生成快照前各依赖表的变更戳。每次读取先比较当前变更戳，有任何表在快照之后被写过
+（本进程或其他进程）就退回数据库查询（即普通的 Query）；signals 在写入事务提交后登记重新生成快照的任务
+（create/jobs.py，由 run_jobs worker 执行），先写临时文件再 os.replace 原子替换，读进程发现文件变了（inode / mtime）就重新映射。
+
+启用：settings.READ_SNAPSHOT_PATH 设为快照文件路径；生成：python manage.py build_snapshot
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.files.storage import default_storage
+
+from . import stamps
+from .models import (Character, Character_Relationship, Relationship_Type, Chapter, Chapter_Location,
+                     Location, Continent, Calamity, Weapon)
+from .images import variant_urls
+from .tools import Query, PAGE_SIZE, MAX_PAGE_SIZE
+
+MAGIC = b'JTWS'
+VERSION = 3
+# 快照覆盖的表（表名同 signals.model_stamp）：任何一张被写过，快照即过期
+SNAPSHOT_MODELS = (Character, Character_Relationship, Relationship_Type, Chapter, Chapter_Location,
+                   Location, Continent, Calamity, Weapon)
+DEPENDS = tuple(model._meta.model_name for model in SNAPSHOT_MODELS)
+
+# 定长记录：S 为字符串引用 (堆内偏移, 字节长度)
+_S = 'QI'
+RECORDS = {
+    # id, 名字, 介绍, 能力, 图片 URL, 衍生图 URL（JSON）, 关系起始下标, 关系条数, 武器起始下标, 武器条数
+    'character': struct.Struct('<q' + _S * 5 + 'IIII'),
+    # 对方角色 id, 关系类型 id, 关系 id, 方向（1 = 本角色为发起方）
+    'character_rel': struct.Struct('<qqqB'),
+    # 武器 id, 武器名
+    'character_weapon': struct.Struct('<q' + _S),
+    # 回合号, 标题, 概要, 地点起始下标, 地点条数
+    'chapter': struct.Struct('<q' + _S * 2 + 'II'),
+    # 地点 id
+    'chapter_location': struct.Struct('<q'),
+    # id, 名字, 描述, 大陆 id（-1 表示无）, 出场回合起始下标, 条数
+    'location': struct.Struct('<q' + _S * 2 + 'qII'),
+    # 回合号
+    'location_chapter': struct.Struct('<q'),
+    # id, 名字, 描述
+    'continent': struct.Struct('<q' + _S * 2),
+    # id, 标题, 概要
+    'calamity': struct.Struct('<q' + _S * 2),
+    # id, 关系名
+    'relationship_type': struct.Struct('<q' + _S),
+}
+_PREFIX = struct.Struct('<4sB3xI')
+BATCH_SIZE = 5000
+
+
+def snapshot_path() -> Optional[str]:
+    path = getattr(settings, 'READ_SNAPSHOT_PATH', None)
+    return str(path) if path else None
+
+
+# ----------------------------------------------------------------------
+# 生成
+# ----------------------------------------------------------------------
+class _Heap:
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def add(self, text: Optional[str]) -> Tuple[int, int]:
+        data = (text or '').encode('utf-8')
+        offset = self.size
+        self.parts.append(data)
+        self.size += len(data)
+        return offset, len(data)
+
+
+def _rows(queryset, *fields):
+    return queryset.values_list(*fields).iterator(chunk_size=BATCH_SIZE)
+
+
+def build_snapshot(path: str) -> Dict[str, Any]:
+    """从数据库生成快照并原子替换 path，返回 {'path', 'bytes', 'seconds', 各表条数}。"""
+    start = time.perf_counter()
+    # 先读变更戳再查询：查询期间若有写入，快照挂在旧戳下，读取时会被判为过期
+    built_stamps = stamps.get_stamps(*DEPENDS)
+    heap = _Heap()
+    tables: Dict[str, List[bytes]] = {name: [] for name in RECORDS}
+
+    def pack(name, *values):
+        tables[name].append(RECORDS[name].pack(*values))
+
+    # 角色及其关系（先 from 后 to，各按关系 id 升序，与 Query.single_character 一致）和武器（按 id 升序）
+    outgoing: Dict[int, List[tuple]] = {}
+    incoming: Dict[int, List[tuple]] = {}
+    relations = Character_Relationship.objects.order_by('id')
+    for rel_id, from_id, to_id, type_id in _rows(relations, 'id', 'from_character_id', 'to_character_id',
+                                                 'relationship_type_id'):
+        outgoing.setdefault(from_id, []).append((to_id, type_id, rel_id, 1))
+        incoming.setdefault(to_id, []).append((from_id, type_id, rel_id, 0))
+    weapons: Dict[int, List[tuple]] = {}
+    for weapon_id, name, owner_id in _rows(Weapon.objects.filter(owner_character__isnull=False).order_by('id'),
+                                           'id', 'name', 'owner_character_id'):
+        weapons.setdefault(owner_id, []).append((weapon_id, name))
+    for character_id, name, intro, ability, image, variants in _rows(
+            Character.objects.order_by('id'), 'id', 'name', 'intro', 'ability', 'image', 'image_variants'):
+        edges = outgoing.pop(character_id, []) + incoming.pop(character_id, [])
+        rel_start = len(tables['character_rel'])
+        for edge in edges:
+            pack('character_rel', *edge)
+        owned = weapons.pop(character_id, [])
+        weapon_start = len(tables['character_weapon'])
+        for weapon_id, weapon_name in owned:
+            pack('character_weapon', weapon_id, *heap.add(weapon_name))
+        url = default_storage.url(image) if image else ''
+        images = variant_urls(image, variants)
+        pack('character', character_id, *heap.add(name), *heap.add(intro), *heap.add(ability), *heap.add(url),
+             *heap.add(json.dumps(images, ensure_ascii=False) if images else ''),
+             rel_start, len(edges), weapon_start, len(owned))
+
+    # 章节及其地点（按地名排序，与 Chapter_Location 的默认排序一致）
+    chapter_locations: Dict[int, List[Tuple[str, int]]] = {}
+    links = Chapter_Location.objects.order_by()
+    location_names = dict(_rows(Location.objects.order_by(), 'id', 'name'))
+    location_chapters: Dict[int, List[int]] = {}
+    for chapter_id, location_id in _rows(links, 'chapter_id', 'location_id'):
+        chapter_locations.setdefault(chapter_id, []).append((location_names.get(location_id, ''), location_id))
+        location_chapters.setdefault(location_id, []).append(chapter_id)
+    for number, title, summary in _rows(Chapter.objects.order_by('chapter_number'),
+                                        'chapter_number', 'title', 'summary'):
+        locations = sorted(chapter_locations.get(number, []))
+        loc_start = len(tables['chapter_location'])
+        for _, location_id in locations:
+            pack('chapter_location', location_id)
+        pack('chapter', number, *heap.add(title), *heap.add(summary), loc_start, len(locations))
+    del location_names
+
+    # 地点及其出场回合（升序）
+    for location_id, name, description, continent_id in _rows(Location.objects.order_by('id'),
+                                                              'id', 'name', 'description', 'continent_id'):
+        numbers = sorted(set(location_chapters.get(location_id, [])))
+        timeline_start = len(tables['location_chapter'])
+        for number in numbers:
+            pack('location_chapter', number)
+        pack('location', location_id, *heap.add(name), *heap.add(description),
+             -1 if continent_id is None else continent_id, timeline_start, len(numbers))
+
+    for continent_id, name, description in _rows(Continent.objects.order_by('id'), 'id', 'name', 'description'):
+        pack('continent', continent_id, *heap.add(name), *heap.add(description))
+    for calamity_id, title, summary in _rows(Calamity.objects.order_by('id'), 'id', 'title', 'summary'):
+        pack('calamity', calamity_id, *heap.add(title), *heap.add(summary))
+    for type_id, name in _rows(Relationship_Type.objects.order_by('id'), 'id', 'type'):
+        pack('relationship_type', type_id, *heap.add(name))
+
+    # 布局：前缀 + 头 + 各记录表 + 字符串堆；头中的偏移需要头长度，先用占位头算一次长度
+    def header_bytes(sections, heap_offset):
+        return json.dumps({'stamps': built_stamps, 'built_at': time.time(), 'sections': sections,
+                           'heap': [heap_offset, heap.size]}).encode('utf-8')
+
+    def layout(header_size):
+        offset = _align(_PREFIX.size + header_size)
+        sections = {}
+        for name, records in tables.items():
+            sections[name] = [offset, len(records), RECORDS[name].size]
+            offset = _align(offset + len(records) * RECORDS[name].size)
+        return sections, offset
+
+    header_size = len(header_bytes(*layout(0))) + 64
+    sections, heap_offset = layout(header_size)
+    header = header_bytes(sections, heap_offset).ljust(header_size)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # 临时文件名唯一：同一进程的多个线程（run_jobs 线程池、build_snapshot）可能同时重新生成
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(_PREFIX.pack(MAGIC, VERSION, len(header)) + header)
+            for name, records in tables.items():
+                file.seek(sections[name][0])
+                file.write(b''.join(records))
+            file.seek(heap_offset)
+            file.write(b''.join(heap.parts))
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    stats = {name: len(records) for name, records in tables.items()}
+    stats.update(path=path, bytes=os.path.getsize(path), seconds=time.perf_counter() - start)
+    return stats
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+# ----------------------------------------------------------------------
+# 读取
+# ----------------------------------------------------------------------
+class _Table:
+    """mmap 上的一张定长记录表。"""
+
+    def __init__(self, view: memoryview, offset: int, count: int, record: struct.Struct):
+        self.view, self.offset, self.count, self.record = view, offset, count, record
+        self._size = record.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index: int) -> tuple:
+        return self.record.unpack_from(self.view, self.offset + index * self._size)
+
+    def key(self, index: int) -> int:
+        """第 index 条记录的首字段（id / 回合号）。"""
+        return struct.unpack_from('<q', self.view, self.offset + index * self._size)[0]
+
+    def find(self, key: int) -> Optional[tuple]:
+        """按首字段二分查找（表按首字段升序）。"""
+        index = bisect.bisect_left(range(self.count), key, key=self.key)
+        if index < self.count and self.key(index) == key:
+            return self[index]
+        return None
+
+    def after(self, key: Optional[int]) -> int:
+        """首字段大于 key 的第一条记录的下标。"""
+        if key is None:
+            return 0
+        return bisect.bisect_right(range(self.count), key, key=self.key)
+
+
+class Snapshot:
+    """一个已映射的快照文件。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.identity = _identity(os.fstat(file.fileno()))
+        self.view = memoryview(self._mmap)
+        magic, version, header_size = _PREFIX.unpack_from(self.view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是 JTWS v{VERSION} 快照")
+        header = json.loads(bytes(self.view[_PREFIX.size:_PREFIX.size + header_size]))
+        self.stamps: Dict[str, int] = header['stamps']
+        self.built_at: float = header['built_at']
+        self.heap = header['heap'][0]
+        self.tables = {name: _Table(self.view, offset, count, RECORDS[name])
+                       for name, (offset, count, _) in header['sections'].items()}
+
+    def text(self, offset: int, length: int) -> str:
+        """字符串堆中的文本：对 memoryview 切片（不复制）后解码。"""
+        start = self.heap + offset
+        return str(self.view[start:start + length], 'utf-8')
+
+    def is_fresh(self) -> bool:
+        """快照之后依赖的表都没有写入过；变更戳在各进程间共享（见 create/stamps.py），其他进程生成的快照同样可用。"""
+        current = stamps.get_stamps(*DEPENDS)
+        return all(current[name] == self.stamps.get(name) for name in DEPENDS)
+
+    def close(self):
+        self.view.release()
+        self._mmap.close()
+
+    # ------------------------------------------------------------------
+    # 与 Query 同结构的查询
+    # ------------------------------------------------------------------
+    def character_name(self, character_id: int) -> str:
+        record = self.tables['character'].find(character_id)
+        return self.text(record[1], record[2]) if record else ''
+
+    def type_name(self, type_id: int) -> str:
+        record = self.tables['relationship_type'].find(type_id)
+        return self.text(record[1], record[2]) if record else ''
+
+    def single_character(self, character_id: int) -> Dict[str, Any]:
+        record = self.tables['character'].find(character_id)
+        if record is None:
+            raise ObjectDoesNotExist(f"未找到 ID 为 {character_id} 的角色")
+        (_, name_off, name_len, intro_off, intro_len, ability_off, ability_len,
+         image_off, image_len, images_off, images_len, rel_start, rel_count, weapon_start, weapon_count) = record
+        rels, weapons = self.tables['character_rel'], self.tables['character_weapon']
+        relationships = []
+        for index in range(rel_start, rel_start + rel_count):
+            other_id, type_id, _, outgoing = rels[index]
+            relationships.append({
+                'direction': 'from' if outgoing else 'to',
+                'related_character': {'id': other_id, 'name': self.character_name(other_id)},
+                'type': self.type_name(type_id),
+            })
+        return {
+            'id': character_id,
+            'name': self.text(name_off, name_len),
+            'intro': self.text(intro_off, intro_len),
+            'ability': self.text(ability_off, ability_len),
+            'image': self.text(image_off, image_len) or None,
+            'images': json.loads(self.text(images_off, images_len)) if images_len else None,
+            'relationships': relationships,
+            'weapons': [{'id': r[0], 'name': self.text(r[1], r[2])}
+                        for r in (weapons[i] for i in range(weapon_start, weapon_start + weapon_count))],
+        }
+
+    def single_chapter(self, chapter_number: int) -> Dict[str, Any]:
+        record = self.tables['chapter'].find(chapter_number)
+        if record is None:
+            raise ObjectDoesNotExist(f"未找到章节号为 {chapter_number} 的章节")
+        _, title_off, title_len, summary_off, summary_len, loc_start, loc_count = record
+        links, locations = self.tables['chapter_location'], self.tables['location']
+        items = []
+        for index in range(loc_start, loc_start + loc_count):
+            location_id = links[index][0]
+            location = locations.find(location_id)
+            items.append({'id': location_id, 'name': self.text(location[1], location[2]) if location else ''})
+        return {
+            'title': self.text(title_off, title_len),
+            'summary': self.text(summary_off, summary_len),
+            'locations': items,
+            'chapter_number': chapter_number,
+        }
+
+    def single_location(self, location_id: int) -> Dict[str, Any]:
+        record = self.tables['location'].find(location_id)
+        if record is None:
+            raise ObjectDoesNotExist(f"未找到ID为 {location_id} 的地点")
+        _, name_off, name_len, desc_off, desc_len, continent_id, timeline_start, timeline_count = record
+        continent = self.tables['continent'].find(continent_id) if continent_id >= 0 else None
+        numbers, chapters = self.tables['location_chapter'], self.tables['chapter']
+        timeline = []
+        for index in range(timeline_start, timeline_start + timeline_count):
+            number = numbers[index][0]
+            chapter = chapters.find(number)
+            timeline.append({'chapter_number': number, 'title': self.text(chapter[1], chapter[2]) if chapter else ''})
+        return {
+            'id': location_id,
+            'name': self.text(name_off, name_len),
+            'description': self.text(desc_off, desc_len),
+            'continent': {
+                'id': continent[0],
+                'name': self.text(continent[1], continent[2]),
+                'description': self.text(continent[3], continent[4]),
+            } if continent else None,
+            'timeline': timeline,
+        }
+
+    def all_calamity(self) -> List[Dict[str, Any]]:
+        return [{'id': r[0], 'title': self.text(r[1], r[2]), 'summary': self.text(r[3], r[4])}
+                for r in (self.tables['calamity'][i] for i in range(len(self.tables['calamity'])))
+                if 1 <= r[0] <= 81]
+
+    def all_character(self) -> List[Dict[str, Any]]:
+        table = self.tables['character']
+        return [{'name': self.text(r[1], r[2]), 'id': r[0]} for r in (table[i] for i in range(len(table)))]
+
+    def all_chaptertitle(self) -> List[Dict[str, Any]]:
+        table = self.tables['chapter']
+        return [{'chapter_number': r[0], 'title': self.text(r[1], r[2])} for r in (table[i] for i in range(len(table)))]
+
+    def _page(self, table_name: str, key: str, after: Optional[int], limit: int) -> Dict[str, Any]:
+        """与 tools._keyset_page 相同的键集分页：{'items': [{key, 'name'/'title'}], 'next': 游标 | None}。"""
+        table = self.tables[table_name]
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        start = table.after(after)
+        end = min(start + limit, len(table))
+        label = 'name' if table_name == 'character' else 'title'
+        items = [{key: r[0], label: self.text(r[1], r[2])} for r in (table[i] for i in range(start, end))]
+        return {'items': items, 'next': items[-1][key] if end < len(table) else None}
+
+    def page_character(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        return self._page('character', 'id', after, limit)
+
+    def page_chaptertitle(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        return self._page('chapter', 'chapter_number', after, limit)
+
+
+def _identity(stat) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class SnapshotStore:
+    """
+    进程内的快照映射：文件被原子替换后重新映射；快照过期或未生成时 current() 返回 None。
+    写入事务提交后由 signals 调用 schedule_rebuild() 登记重新生成的任务。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+
+    def current(self) -> Optional[Snapshot]:
+        path = snapshot_path()
+        if not path:
+            return None
+        try:
+            identity = _identity(os.stat(path))
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._snapshot is None or self._snapshot.identity != identity:
+                # 旧映射不主动关闭：其他线程可能还在读，随引用释放
+                self._snapshot = Snapshot(path)
+            snapshot = self._snapshot
+        return snapshot if snapshot.is_fresh() else None
+
+    def rebuild(self) -> Optional[Dict[str, Any]]:
+        path = snapshot_path()
+        return build_snapshot(path) if path else None
+
+    def schedule_rebuild(self):
+        """
+        当前事务提交后登记重新生成快照的任务（create/jobs.py），由 run_jobs worker 执行，不占用请求线程；
+        幂等键相同，连续多次写入只登记一个待执行的任务。
+        """
+        if not snapshot_path():
+            return
+        from .jobs import enqueue
+
+        enqueue('rebuild_snapshot', key='rebuild_snapshot')
+
+
+# 进程内唯一的快照映射
+snapshot_store = SnapshotStore()
+
+
+class SnapshotQuery(Query):
+    """
+    快照优先的 Query：快照可用且未过期时从 mmap 作答，否则退回数据库（父类实现，含结果缓存）。
+    快照未覆盖的查询（武器列表、共现、关系图等）直接沿用父类。
+    """
+
+    def all_calamity(self):
+        snapshot = snapshot_store.current()
+        return snapshot.all_calamity() if snapshot else super().all_calamity()
+
+    def all_character(self):
+        snapshot = snapshot_store.current()
+        return snapshot.all_character() if snapshot else super().all_character()
+
+    def all_chaptertitle(self):
+        snapshot = snapshot_store.current()
+        return snapshot.all_chaptertitle() if snapshot else super().all_chaptertitle()
+
+    def page_character(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        snapshot = snapshot_store.current()
+        return snapshot.page_character(after, limit) if snapshot else super().page_character(after, limit)
+
+    def page_chaptertitle(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        snapshot = snapshot_store.current()
+        return snapshot.page_chaptertitle(after, limit) if snapshot else super().page_chaptertitle(after, limit)
+
+    def single_character(self, character_id):
+        snapshot = snapshot_store.current()
+        return snapshot.single_character(int(character_id)) if snapshot else super().single_character(character_id)
+
+    def single_chapter(self, chapter_id):
+        snapshot = snapshot_store.current()
+        return snapshot.single_chapter(int(chapter_id)) if snapshot else super().single_chapter(chapter_id)
+
+    def single_location(self, location_id):
+        snapshot = snapshot_store.current()
+        return snapshot.single_location(int(location_id)) if snapshot else super().single_location(location_id)
+
+
+def read_query() -> Query:
+    """read/ 视图使用的 Query：配置了 READ_SNAPSHOT_PATH 时为快照优先的 SnapshotQuery。"""
+    return SnapshotQuery() if snapshot_path() else Query()
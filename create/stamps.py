@@ -0,0 +1,118 @@
+"""
+数据变更戳（change stamp）。
+
+每张表（如 'character'）以及需要时的单行（如 'character:12'）各对应一个变更戳，
+值为最后一次写入时的纳秒时间戳。写入方通过 signals 调用 bump() 刷新，读取方
+比较变更戳即可判断缓存 / 页面是否过期，而无需查询 MySQL。
+
+变更戳保存在 settings.CACHES['stamps']（未配置时退回 'default'）中。它必须是所有进程共享的后端：
+gunicorn 的各个 worker、python manage.py run_jobs、build_snapshot 等进程都读写同一份变更戳，
+任何一个进程的写入才能让其他进程的结果缓存、内存索引与快照失效。
+settings.py 默认用本机的文件缓存目录（StampFileCache，不淘汰条目）；部署到多台机器时改为共享的
+redis / memcached，并保证不会淘汰变更戳（redis 设 noeviction 等）。进程内的 LocMemCache 只适用于单进程的 runserver。
+"""
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from typing import Dict
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.views.decorators.http import condition
+
+STAMP_PREFIX = 'jtw:stamp:'
+# 保存变更戳的缓存别名
+STAMP_CACHE = 'stamps'
+
+
+def stamp_cache():
+    """保存变更戳的缓存（settings.CACHES 中没有 STAMP_CACHE 时用 'default'）。"""
+    return caches[STAMP_CACHE if STAMP_CACHE in settings.CACHES else 'default']
+
+
+class StampFileCache(FileBasedCache):
+    """
+    保存变更戳的文件缓存：与 FileBasedCache 相同，但从不淘汰条目。
+    每行都有自己的变更戳（'character:<id>' 等），条目数随数据量增长；FileBasedCache 超过 MAX_ENTRIES
+    （默认 300）时会删掉一部分文件，被删的变更戳随后以当前时间重新初始化，ETag / Last-Modified 在没有写入时
+    也会变化，条件 GET 不再返回 304，依赖它的缓存也会无谓地失效。
+    """
+
+    def _cull(self):
+        pass
+
+
+def _key(name: str) -> str:
+    return STAMP_PREFIX + name
+
+
+def get_stamps(*names: str) -> Dict[str, int]:
+    """
+    批量读取变更戳，返回 {name: stamp}。
+    从未写入过（或被缓存淘汰）的变更戳以当前时间初始化：宁可让缓存多失效一次，也不返回过期数据。
+    """
+    cache = stamp_cache()
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)  # add 不覆盖其他进程刚写入的值
+        found.update(cache.get_many(missing))
+    return {name: found.get(key, 0) for key, name in keys.items()}
+
+
+def get_stamp(name: str) -> int:
+    return get_stamps(name)[name]
+
+
+def bump(*names: str) -> None:
+    """标记这些表 / 行刚刚发生了变化。"""
+    now = time.time_ns()
+    stamp_cache().set_many({_key(name): now for name in names}, timeout=None)
+
+
+def stamp_to_datetime(stamp: int) -> datetime:
+    """把纳秒变更戳转成 UTC datetime（用于 Last-Modified）。"""
+    return datetime.fromtimestamp(stamp / 1e9, tz=dt_timezone.utc)
+
+
+def conditional_on(*names: str):
+    """
+    视图装饰器：按变更戳生成 ETag / Last-Modified，支持条件 GET。
+    请求带 If-None-Match / If-Modified-Since 且依赖的变更戳都没变时直接返回 304，
+    不渲染模板、不执行任何 ORM 查询。
+
+    names 可包含视图 URL 参数占位符，如 @conditional_on('character:{id}', 'relationship_type')。
+    用于 async 视图时，变更戳在线程池中读取（缓存后端的文件 / 网络 I/O 不阻塞事件循环），
+    之后 condition 的两个回调只使用已读到的值。
+    """
+    def resolve(request, kwargs) -> Dict[str, int]:
+        # ETag 与 Last-Modified 两个回调共用一次变更戳读取
+        if not hasattr(request, '_change_stamps'):
+            request._change_stamps = get_stamps(*(name.format(**kwargs) for name in names))
+        return request._change_stamps
+
+    def etag_func(request, *args, **kwargs):
+        current = resolve(request, kwargs)
+        raw = '|'.join(f'{name}={current[name]}' for name in sorted(current))
+        return hashlib.md5(f'{request.get_full_path()}|{raw}'.encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        return stamp_to_datetime(max(resolve(request, kwargs).values()))
+
+    def decorator(view):
+        conditional = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+        if not iscoroutinefunction(view):
+            return conditional
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            await sync_to_async(resolve, thread_sensitive=False)(request, kwargs)
+            return await conditional(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,114 @@
+"""
+内容寻址的媒体存储：上传文件在写入磁盘的同时计算 SHA-256，按哈希存为 blobs/<前 2 位>/<3-4 位>/<哈希><扩展名>，
+内容相同的文件（不同角色 / 武器用了同一张图、update_character_img 重复上传）只存一份，Media_Blob 表记录引用计数。
+
+- save()：边读边写临时文件边计算哈希（大文件不整块读进内存），已存在同一内容时丢弃临时文件，引用计数加一；
+  返回的名字只由内容决定，不再出现 wukong_35JMESw.jpg 这样的随机后缀，upload_to 的目录对它不起作用；
+- delete()：引用计数减一，归零时删除记录，事务提交后删除文件；不在 Media_Blob 中的旧文件（characters/... 下
+  启用本存储前上传的）可能被多行共用，delete() 不删除它们；
+- URL 中带内容哈希，同一 URL 的内容永远不变，可以放心设置很长的缓存时间（见 is_immutable）。
+
+角色 / 武器的图片被替换或删除时，signals 调用 release_file() 释放原图与衍生图的引用。
+启用：settings.STORAGES['default'] 设为 create.storage.ContentAddressedStorage；
+已有文件用 python manage.py dedupe_media 迁入。
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils.deconstruct import deconstructible
+
+from .models import Media_Blob
+
+BLOB_DIR = 'blobs'
+# 上传时边写边算哈希的临时文件目录（MEDIA_ROOT 下，与 blobs 同一文件系统才能 os.replace）；
+# 其中是写了一半的文件，read/media.py 不对外提供
+TEMP_DIR = 'tmp'
+HASH_CHUNK_SIZE = 1 << 16
+
+
+def blob_name(digest: str, extension: str) -> str:
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_staging(name: str) -> bool:
+    """name 是否在上传临时目录中（写到一半的文件，不能对外提供）。"""
+    return name == TEMP_DIR or name.startswith(TEMP_DIR + '/')
+
+
+def is_immutable(name: str) -> bool:
+    """name 是否为内容寻址的文件（内容永不改变，可以长期缓存）。"""
+    return name.startswith(BLOB_DIR + '/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # 名字由内容哈希决定，同名即同内容，不需要加随机后缀避让
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(TEMP_DIR)
+        os.makedirs(temp_dir, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        descriptor, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp:
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    chunk = chunk.encode() if isinstance(chunk, str) else chunk
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+            digest = digest.hexdigest()
+            with transaction.atomic():
+                blob, _ = Media_Blob.objects.get_or_create(
+                    digest=digest, defaults={'name': blob_name(digest, extension), 'size': size})
+                # 锁住这一行：与并发的 delete() 互斥，防止刚确认文件存在就被删掉
+                blob = Media_Blob.objects.select_for_update().get(digest=digest)
+                path = self.path(blob.name)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, path)
+                Media_Blob.objects.filter(digest=digest).update(refcount=F('refcount') + 1)
+            return blob.name
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def delete(self, name):
+        """释放 name 的一次引用；不是内容寻址的文件不删除（见模块说明）。"""
+        if not name or not is_immutable(name):
+            return
+        digest = os.path.splitext(os.path.basename(name))[0]
+        with transaction.atomic():
+            blob = Media_Blob.objects.select_for_update().filter(digest=digest).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                Media_Blob.objects.filter(digest=digest).update(refcount=F('refcount') - 1)
+                return
+            blob.delete()
+            # 事务回滚时记录还在，文件不能先删；提交后再确认没有被重新引用
+            transaction.on_commit(lambda: self._remove_unreferenced(digest, blob.name))
+
+    def _remove_unreferenced(self, digest: str, name: str):
+        if not Media_Blob.objects.filter(digest=digest).exists():
+            super().delete(name)
+
+    def stats(self):
+        """{'blobs', 'bytes', 'references'}：存储的文件数、总字节数、引用总数。"""
+        totals = Media_Blob.objects.aggregate(blobs=Count('digest'), bytes=Sum('size'), references=Sum('refcount'))
+        return {key: value or 0 for key, value in totals.items()}
+
+
+def release_file(name: str, storage=default_storage):
+    """释放一次对 name 的引用：只有内容寻址存储才会真正删除文件，默认的 FileSystemStorage 下什么也不做。"""
+    if name and isinstance(storage, ContentAddressedStorage):
+        storage.delete(name)
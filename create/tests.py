@@ -1,3 +1,693 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.template import Context, Template
+from django.test import override_settings, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import images, jobs, stamps
+from .autocomplete import name_indexes, name_stamp, NameIndex, PrefixTrie, TOP_K
+from .export import columns, export_table, read_columnar
+from .fragments import fragment_cache, FragmentCache
+from .graph import RelationGraph
+from .layout import compute_layout, LAYOUT_CACHE_KEY, LAYOUT_STAMP, LayoutCache, np
+from .linker import EntityLinker, NAMES_STAMP
+from .models import Calamity, Chapter, Character, Character_Relationship, Job, Media_Blob, Relationship_Type
+from .search import index_terms, search_index, SearchIndex, tokenize
+from .storage import ContentAddressedStorage
+from .tools import Query, QueryCache
+
+
+# 测试使用独立的进程内缓存：变更戳不写入 var/stamps，也不受开发环境里已有变更戳的影响
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jtw-tests'},
+    'stamps': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jtw-tests-stamps'},
+}
+
+
+def make_character(name: str, **fields) -> Character:
+    return Character.objects.create(name=name, race=fields.pop('race', '人'), ability=fields.pop('ability', ''),
+                                    intro=fields.pop('intro', ''), **fields)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = QueryCache(max_entries=2)
+        self.computed = []
+
+    def get(self, key, value, depends=('character',)):
+        def compute():
+            self.computed.append(value)
+            return value
+        return self.cache.get_or_compute((key,), depends, compute)
+
+    def test_hit_until_stamp_changes(self):
+        self.assertEqual(self.get('a', 1), 1)
+        self.assertEqual(self.get('a', 2), 1)
+        stamps.bump('character')
+        self.assertEqual(self.get('a', 3), 3)
+        self.assertEqual(self.computed, [1, 3])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_unrelated_stamp_keeps_entry(self):
+        self.get('a', 1)
+        stamps.bump('weapon', 'character:1')
+        self.assertEqual(self.get('a', 2), 1)
+
+    def test_lru_bound(self):
+        self.get('a', 1)
+        self.get('b', 2)
+        self.get('a', 0)        # 命中，a 成为最近使用
+        self.get('c', 3)        # 超过上限，淘汰最久未用的 b
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(self.get('a', 0), 1)
+        self.assertEqual(self.get('b', 4), 4)
+        self.assertEqual(self.computed, [1, 2, 3, 4])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryInvalidationTests(TestCase):
+
+    def setUp(self):
+        Query.cache.clear()
+        stamps.bump('character')
+
+    def test_write_invalidates_after_commit(self):
+        query = Query()
+        self.assertEqual(query.all_character(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            character = make_character('白龙马')
+        self.assertEqual(query.all_character(), [{'name': '白龙马', 'id': character.id}])
+
+    def test_stamp_bumped_only_on_commit(self):
+        before = stamps.get_stamp('character')
+        with self.captureOnCommitCallbacks(execute=True):
+            make_character('白龙马')
+            # 提交前其他请求读到的仍是旧变更戳，不会把旧数据缓存在新变更戳下
+            self.assertEqual(stamps.get_stamp('character'), before)
+        self.assertNotEqual(stamps.get_stamp('character'), before)
+
+    def test_rollback_leaves_no_trace(self):
+        before = stamps.get_stamp('character')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    make_character('回滚')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(stamps.get_stamp('character'), before)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Chapter.objects.create(chapter_number=1, title='灵根孕育源流出', summary='花果山顶一块仙石迸裂，化出石猴。')
+        Chapter.objects.create(chapter_number=2, title='悟彻菩提真妙理', summary='石猴拜师学艺，得名孙悟空。孙悟空学会七十二变。')
+        Calamity.objects.create(id=1, title='金蝉遭贬', summary='金蝉子被贬下凡。')
+        make_character('孙悟空', intro='美猴王')
+
+    def setUp(self):
+        stamps.bump('chapter', 'calamity', 'character', 'location', 'weapon')
+        self.index = SearchIndex()
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('孙悟空 Monkey'), ['孙悟', '悟空', 'monkey'])
+        self.assertEqual(tokenize('猴'), ['猴'])
+        self.assertIn('猴', index_terms('石猴'))
+
+    def test_bm25_ranks_by_term_frequency_and_title(self):
+        results = self.index.search('孙悟空')
+        kinds = [(item['kind'], item['id']) for item in results]
+        # 标题命中（角色名）排在正文命中之前；正文中出现两次的章节排第二
+        self.assertEqual(kinds[:2], [('character', Character.objects.get().id), ('chapter', 2)])
+        self.assertNotIn(('chapter', 1), kinds)
+        self.assertIn('孙悟空', results[1]['snippet'])
+
+    def test_single_character_and_kinds(self):
+        results = self.index.search('猴', kinds=['chapter'])
+        self.assertEqual({item['id'] for item in results}, {1, 2})
+        self.assertEqual(self.index.search('蝉', kinds=['calamity'])[0]['id'], 1)
+        self.assertEqual(self.index.search(''), [])
+        self.assertEqual(self.index.search('无此词语'), [])
+
+    def test_signals_update_index_after_commit(self):
+        # 进程内的全局索引：先按当前数据建好，之后只经 signals 增量更新
+        search_index.search('猴')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Chapter.objects.create(chapter_number=3, title='回滚', summary='如意金箍棒')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(search_index.search('金箍棒'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            chapter = Chapter.objects.create(chapter_number=3, title='四海千山皆拱伏', summary='悟空龙宫取金箍棒。')
+        self.assertEqual(search_index.search('金箍棒')[0]['id'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            chapter.delete()
+        self.assertEqual(search_index.search('金箍棒'), [])
+
+
+class KeysetPageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids = [make_character(f'角色{i}').id for i in range(5)]
+
+    def test_pages_follow_cursor(self):
+        query = Query()
+        first = query.page_character(limit=2)
+        self.assertEqual([item['id'] for item in first['items']], self.ids[:2])
+        self.assertEqual(first['next'], self.ids[1])
+        second = query.page_character(after=first['next'], limit=2)
+        self.assertEqual([item['id'] for item in second['items']], self.ids[2:4])
+        last = query.page_character(after=second['next'], limit=2)
+        self.assertEqual([item['id'] for item in last['items']], self.ids[4:])
+        self.assertIsNone(last['next'])
+
+    def test_exact_page_has_no_next(self):
+        page = Query().page_character(limit=5)
+        self.assertEqual(len(page['items']), 5)
+        self.assertIsNone(page['next'])
+
+    def test_cursor_past_end_and_limit_clamp(self):
+        query = Query()
+        self.assertEqual(query.page_character(after=self.ids[-1]), {'items': [], 'next': None})
+        # limit 小于 1 时按 1 处理
+        self.assertEqual(len(query.page_character(limit=0)['items']), 1)
+
+    def test_cursor_survives_deleted_row(self):
+        query = Query()
+        first = query.page_character(limit=2)
+        Character.objects.filter(id=first['next']).delete()
+        second = query.page_character(after=first['next'], limit=2)
+        self.assertEqual([item['id'] for item in second['items']], self.ids[2:4])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ShortestPathTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.c = [make_character(f'节点{i}') for i in range(5)]
+        cls.type = Relationship_Type.objects.create(type='相识')
+        c = cls.c
+        # 0 → 1 ← 2 → 3，4 孤立
+        for src, dst in ((0, 1), (2, 1), (2, 3)):
+            Character_Relationship.objects.create(from_character=c[src], to_character=c[dst],
+                                                  relationship_type=cls.type)
+
+    def setUp(self):
+        self.graph = RelationGraph()
+
+    def test_path_ignores_direction(self):
+        c = self.c
+        path = self.graph.shortest_path(c[0].id, c[3].id)
+        self.assertEqual([(step['from'], step['to']) for step in path],
+                         [(c[0].id, c[1].id), (c[1].id, c[2].id), (c[2].id, c[3].id)])
+        self.assertEqual([step['forward'] for step in path], [True, False, True])
+        self.assertTrue(all(step['type_id'] == self.type.id for step in path))
+
+    def test_same_node_unreachable_and_max_depth(self):
+        c = self.c
+        self.assertEqual(self.graph.shortest_path(c[0].id, c[0].id), [])
+        self.assertIsNone(self.graph.shortest_path(c[0].id, c[4].id))
+        self.assertIsNone(self.graph.shortest_path(c[0].id, c[3].id, max_depth=2))
+        self.assertIsNone(self.graph.shortest_path(c[0].id, 10 ** 6))
+
+    def test_sees_new_edges(self):
+        c = self.c
+        self.assertEqual(len(self.graph.shortest_path(c[0].id, c[3].id)), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            rel = Character_Relationship.objects.create(from_character=c[3], to_character=c[0],
+                                                        relationship_type=self.type)
+        self.assertEqual(len(self.graph.shortest_path(c[0].id, c[3].id)), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            rel.delete()
+        self.assertEqual(len(self.graph.shortest_path(c[0].id, c[3].id)), 3)
+
+    def test_hub_is_highest_degree(self):
+        self.assertIn(self.graph.hub(), (self.c[1].id, self.c[2].id))
+
+
+@skipIf(np is None, '未安装 NumPy')
+class ComputeLayoutTests(TestCase):
+
+    def test_positions_normalized(self):
+        src, dst = np.array([0, 1, 2], dtype=np.int64), np.array([1, 2, 3], dtype=np.int64)
+        coords = compute_layout(5, src, dst, iterations=20)
+        self.assertEqual(coords.shape, (5, 2))
+        self.assertTrue(((coords >= 0) & (coords <= 1)).all())
+        self.assertEqual(compute_layout(0, src[:0], dst[:0]).shape[0], 0)
+
+
+@skipIf(np is None, '未安装 NumPy')
+@override_settings(CACHES=TEST_CACHES, JOBS_INLINE=False)
+class LayoutJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.c = [make_character(f'节点{i}') for i in range(3)]
+        cls.type = Relationship_Type.objects.create(type='相识')
+        Character_Relationship.objects.create(from_character=cls.c[0], to_character=cls.c[1], relationship_type=cls.type)
+
+    def setUp(self):
+        stamps.stamp_cache().delete(LAYOUT_CACHE_KEY)
+        stamps.bump('character_relationship', LAYOUT_STAMP)
+        self.layout = LayoutCache()
+
+    def run_layout_job(self):
+        job_ids = jobs.claim('w1', 10)
+        self.assertEqual(Job.objects.filter(id__in=job_ids).get().kind, 'graph_layout')
+        self.assertEqual(jobs.run_job(job_ids[0], 'w1'), 'done')
+
+    def test_request_enqueues_instead_of_computing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(self.layout.positions())
+            self.assertIsNone(self.layout.positions())
+        self.assertEqual(Job.objects.filter(kind='graph_layout', status='pending').count(), 1)
+        self.run_layout_job()
+        positions = self.layout.positions()
+        self.assertEqual(set(positions), {self.c[0].id, self.c[1].id})
+        self.assertTrue(all(0 <= x <= 1 and 0 <= y <= 1 for x, y in positions.values()))
+
+    def test_serves_last_layout_until_job_finishes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.layout.positions()
+        self.run_layout_job()
+        old = self.layout.positions()
+        with self.captureOnCommitCallbacks(execute=True):
+            Character_Relationship.objects.create(from_character=self.c[1], to_character=self.c[2],
+                                                  relationship_type=self.type)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.layout.positions(), old)
+        self.run_layout_job()
+        # 其他进程的 LayoutCache 同样经共享缓存拿到新布局
+        self.assertEqual(set(LayoutCache().positions()), {c.id for c in self.c})
+
+
+class RelationshipPairTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = make_character('甲'), make_character('乙')
+        cls.master = Relationship_Type.objects.create(type='师徒')
+        cls.friend = Relationship_Type.objects.create(type='朋友')
+
+    def test_save_fills_canonical_pair(self):
+        rel = Character_Relationship.objects.create(
+            from_character=self.b, to_character=self.a, relationship_type=self.master)
+        self.assertEqual((rel.pair_low, rel.pair_high), Character_Relationship.canonical_pair(self.a.id, self.b.id))
+
+    def test_reversed_duplicate_rejected(self):
+        Character_Relationship.objects.create(from_character=self.a, to_character=self.b, relationship_type=self.master)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Character_Relationship.objects.create(
+                from_character=self.b, to_character=self.a, relationship_type=self.master)
+
+    def test_other_type_allowed(self):
+        Character_Relationship.objects.create(from_character=self.a, to_character=self.b, relationship_type=self.master)
+        Character_Relationship.objects.create(from_character=self.b, to_character=self.a, relationship_type=self.friend)
+        self.assertEqual(Character_Relationship.objects.count(), 2)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FragmentCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = FragmentCache(max_chars=10)
+        self.rendered = []
+
+    def get(self, name, depends, html):
+        def render():
+            self.rendered.append(html)
+            return html
+        return self.cache.get_or_render(name, depends, render)
+
+    def test_hit_until_dependency_changes(self):
+        self.assertEqual(self.get('card', ['character:1'], 'a'), 'a')
+        self.assertEqual(self.get('card', ['character:1'], 'b'), 'a')
+        stamps.bump('character:2')
+        self.assertEqual(self.get('card', ['character:1'], 'b'), 'a')
+        stamps.bump('character:1')
+        self.assertEqual(self.get('card', ['character:1'], 'c'), 'c')
+        self.assertEqual(self.cache.stats()['fragments']['card'], {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_invalidate_by_dependency(self):
+        self.get('x', ['character:1', 'location'], 'a')
+        self.get('y', ['character:2'], 'b')
+        self.assertEqual(self.cache.invalidate('location'), 1)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(self.cache.invalidate('location'), 0)
+
+    def test_lru_by_size(self):
+        self.get('x', ['a'], 'xxxx')
+        self.get('y', ['b'], 'yyyy')
+        self.get('x', ['a'], '')            # 命中，x 成为最近使用
+        self.get('z', ['c'], 'zzzz')        # 超过 10 个字符，淘汰 y
+        self.assertEqual(self.cache.stats()['chars'], 8)
+        self.assertEqual(self.get('y', ['b'], 'YYYY'), 'YYYY')
+        # 单个片段超过上限时照常返回，但不缓存
+        self.assertEqual(self.get('big', ['d'], 'b' * 11), 'b' * 11)
+        self.assertEqual(self.get('big', ['d'], 'B' * 11), 'B' * 11)
+
+    def test_template_tag(self):
+        fragment_cache.clear()
+        template = Template('{% load fragment_cache %}'
+                            '{% fragment "cards" "location" character=ids %}{{ value }}{% endfragment %}')
+        render = lambda value: template.render(Context({'ids': [1, 2], 'value': value}))
+        self.assertEqual(render('a'), 'a')
+        self.assertEqual(render('b'), 'a')
+        stamps.bump('character:2')
+        self.assertEqual(render('c'), 'c')
+        stamps.bump('location')
+        self.assertEqual(render('d'), 'd')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class EntityLinkerTests(TestCase):
+
+    def setUp(self):
+        self.wukong = make_character('孙悟空')
+        self.sun = make_character('孙悟')
+        self.linker = EntityLinker()
+
+    def test_leftmost_longest_and_escaped(self):
+        html = self.linker.link('chapter', 1, '<b>孙悟空</b>大闹天宫')
+        url = reverse('read_single_character', args=[self.wukong.id])
+        self.assertEqual(html, f'&lt;b&gt;<a class="entity-link entity-character" href="{url}">孙悟空</a>'
+                               f'&lt;/b&gt;大闹天宫')
+
+    def test_cached_until_text_or_name_changes(self):
+        self.linker.spans('chapter', 1, '孙悟空')
+        self.linker.spans('chapter', 1, '孙悟空')
+        self.linker.spans('chapter', 1, '孙悟空！')
+        self.assertEqual((self.linker.hits, self.linker.misses), (1, 2))
+        # 新名字出现在文本中时逐出该条标注
+        stamps.bump(NAMES_STAMP)
+        self.linker.on_name_changed('character', 99, '孙悟空！')
+        self.linker.spans('chapter', 1, '孙悟空！')
+        self.assertEqual(self.linker.misses, 3)
+
+    def test_template_tag_reads_names_stamp_once(self):
+        template = Template('{% load entity_links %}'
+                            '{% for text in texts %}{% link_entities "calamity" forloop.counter text %}{% endfor %}')
+        with mock.patch('create.stamps.get_stamp', wraps=stamps.get_stamp) as get_stamp:
+            template.render(Context({'texts': ['孙悟空', '孙悟', '八戒']}))
+        self.assertEqual([call.args for call in get_stamp.call_args_list], [(NAMES_STAMP,)])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        # 全局索引可能还留着其他测试（已回滚）的名字：刷新变更戳使其重建
+        stamps.bump(name_stamp('character'))
+        self.index = name_indexes['character']
+
+    def test_shorter_names_first(self):
+        for name in ('孙悟空', '孙悟', '孙行者', '猪八戒', 'Sun Wukong'):
+            make_character(name)
+        self.assertEqual(self.index.complete('孙'), ['孙悟', '孙悟空', '孙行者'])
+        self.assertEqual(self.index.complete('孙', limit=1), ['孙悟'])
+        self.assertEqual(self.index.complete(' sun '), ['Sun Wukong'])
+        self.assertEqual(self.index.complete(''), [])
+
+    def test_follows_renames_and_deletes(self):
+        character = make_character('孙悟空')
+        make_character('孙悟空')
+        self.assertEqual(self.index.complete('孙'), ['孙悟空'])
+        with self.captureOnCommitCallbacks(execute=True):
+            character.name = '齐天大圣'
+            character.save()
+        self.assertEqual(self.index.complete('齐'), ['齐天大圣'])
+        # 同名的另一行还在
+        self.assertEqual(self.index.complete('孙'), ['孙悟空'])
+        with self.captureOnCommitCallbacks(execute=True):
+            character.delete()
+        self.assertEqual(self.index.complete('齐'), [])
+
+    def test_other_process_writes_rebuild(self):
+        index = NameIndex('character')
+        self.assertEqual(index.complete('沙'), [])
+        # 不经 signals 的写入（其他进程）：只刷新变更戳
+        make_character('沙悟净')
+        stamps.bump(name_stamp('character'))
+        self.assertEqual(index.complete('沙'), ['沙悟净'])
+
+
+class PrefixTrieTests(TestCase):
+
+    def test_top_k_refilled_after_remove(self):
+        trie = PrefixTrie()
+        names = [f'妖{i:02d}' for i in range(TOP_K + 5)]
+        for name in reversed(names):
+            trie.insert(name, name)
+        self.assertEqual(trie.complete('妖'), names[:TOP_K])
+        trie.remove(names[0], names[0])
+        self.assertEqual(trie.complete('妖'), names[1:TOP_K + 1])
+        trie.remove('妖99', '妖99')
+        self.assertEqual(trie.complete('妖0'), names[1:10])
+        self.assertEqual(trie.complete('鬼'), [])
+
+
+class ColumnarExportTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_round_trip(self):
+        make_character('孙悟空')
+        Character.objects.create(name='猪八戒\n"天蓬"', race='妖', ability='', intro='',
+                                 image_variants={'card': {'width': 1}})
+        make_character('沙僧')
+        result = export_table('character', self.directory, 'columnar', chunk_size=2)
+        self.assertEqual(result['rows'], 3)
+
+        header, blocks = read_columnar(result['path'])
+        cols = columns(Character)
+        self.assertEqual(header['table'], 'character')
+        self.assertEqual([(c['name'], c['type']) for c in header['columns']], cols)
+        blocks = list(blocks)
+        self.assertEqual([len(block) for block in blocks], [2, 1])
+        expected = list(Character.objects.order_by('id').values_list(*[name for name, _ in cols]))
+        self.assertEqual([row for block in blocks for row in block], expected)
+
+    def test_empty_table(self):
+        result = export_table('weapon', self.directory, 'columnar')
+        header, blocks = read_columnar(result['path'])
+        self.assertEqual((result['rows'], list(blocks)), (0, []))
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory, 'x.jtwc')
+        with open(path, 'wb') as f:
+            f.write(b'NOPE\x01')
+        with self.assertRaises(ValueError):
+            read_columnar(path)
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        self.storage = FileSystemStorage(location=root, base_url='/media/')
+        buffer = io.BytesIO()
+        Image.new('RGBA', (1200, 800), (200, 30, 30, 128)).save(buffer, 'PNG')
+        self.source = self.storage.save('characters/wukong.png', ContentFile(buffer.getvalue()))
+
+    def test_sizes_and_formats(self):
+        variants = images.generate_variants(self.source, self.storage)
+        self.assertEqual(variants['source'], self.source)
+        sizes = {name: (variants[name]['width'], variants[name]['height']) for name in images.VARIANTS}
+        self.assertEqual(sizes, {'card': (160, 107), 'detail': (600, 400), 'original': (1200, 800)})
+        self.assertEqual(variants['card']['webp'], 'characters/wukong.card.webp')
+        for name in images.variant_files(variants):
+            with self.subTest(name=name), self.storage.open(name) as file:
+                self.assertEqual(Image.open(file).format, 'WEBP' if name.endswith('.webp') else 'JPEG')
+        self.assertEqual(len(list(images.variant_files(variants))), 6)
+
+    def test_urls_only_for_current_image(self):
+        variants = images.generate_variants(self.source, self.storage)
+        urls = images.variant_urls(self.source, variants, self.storage)
+        self.assertEqual(urls['card']['jpeg'], '/media/characters/wukong.card.jpg')
+        self.assertIsNone(images.variant_urls('characters/other.png', variants, self.storage))
+        self.assertIsNone(images.variant_urls(self.source, None, self.storage))
+
+    def test_written_files_removed_on_failure(self):
+        encode = images._encode
+
+        def fail_on_detail(image, fmt):
+            if image.width == 600:
+                raise OSError('编码失败')
+            return encode(image, fmt)
+
+        with mock.patch.object(images, '_encode', side_effect=fail_on_detail), self.assertRaises(OSError):
+            images.generate_variants(self.source, self.storage)
+        self.assertEqual(self.storage.listdir('characters'), ([], ['wukong.png']))
+
+
+class MediaBlobTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def test_same_content_stored_once(self):
+        first = self.storage.save('characters/a.JPG', ContentFile(b'image'))
+        second = self.storage.save('weapons/b.jpg', ContentFile(b'image'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.jpg'))
+        blob = Media_Blob.objects.get()
+        self.assertEqual((blob.refcount, blob.size), (2, 5))
+        other = self.storage.save('c.jpg', ContentFile(b'other'))
+        self.assertNotEqual(other, first)
+        self.assertEqual(self.storage.stats(), {'blobs': 2, 'bytes': 10, 'references': 3})
+
+    def test_file_removed_with_last_reference(self):
+        name = self.storage.save('a.jpg', ContentFile(b'image'))
+        self.storage.save('b.jpg', ContentFile(b'image'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertEqual(Media_Blob.objects.get().refcount, 1)
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertFalse(Media_Blob.objects.exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_reupload_before_commit_keeps_file(self):
+        name = self.storage.save('a.jpg', ContentFile(b'image'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+            self.storage.save('a.jpg', ContentFile(b'image'))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(Media_Blob.objects.get().refcount, 1)
+
+    def test_legacy_files_not_deleted(self):
+        legacy = os.path.join(self.root, 'characters', 'old.jpg')
+        os.makedirs(os.path.dirname(legacy))
+        with open(legacy, 'wb') as f:
+            f.write(b'old')
+        self.storage.delete('characters/old.jpg')
+        self.assertTrue(os.path.exists(legacy))
+
+
+# 测试用任务：记录每次执行的参数；fail 为 True 时抛出异常
+CALLS = []
+
+
+@jobs.task('test_record')
+def record(n, fail=False):
+    CALLS.append(n)
+    if fail:
+        raise ValueError(f"失败 {n}")
+
+
+@override_settings(JOBS_INLINE=False, JOB_RETRY_DELAY=5, JOB_RETRY_MAX_DELAY=3600)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def enqueue(self, payload, key=None, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('test_record', payload, key=key, **kwargs)
+
+    def test_claim_is_exclusive(self):
+        for n in range(3):
+            self.enqueue({'n': n})
+        first = jobs.claim('w1', 2)
+        self.assertEqual(len(first), 2)
+        second = jobs.claim('w2', 10)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(jobs.claim('w3', 10), [])
+        # 别的 worker 领取的任务不能由本 worker 执行
+        self.assertEqual(jobs.run_job(first[0], 'w2'), 'skipped')
+
+    def test_stale_running_job_reclaimed(self):
+        self.enqueue({'n': 1})
+        job_id = jobs.claim('w1', 1)[0]
+        with override_settings(JOB_TIMEOUT=0):
+            self.assertEqual(jobs.claim('w2', 1), [job_id])
+        # 原 worker 结束时不会覆盖新 worker 的执行
+        self.assertEqual(jobs.run_job(job_id, 'w1'), 'skipped')
+        self.assertEqual(jobs.run_job(job_id, 'w2'), 'done')
+        self.assertEqual(Job.objects.get(id=job_id).attempts, 2)
+
+    def test_stale_job_reclaimed_once(self):
+        self.enqueue({'n': 1})
+        job_id = jobs.claim('w1', 1)[0]
+        # 两个 worker 读到同一个超时任务：后更新的一方按读到的 locked_by / locked_at 比对，领取失败
+        stale = list(Job.objects.values_list('id', 'status', 'locked_by', 'locked_at'))
+        with override_settings(JOB_TIMEOUT=0):
+            self.assertEqual(jobs.claim('w2', 1), [job_id])
+            with mock.patch('django.db.models.query.QuerySet.__getitem__', return_value=stale):
+                self.assertEqual(jobs.claim('w3', 1), [])
+        self.assertEqual(Job.objects.get(id=job_id).locked_by, 'w2')
+
+    def test_key_coalesces_pending(self):
+        self.enqueue({'n': 1}, key='k')
+        self.enqueue({'n': 2}, key='k')
+        job = Job.objects.get(key='k')
+        self.assertEqual((job.status, job.payload), ('pending', {'n': 2}))
+        jobs.run_job(jobs.claim('w1', 1)[0], 'w1')
+        self.assertEqual(CALLS, [2])
+        # 已完成的键再次登记会重新执行
+        self.enqueue({'n': 3}, key='k')
+        self.assertEqual(Job.objects.get(key='k').status, 'pending')
+
+    def test_key_enqueued_while_running_reruns_after(self):
+        self.enqueue({'n': 1}, key='k')
+        job_id = jobs.claim('w1', 1)[0]
+        self.enqueue({'n': 2}, key='k')
+        job = Job.objects.get(id=job_id)
+        self.assertEqual((job.status, job.locked_by, job.rerun), ('running', 'w1', True))
+        self.assertEqual(jobs.claim('w2', 1), [])
+        self.assertEqual(jobs.run_job(job_id, 'w1'), 'pending')
+        self.assertEqual(jobs.claim('w2', 1), [job_id])
+        self.assertEqual(jobs.run_job(job_id, 'w2'), 'done')
+        self.assertEqual(CALLS, [2, 2])
+
+    def test_retry_backoff_then_failed(self):
+        self.enqueue({'n': 1, 'fail': True}, max_attempts=2)
+        job_id = jobs.claim('w1', 1)[0]
+        self.assertEqual(jobs.run_job(job_id, 'w1'), 'pending')
+        job = Job.objects.get(id=job_id)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=4))
+        self.assertIn('失败 1', job.last_error)
+        self.assertEqual(jobs.claim('w1', 1), [])
+        Job.objects.filter(id=job_id).update(run_after=timezone.now())
+        self.assertEqual(jobs.run_job(jobs.claim('w1', 1)[0], 'w1'), 'failed')
+        self.assertEqual(Job.objects.get(id=job_id).status, 'failed')
+
+    def test_enqueue_after_rollback_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    jobs.enqueue('test_record', {'n': 1})
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Job.objects.exists())
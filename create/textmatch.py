@@ -0,0 +1,90 @@
+"""
+多模式串匹配：Aho-Corasick 自动机。
+
+一次扫描文本即可找出所有模式串（如全部角色名）的所有出现位置，耗时与
+文本长度 + 命中次数成正比，与模式串个数无关——1 万个名字和 10 个名字扫描一样快。
+
+    automaton = Automaton()
+    automaton.add('孙悟空', 1)
+    automaton.add('悟空', 1)          # 同一个值可以挂多个模式串（别名）
+    automaton.build()
+    for start, end, value in automaton.finditer(text):
+        ...
+
+匹配是“重叠”的：'孙悟空' 中的 '悟空' 也会报告，与对每个名字分别 str.count() 的结果一致，
+因此单个名字的增量重扫与全量扫描得到的计数相同。
+"""
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class Automaton:
+    """
+    trie 节点用连续编号表示：_goto[node] 为 {字符: 子节点}，_fail[node] 为失败指针，
+    _out[node] 为以该节点结尾的 (模式串长度, 值) 列表，_out_link[node] 指向失败链上
+    最近一个有输出的节点（-1 表示没有），避免扫描时沿失败链逐个检查。
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._out_link: List[int] = [-1]
+        self._built = False
+        self.patterns = 0
+
+    def add(self, pattern: str, value: Any):
+        """加入一个模式串；空串忽略。build() 之后不能再加入。"""
+        if self._built:
+            raise RuntimeError('自动机已 build()，不能再加入模式串')
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._out_link.append(-1)
+            node = nxt
+        self._out[node].append((len(pattern), value))
+        self.patterns += 1
+
+    def build(self) -> 'Automaton':
+        """按 BFS 计算失败指针与输出链接。"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fail_node = self._fail[child]
+                self._out_link[child] = fail_node if self._out[fail_node] else self._out_link[fail_node]
+        self._built = True
+        return self
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """逐个产出 (起始下标, 结束下标(不含), 值)。"""
+        if not self._built:
+            raise RuntimeError('请先调用 build()')
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            hit = node if out[node] else out_link[node]
+            while hit > 0:
+                for length, value in out[hit]:
+                    yield end - length, end, value
+                hit = out_link[hit]
+
+    def __len__(self) -> int:
+        return len(self._goto)
@@ -1,26 +1,144 @@
 from django.core.files.storage import default_storage
 from io import BytesIO
-from .models import Character, Calamity, Chapter, Character_Relationship, Weapon  # 假设模型在当前app中
+from .models import Character, Calamity, Chapter, Character_Relationship, Weapon, Relationship_Type, Location  # 假设模型在当前app中
 from django.core.exceptions import ObjectDoesNotExist
 from django.conf import settings
 from django.db import connection
+from django.db.models import Min
 import os
 import json
-from typing import List, Dict, Any
+import functools
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Tuple, Optional
+from . import stamps
+from .graph import relation_graph
+from .layout import layout_cache
+from .location_index import location_index
+from . import mentions
+from jtw_info_management.db_routers import replica_methods
+from .images import variant_urls
 
+# 键集分页（keyset pagination）的默认 / 最大每页条数
+PAGE_SIZE = 60
+MAX_PAGE_SIZE = 200
+# Query 结果缓存默认的条目数上限，可在 settings.QUERY_CACHE_MAX_ENTRIES 中覆盖
+DEFAULT_QUERY_CACHE_ENTRIES = 4096
+
+
+class QueryCache:
+    """
+    Query 结果缓存：按（方法名, 参数）保存结果，并记录计算时各依赖表的变更戳。
+    读取时变更戳未变即命中，否则重新查询；表有写入时 signals 刷新变更戳，过期结果永远不会被返回。
+    参数中含 id、游标等，键的数量随访问而增长：条目数超过上限时按 LRU 淘汰。
+    hits / misses 用于确认读页面在稳定状态下不再访问 MySQL。
+    """
+
+    def __init__(self, max_entries: int = None):
+        self._max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[Tuple[int, ...], Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is None:
+            return getattr(settings, 'QUERY_CACHE_MAX_ENTRIES', DEFAULT_QUERY_CACHE_ENTRIES)
+        return self._max_entries
+
+    def get_or_compute(self, key: Tuple, depends: Tuple[str, ...], compute: Callable[[], Any]) -> Any:
+        versions, hit, value = self.lookup(key, depends)
+        if hit:
+            return value
+        # 先读变更戳再查询：查询期间若有写入，结果会挂在旧版本下，下次读取自然失效
+        value = compute()
+        self.store(key, versions, value)
+        return value
+
+    def lookup(self, key: Tuple, depends: Tuple[str, ...]) -> Tuple[Tuple[int, ...], bool, Any]:
+        """
+        返回 (依赖的变更戳版本, 是否命中, 结果)；未命中时查询完成后以这里返回的版本调用 store()。
+        会读取变更戳（缓存后端的 I/O），create/async_query.py 在线程池中调用。
+        """
+        current = stamps.get_stamps(*depends)
+        versions = tuple(current[name] for name in depends)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return versions, True, entry[1]
+        return versions, False, None
+
+    def store(self, key: Tuple, versions: Tuple[int, ...], value: Any):
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+def cached_query(*depends: str):
+    """
+    装饰 Query 方法：结果按依赖表的变更戳缓存（表名同 signals.model_stamp，如 'character'）。
+    返回值在调用方之间共享，调用方不应原地修改。
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            return Query.cache.get_or_compute(key, depends, lambda: method(self, *args, **kwargs))
+        wrapper.depends = depends
+        return wrapper
+    return decorator
+
+
+@replica_methods
 class Query:
+    # 所有 Query 实例共享同一个结果缓存
+    cache = QueryCache()
+
     def __init__(self):
         pass
 
+    @classmethod
+    def cache_stats(cls) -> Dict[str, Any]:
+        """结果缓存的命中 / 未命中统计。"""
+        return cls.cache.stats()
+
+    @cached_query('calamity')
     def all_calamity(self):
         """
         使用Django ORM从Calamity表中查询所有九九八十一难（id从1到81），
-        返回列表，每个元素为{'title': str, 'summary': str}，按id升序排列。
+        返回列表，每个元素为{'id': int, 'title': str, 'summary': str}，按id升序排列。
         """
         calamities = Calamity.objects.filter(id__range=(1, 81)).order_by('id')
-        return [{'title': calamity.title, 'summary': calamity.summary} for calamity in calamities]
+        return [{'id': calamity.id, 'title': calamity.title, 'summary': calamity.summary} for calamity in calamities]
 
 
+    @cached_query('character')
     def all_character(self):
         """
         查询 Character 模型中所有角色名，返回去重后的角色名列表。
@@ -30,6 +148,7 @@ class Query:
         return [{'name': character.name , 'id': character.id} for character in characters]
         # 或 return list(set(Character.objects.values_list('name', flat=True)))
 
+    @cached_query('chapter')
     def all_chaptertitle(self):
         """
         使用Django ORM从Chapter表中查询所有章节实例，
@@ -39,6 +158,43 @@ class Query:
         return [{'chapter_number': chapter.chapter_number, 'title': chapter.title} for chapter in chapters]
 
 
+    def page_character(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        """
+        键集分页查询角色（按 id 升序）：WHERE id > after ORDER BY id LIMIT n，
+        走主键索引，无论翻到第几页耗时都与表大小无关。
+        返回 {'items': [{'id': int, 'name': str}, ...], 'next': int | None}，next 为下一页的游标（本页最后一个 id）。
+        """
+        queryset = Character.objects.order_by('id')
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+        return _keyset_page(queryset.values('id', 'name'), 'id', limit)
+
+    def page_chaptertitle(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        """
+        键集分页查询章节标题（按 chapter_number 升序），返回结构同 page_character。
+        """
+        queryset = Chapter.objects.order_by('chapter_number')
+        if after is not None:
+            queryset = queryset.filter(chapter_number__gt=after)
+        return _keyset_page(queryset.values('chapter_number', 'title'), 'chapter_number', limit)
+
+    def page_weapon(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        """
+        键集分页查询武器（按 id 升序），每项附带拥有者：{'id', 'name', 'owner': {'id', 'name'} | None}。
+        """
+        queryset = Weapon.objects.order_by('id')
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+        page = _keyset_page(queryset.values('id', 'name', 'owner_character_id', 'owner_character__name'), 'id', limit)
+        page['items'] = [{
+            'id': row['id'],
+            'name': row['name'],
+            'owner': {'id': row['owner_character_id'], 'name': row['owner_character__name']}
+                     if row['owner_character_id'] else None,
+        } for row in page['items']]
+        return page
+
+    @cached_query('character', 'character_relationship', 'relationship_type', 'weapon')
     def single_character(self, character_id):
         """
         根据 character_id 查询单个角色详情，包括多表关联的 relationships。
@@ -48,7 +204,9 @@ class Query:
             'intro': str,
             'ability': str,
             'image': str (图片 URL，如果存在；否则 None),
+            'images': dict | None        # 各尺寸衍生图 {'card': {'width', 'height', 'webp', 'jpeg'}, ...}，尚未生成时为 None
             'relationships': list[dict]  # 每个关系: {'direction': 'from'|'to', 'related_character': {'id': int, 'name': str}, 'type': str}
+            'weapons': list[dict]        # 持有的武器，按 id 升序: {'id': int, 'name': str}
         }。
         如果角色不存在，抛出 ObjectDoesNotExist 异常。
         """
@@ -92,16 +250,19 @@ class Query:
                 'intro': character.intro,
                 'ability': character.ability,
                 'image': character.image.url if character.image else None,  # 获取图片 URL
-                'relationships': relationships
+                'images': variant_urls(character.image.name, character.image_variants),
+                'relationships': relationships,
+                'weapons': list(Weapon.objects.filter(owner_character_id=character.id).order_by('id').values('id', 'name')),
             }
         except ObjectDoesNotExist:
             raise ObjectDoesNotExist(f"未找到 ID 为 {character_id} 的角色")
 
+    @cached_query('chapter', 'chapter_location', 'location')
     def single_chapter(self,chapter_id):
         """
         根据前端传入的chapter_id（即chapter_number），查询Chapter表中的title和summary，
         并通过Chapter_Location关联查询Location表，获取该章节发生的所有地名（location.name）。
-        返回字典：{'title': str, 'summary': str, 'locations': [str, ...]}。
+        返回字典：{'title': str, 'summary': str, 'locations': [{'id': int, 'name': str}, ...]}。
         如果章节不存在，抛出ObjectDoesNotExist异常。
         """
         try:
@@ -109,7 +270,7 @@ class Query:
             chapter = Chapter.objects.prefetch_related('chapter_locations__location').get(chapter_number=chapter_id)
 
             # 提取地名列表
-            locations = [cl.location.name for cl in chapter.chapter_locations.all()]
+            locations = [{'id': cl.location_id, 'name': cl.location.name} for cl in chapter.chapter_locations.all()]
 
             return {
                 'title': chapter.title,
@@ -120,7 +281,39 @@ class Query:
         except ObjectDoesNotExist:
             raise ObjectDoesNotExist(f"未找到章节号为 {chapter_id} 的章节")
 
-    def all_relationship(self,as_dict=True):
+    @cached_query('location', 'continent', 'chapter_location', 'chapter')
+    def single_location(self, location_id):
+        """
+        查询单个地点详情及其出场时间线。
+        返回字典：{
+            'id': int, 'name': str, 'description': str,
+            'continent': {'id': int, 'name': str, 'description': str} 或 None,
+            'timeline': [{'chapter_number': int, 'title': str}, ...]   # 按回合号升序
+        }
+        地点所在回合来自 location_index（内存反向索引），回目标题按主键一次查出。
+        如果地点不存在，抛出ObjectDoesNotExist异常。
+        """
+        try:
+            location = Location.objects.select_related('continent').get(id=location_id)
+        except ObjectDoesNotExist:
+            raise ObjectDoesNotExist(f"未找到ID为 {location_id} 的地点")
+
+        numbers = location_index.chapters(location.id)
+        titles = dict(Chapter.objects.filter(chapter_number__in=numbers).values_list('chapter_number', 'title'))
+        continent = location.continent
+        return {
+            'id': location.id,
+            'name': location.name,
+            'description': location.description,
+            'continent': {
+                'id': continent.id,
+                'name': continent.name,
+                'description': continent.description,
+            } if continent else None,
+            'timeline': [{'chapter_number': n, 'title': titles.get(n, '')} for n in numbers],
+        }
+
+    def all_relationship(self,as_dict=True, unique_pairs=False):
         """
         获取 Character_Relationship 表的所有关系数据。
 
@@ -132,6 +325,8 @@ class Query:
         as_dict: bool, default False
             - False → 返回 ORM 对象（QuerySet / 单实例）
             - True  → 返回序列化后的 Python dict（列表或单个 dict）
+        unique_pairs: bool, default False
+            - True → 同一无向角色对只保留 id 最小的一条（A→B / B→A 去重），由数据库按规范键分组完成
 
         返回
         ----------
@@ -140,24 +335,119 @@ class Query:
         - relationship_id 有值且 as_dict=False    → Character_Relationship 实例
         - relationship_id 有值且 as_dict=True     → dict
         """
+        # ---------- 全部记录 ----------
+        if not as_dict:
+            return Query._relationship_queryset(unique_pairs)
+
+        # dict 形式走结果缓存（QuerySet 是惰性的，不缓存）
+        return self._all_relationship_dicts(unique_pairs)
+
+    @cached_query('character_relationship', 'character', 'relationship_type')
+    def _all_relationship_dicts(self, unique_pairs=False):
+        # 批量转 dict（一次性遍历，效率更高）
+        return [Query._rel_to_dict(rel) for rel in Query._relationship_queryset(unique_pairs)]
+
+    @staticmethod
+    def _relationship_queryset(unique_pairs=False):
+        queryset = Character_Relationship.objects.all()
+        if unique_pairs:
+            # WHERE id IN (SELECT MIN(id) ... GROUP BY pair_low, pair_high)，分组走唯一索引的前缀
+            first_ids = (Character_Relationship.objects.order_by()
+                         .values('pair_low', 'pair_high').annotate(first_id=Min('id')).values('first_id'))
+            queryset = queryset.filter(id__in=first_ids)
         # 预加载外键：发起方、接收方、关系类型（以及类型表的 name 字段）
-        queryset = Character_Relationship.objects.all().select_related(
+        return queryset.select_related(
             'from_character',
             'to_character',
             'relationship_type'  # Relationship_Type 模型
         ).order_by('id')
 
-        # ---------- 全部记录 ----------
-        if not as_dict:
-            return queryset
-
-        # 批量转 dict（一次性遍历，效率更高）
-        return [Query._rel_to_dict(rel) for rel in queryset]
-
         # ------------------------------------------------------------------
         # 辅助：单条关系 → dict（统一结构，前端/模板直接使用）
         # ------------------------------------------------------------------
 
+    @cached_query('relationship_type')
+    def relationship_type_names(self) -> Dict[int, str]:
+        """
+        关系类型 id -> 关系名（如 {1: '师徒'}），表很小，整表缓存。
+        """
+        return dict(Relationship_Type.objects.values_list('id', 'type'))
+
+    @cached_query('character_mention', 'character')
+    def cooccurrence(self, limit: int = 20, character_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        共同出现章节最多的角色对（来自 Character_Mention，见 create/mentions.py）。
+        返回列表：[{'a': {'id', 'name'}, 'b': {'id', 'name'}, 'shared': int}, ...]，按 shared 降序；
+        character_id 不为空时只返回与该角色同时出现的角色，a 恒为该角色。
+        """
+        top = mentions.top_cooccurrence(limit=limit, character_id=character_id)
+        names = dict(Character.objects.filter(id__in={cid for a, b, _ in top for cid in (a, b)})
+                     .values_list('id', 'name'))
+        return [{'a': {'id': a, 'name': names.get(a)}, 'b': {'id': b, 'name': names.get(b)}, 'shared': shared}
+                for a, b, shared in top]
+
+    def relationship_path(self, from_id: int, to_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        查询两个角色之间的最短关系链（基于内存关系图，不扫描关系表）。
+        返回 [{'from_character': {'id', 'name'}, 'to_character': {'id', 'name'}, 'type': str, 'forward': bool}, ...]，
+        forward 表示关系在库中的方向与链路方向一致；不连通返回 None。
+        """
+        steps = relation_graph.shortest_path(from_id, to_id)
+        if steps is None:
+            return None
+
+        node_ids = {from_id, to_id} | {step['to'] for step in steps}
+        names = dict(Character.objects.filter(id__in=node_ids).values_list('id', 'name'))
+        type_names = self.relationship_type_names()
+        return [{
+            'from_character': {'id': step['from'], 'name': names.get(step['from'], '')},
+            'to_character': {'id': step['to'], 'name': names.get(step['to'], '')},
+            'type': type_names.get(step['type_id'], ''),
+            'forward': step['forward'],
+        } for step in steps]
+
+    def relationship_subgraph(self, center_id: int, depth: int = 2, max_nodes: int = 200,
+                              types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        以角色为中心的 k 跳关系子图（基于内存关系图），types 为关系名过滤（如 ['师徒', '父子']）。
+        返回 {'center': id, 'truncated': bool, 'nodes': [{'id', 'name', 'depth'}],
+              'relationships': [与 all_relationship() 相同结构的 dict]}，前端关系图可直接使用。
+        同一无向角色对只返回 id 最小的一条关系。
+        """
+        type_names = self.relationship_type_names()
+        type_ids = [type_id for type_id, name in type_names.items() if name in types] if types else None
+        if types and not type_ids:
+            return {'center': center_id, 'truncated': False, 'nodes': [], 'relationships': []}
+
+        subgraph = relation_graph.ego_network(center_id, depth=depth, max_nodes=max_nodes, type_ids=type_ids,
+                                              unique_pairs=True)
+        names = dict(Character.objects.filter(id__in=[node['id'] for node in subgraph['nodes']])
+                     .values_list('id', 'name'))
+
+        def character(character_id):
+            return {'id': character_id, 'name': names.get(character_id, '')}
+
+        # 附带服务端预计算的全图布局坐标（后台任务算好的最近一版；未安装 NumPy 或尚未算好时为 None，由前端自行布局）
+        positions = layout_cache.positions()
+
+        def node(item):
+            data = dict(character(item['id']), depth=item['depth'])
+            if positions is not None and item['id'] in positions:
+                data['x'], data['y'] = positions[item['id']]
+            return data
+
+        return {
+            'center': center_id,
+            'truncated': subgraph['truncated'],
+            'nodes': [node(item) for item in subgraph['nodes']],
+            'relationships': [{
+                'id': edge['relationship_id'],
+                'from_character': character(edge['from']),
+                'to_character': character(edge['to']),
+                'relationship_type': {'id': edge['type_id'], 'name': type_names.get(edge['type_id'], '')},
+            } for edge in subgraph['edges']],
+        }
+
     def all_weapon(self)->List[dict]:
         data  = Weapon.all_weapon()
         print(data)
@@ -187,6 +477,18 @@ class Query:
 
 
 
+def _keyset_page(queryset, key: str, limit: int) -> Dict[str, Any]:
+    """
+    取一页键集分页结果：多取 1 行判断是否还有下一页，有则以本页最后一行的 key 作为 next 游标。
+    limit 被限制在 [1, MAX_PAGE_SIZE]。
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {'items': rows, 'next': rows[-1][key] if has_more else None}
+
+
 def check_obj_exists(name: str, table) -> bool:
     """
     检查name是否在table表中已经存在。
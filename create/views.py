@@ -72,12 +72,7 @@ def process_character_submission(request):
             # 添加成功日志：打印到控制台（调试用）
             print(f"成功创建角色: {name} (ID: {character.id}, 种族: {race}, 创建时间: {character.created_at})")
 
-            # 图片处理示例（省略核心，但可添加）：
-            # from PIL import Image
-            # if image:
-            #     pil_image = Image.open(image)
-            #     pil_image.thumbnail((200, 200))  # 缩略图
-            #     pil_image.save(character.image.path, 'JPEG', quality=85)
+            # 缩略图 / WebP 衍生图由 save() 在事务提交后交给后台线程生成（见 create/images.py），这里不等待
 
             messages.success(request, f'角色 "{name}" 创建成功！ID: {character.id}')
             return redirect('create_character')  # 重定向避免重复提交
@@ -154,12 +149,7 @@ def process_weapon_submission(request):
             # 添加成功日志：打印到控制台（调试用）
             print(f"成功创建武器: {name} (ID: {weapon.id}, 拥有者: {owner}, 创建时间: {weapon.created_at})")
 
-            # 图片处理示例（省略核心，但可添加）：
-            # from PIL import Image
-            # if image:
-            #     pil_image = Image.open(image)
-            #     pil_image.thumbnail((200, 200))  # 缩略图
-            #     pil_image.save(weapon.image.path, 'JPEG', quality=85)
+            # 缩略图 / WebP 衍生图由 save() 在事务提交后交给后台线程生成（见 create/images.py），这里不等待
 
             messages.success(request, f'武器 "{name}" 创建成功！ID: {weapon.id}，拥有者: {owner}')
             return redirect('create_weapon')  # 重定向避免重复提交
@@ -54,14 +54,10 @@ def get_page_delete_main(request):
     return render(request, "delete_mainpage.html",)
 
 def get_page_delete_character(request):
-    # 查询所有存在的角色名称，作为下拉选项（优化：只取 name 字段的列表）
-    characters = list(Character.objects.values_list('name', flat=True).distinct())
-    context = {'characters': characters}
-    return render(request, 'delete_character.html', context)  # 替换为你的模板路径
+    # 角色名由表单边输入边请求 read/autocomplete 补全，不再整表查询所有角色名
+    return render(request, 'delete_character.html')  # 替换为你的模板路径
 
 def get_page_delete_weapon(request):
-    characters = list(Character.objects.values_list('name', flat=True).distinct())
-    context = {'characters': characters}
     return render(request, "delete_weapon.html")
 
 
@@ -80,11 +76,8 @@ def delete_character_submit(request):
         # 由于设置了 on_delete=CASCADE，角色删除时相应武器也会被删除
         res = process_delete(name, Character, request)
         return res
-    else:  # GET 请求，显示表单
-        # 查询所有存在的角色名称，作为下拉选项（优化：只取 name 字段的列表）
-        characters = list(Character.objects.values_list('name', flat=True).distinct())
-        context = {'characters': characters}
-        return render(request, 'delete_character.html', context)  # 替换为你的模板路径
+    else:  # GET 请求，显示表单（角色名由 read/autocomplete 补全）
+        return render(request, 'delete_character.html')  # 替换为你的模板路径
 
 
 def delete_weapon_submit(request):
@@ -102,8 +95,5 @@ def delete_weapon_submit(request):
         # 由于设置了 on_delete=CASCADE，武器删除时相关关联也会被处理
         res = process_delete(name, Weapon, request)
         return res
-    else:  # GET 请求，显示表单
-        # 查询所有存在的武器名称，作为下拉选项（优化：只取 name 字段的列表）
-        weapons = list(Weapon.objects.values_list('name', flat=True).distinct())
-        context = {'weapons': weapons}
-        return render(request, 'delete_weapon.html', context)  # 替换为你的模板路径
+    else:  # GET 请求，显示表单（武器名由 read/autocomplete 补全）
+        return render(request, 'delete_weapon.html')  # 替换为你的模板路径
@@ -1,6 +1,9 @@
 import os
+import sys
+import time
 import django
 import json
+from contextlib import contextmanager
 # Set the default Django settings module
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
@@ -9,55 +12,83 @@ from django.core.exceptions import ObjectDoesNotExist
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jtw_info_management.settings')
 django.setup()
 #而后导库
+from django.conf import settings
 from create.tools import Query
 from create.models import *
+from create.jsonstream import RecordReader, batched
+from create import pipeline
+
+# 初始数据目录（项目根目录下的 initial_data）
+DATA_DIR = os.path.join(settings.BASE_DIR, 'initial_data')
+# 批量模式下 bulk_create 每批写入的行数
+BULK_BATCH_SIZE = 5000
+
+# 初始数据：大洲与关系类型（逐条模式与批量模式共用）
+CONTINENTS = [
+    ("东胜神洲", "灵秀之区，多产异宝奇珍，然无大智若愚之士。"),
+    ("西牛贺洲", "不贪不杀，养气潜灵，佛国多妖，取经终点灵山所在。"),
+    ("南赡部洲", "善人所居，多有布施斋僧，然无大勇大猛之夫。"),
+    ("北俱芦洲", "仙人所宅，多有修真之客，然无大福大贵之神。"),
+    ("无", ""),
+]
+RELATION_TYPES = [
+    {'type': '师徒', 'description': '师傅与徒弟之间的导师关系，强调传承与指导。'},
+    {'type': '师兄弟', 'description': '同辈之间的从师关系，象征团结与互助。'},
+    {'type': '夫妻', 'description': '婚姻关系，伴侣之间互相扶持、共同生活。'},
+    {'type': '父子', 'description': '父亲与儿子之间的亲子关系，体现血脉传承与教育。'},
+    {'type': '朋友', 'description': '非血缘的亲密友人关系，基于信任与共同兴趣。'},
+    {'type': '主仆', 'description': '主人与坐骑（宠物或交通工具）之间的主仆关系，常用于游戏或幻想设定中。'},
+    {'type': '君臣', 'description': '组织或团队中的层级关系，上级指导下级，下级服从上级。'},
+    {'type': '拜把子', 'description': '通过结拜仪式结成的义兄弟关系，强调忠诚与生死相依。'},
+    {'type': '敌对' , 'description': '反目成仇'}
+    # 原“拜把子兄弟”改名为“结拜兄弟”，更简洁通用
+]
 
 class Initialize:
-    def __init__(self):
-        pass
+    def __init__(self, data_dir: str = DATA_DIR, workers: int = None):
+        self.data_dir = data_dir
+        # 批量模式规整 / 校验阶段的最多进程数（见 create/pipeline.py），默认为 CPU 核数；<= 1 或数据量小时不启用进程池
+        self.workers = pipeline.default_workers() if workers is None else workers
+        # 批量模式各阶段的计时：[(阶段名, 读入条数, 写入条数, 耗时秒)]
+        self.timings = []
+        # 批量模式新增了关联的章节 / 人物，结束后刷新它们的行级变更戳
+        self._touched_chapters = set()
+        self._touched_characters = set()
+
+    def data_path(self, file_name: str) -> str:
+        return os.path.join(self.data_dir, file_name)
     def save_weapon_to_json(self,file_path: str):
         """
-        将数据库中所有武器数据导出为 JSON 文件
+        将数据库中所有武器数据导出为 JSON 文件（格式同 Weapon.all_weapon）
+
+        按主键分块读取、逐条写出，不把全部武器载入内存；其他表的导出见 python manage.py export_data
         """
-        # 方法1：如果你 tools.py 的 Query 类里已经实现了 all_weapon() 返回 list[dict]
-        try:
-            query = Query()
-            weapon_list = query.all_weapon()  # 期望返回 list[dict]
-        except Exception:
-            # 方法2：直接使用模型的类方法（更稳定推荐）
-            from create.models import Weapon
-            weapon_list = Weapon.all_weapon(as_dict=True, include_owner=True)
+        from create.export import iter_chunks, CHUNK_SIZE
 
         # 确保目录存在
-        import os
-        os.makedirs(os.path.dirname(file_path), exist_ok=True) if os.path.dirname(file_path) else None
+        if os.path.dirname(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        # 写入 JSON 文件（注意：用 'w' 而不是 'rw'！'rw' 模式不存在！）
+        count = 0
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(
-                weapon_list,
-                f,
-                ensure_ascii=False,  # 支持中文不转义
-                indent=2,  # 美化格式
-                default=str  # 自动处理 datetime、Decimal 等类型
-            )
+            f.write('[')
+            for chunk in iter_chunks(Weapon, ['id'], CHUNK_SIZE):
+                weapons = Weapon.objects.filter(id__in=[row[0] for row in chunk]).select_related('owner_character')
+                for weapon in sorted(weapons, key=lambda w: w.id):
+                    f.write(',\n' if count else '\n')
+                    # ensure_ascii=False 支持中文不转义；default=str 自动处理 datetime 等类型
+                    f.write(json.dumps(weapon.as_dict(include_owner=True), ensure_ascii=False, indent=2, default=str))
+                    count += 1
+            f.write('\n]\n')
 
         print(f"武器数据已成功导出到：{file_path}")
-        print(f"共导出 {len(weapon_list)} 把武器")
+        print(f"共导出 {count} 把武器")
 
     def initialize_continent(self):
         Continent.objects.all().delete()
 
-        continent_list = ["东胜神洲", "西牛贺洲", "南赡部洲", "北俱芦洲", "无"]
-        description_list = [
-            "灵秀之区，多产异宝奇珍，然无大智若愚之士。",
-            "不贪不杀，养气潜灵，佛国多妖，取经终点灵山所在。",
-            "善人所居，多有布施斋僧，然无大勇大猛之夫。",
-            "仙人所宅，多有修真之客，然无大福大贵之神。",
-            ""
-        ]
         id = 1
-        for continent, description in zip(continent_list, description_list):
+        for continent, description in CONTINENTS:
             obj = Continent.objects.create(
                 id = id ,
                 name=continent,
@@ -67,20 +98,7 @@ class Initialize:
 
     def initialize_relation_types(self):
         Relationship_Type.objects.all().delete()
-        # 初始数据列表
-        initial_realations = [
-            {'type': '师徒', 'description': '师傅与徒弟之间的导师关系，强调传承与指导。'},
-            {'type': '师兄弟', 'description': '同辈之间的从师关系，象征团结与互助。'},
-            {'type': '夫妻', 'description': '婚姻关系，伴侣之间互相扶持、共同生活。'},
-            {'type': '父子', 'description': '父亲与儿子之间的亲子关系，体现血脉传承与教育。'},
-            {'type': '朋友', 'description': '非血缘的亲密友人关系，基于信任与共同兴趣。'},
-            {'type': '主仆', 'description': '主人与坐骑（宠物或交通工具）之间的主仆关系，常用于游戏或幻想设定中。'},
-            {'type': '君臣', 'description': '组织或团队中的层级关系，上级指导下级，下级服从上级。'},
-            {'type': '拜把子', 'description': '通过结拜仪式结成的义兄弟关系，强调忠诚与生死相依。'},
-            {'type': '敌对' , 'description': '反目成仇'}
-            # 原“拜把子兄弟”改名为“结拜兄弟”，更简洁通用
-        ]
-        for realation in initial_realations:
+        for realation in RELATION_TYPES:
             obj = Relationship_Type.objects.create(
                 type=realation['type'],
                 description=realation['description'],
@@ -89,15 +107,13 @@ class Initialize:
     def initialize_calamity(self):
         Calamity.objects.all().delete()
         current_id = 1
-        with open(r'C:\Users\32939\Desktop\github_repo\journey_to_the_west_info_sys\jtw_info_management\initial_data\calamity.json', 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
-            for data in data_dict:
-                obj = Calamity.objects.create(
-                id = current_id,
-                title = data['title'],
-                summary = data['summary'],
-                )
-                current_id  = current_id + 1
+        for data in self._records('calamity.json', ('title', 'summary')):
+            obj = Calamity.objects.create(
+            id = current_id,
+            title = data['title'],
+            summary = data['summary'],
+            )
+            current_id  = current_id + 1
 
     @transaction.atomic
     def location_exists(self,location_name: str):
@@ -144,31 +160,25 @@ class Initialize:
         return location
 
     def initialize_location(self):
-        with open(r"C:\Users\32939\Desktop\github_repo\journey_to_the_west_info_sys\jtw_info_management\initial_data\place.json", 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
-            for data in data_dict:
-                print(data["地名"])
-                initial_location = self.initialize_single_location(data["地名"], data['所属大洲'] , data['介绍'])
+        for data in self._records('place.json', ('地名', '所属大洲', '介绍')):
+            print(data["地名"])
+            initial_location = self.initialize_single_location(data["地名"], data['所属大洲'] , data['介绍'])
 
 
 
     def initialize_location_withoutrepeat(self):
-        with open(r"C:\Users\32939\Desktop\github_repo\journey_to_the_west_info_sys\jtw_info_management\initial_data\place.json", 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
-            for data in data_dict:
-                if not (self.location_exists(data['地名'])):
-                    print(data["地名"])
-                    initial_location = self.initialize_single_location(data["地名"], data['所属大洲'] , data['介绍'])
+        for data in self._records('place.json', ('地名', '所属大洲', '介绍')):
+            if not (self.location_exists(data['地名'])):
+                print(data["地名"])
+                initial_location = self.initialize_single_location(data["地名"], data['所属大洲'] , data['介绍'])
 
     def initialize_chapter(self):
-        with open(r"C:\Users\32939\Desktop\github_repo\journey_to_the_west_info_sys\jtw_info_management\initial_data\chapter.json", 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
-            for data in data_dict:
-                    chapter = Chapter.objects.create(
-                        chapter_number = data['chapter'],
-                        title = data['title'],
-                        summary = data['summary'],
-                    )
+        for data in self._records('chapter.json', ('chapter', 'title', 'summary')):
+                chapter = Chapter.objects.create(
+                    chapter_number = data['chapter'],
+                    title = data['title'],
+                    summary = data['summary'],
+                )
         return True
 
 
@@ -207,74 +217,71 @@ class Initialize:
             )
 
     def initialize_chapter_location(self):
-        with open(r".\initial_data\chapter.json", 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
-            for data in data_dict:
-                self.initial_single_chapter_location(data['title'], data['locations'])
+        for data in self._records('chapter.json', ('title', 'locations')):
+            self.initial_single_chapter_location(data['title'], data['locations'])
 
 
     def initialize_character(self):
-        file_path = r".\initial_data\character.json"
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
-
-            # 收集JSON中所有有效人物名称
-            json_names = {data.get('name', '').strip() for data in data_dict if data.get('name', '').strip()}
-
-            # 获取数据库中所有人物名称
-            all_db_names = {char.name for char in Character.objects.all()}
+        # 流式读取：RecordReader 每次遍历都重新读文件，下面先遍历一遍收集名字、再遍历一遍插入
+        data_dict = self._records('character.json')
 
-            # 找出数据库中多余的名称（不在JSON中）
-            to_delete = all_db_names - json_names
+        # 收集JSON中所有有效人物名称
+        json_names = {data.get('name', '').strip() for data in data_dict if data.get('name', '').strip()}
 
-            # 先删除多余记录
-            for name in to_delete:
-                try:
-                    char = Character.objects.get(name=name)
-                    char.delete()
-                    print(f"删除不存在于JSON中的人物: {name}")
-                except Exception as e:
-                    print(f"删除人物 {name} 时出错: {str(e)}")
-
-            # 然后插入或跳过现有记录
-            for data in data_dict:
-                name = data.get('name', '').strip()
-                if not name:  # 跳过空名称
-                    continue
-
-                # 检查是否已存在（基于 name 字段，假设 name 是唯一标识）
-                if Character.objects.filter(name=name).exists():
-                    print(f"跳过已存在人物: {name}")
-                    continue
+        # 获取数据库中所有人物名称
+        all_db_names = {char.name for char in Character.objects.all()}
 
-                # 映射 JSON 字段到模型字段
-                # 注意: type 假设对应 race，introduction 对应 intro
-                # image 使用默认 None（JSON 中无此字段）
-                # organization 默认 '无组织' 如果缺失
-                race = data.get('type', '仙')  # 根据 RACE_CHOICES 选择合适默认值
-                ability = data.get('ability', '')
-                intro = data.get('introduction', '')  # 或 'intro'，根据 JSON 实际键调整
-                organization = data.get('organization', '无组织')
+        # 找出数据库中多余的名称（不在JSON中）
+        to_delete = all_db_names - json_names
 
-                # 创建并保存新实例
-                try:
-                    char = Character(
-                        name=name,
-                        race=race,
-                        ability=ability,
-                        intro=intro,
-                        organization=organization
-                        # image 默认 None，无需指定
-                    )
-                    char.save()
-                    print(f"成功插入新人物: {name}")
-                except Exception as e:
-                    print(f"插入人物 {name} 时出错: {str(e)}")
+        # 先删除多余记录
+        for name in to_delete:
+            try:
+                char = Character.objects.get(name=name)
+                char.delete()
+                print(f"删除不存在于JSON中的人物: {name}")
+            except Exception as e:
+                print(f"删除人物 {name} 时出错: {str(e)}")
+
+        # 然后插入或跳过现有记录
+        for data in data_dict:
+            name = data.get('name', '').strip()
+            if not name:  # 跳过空名称
+                continue
+
+            # 检查是否已存在（基于 name 字段，假设 name 是唯一标识）
+            if Character.objects.filter(name=name).exists():
+                print(f"跳过已存在人物: {name}")
+                continue
+
+            # 映射 JSON 字段到模型字段
+            # 注意: type 假设对应 race，introduction 对应 intro
+            # image 使用默认 None（JSON 中无此字段）
+            # organization 默认 '无组织' 如果缺失
+            race = data.get('type', '仙')  # 根据 RACE_CHOICES 选择合适默认值
+            ability = data.get('ability', '')
+            intro = data.get('introduction', '')  # 或 'intro'，根据 JSON 实际键调整
+            organization = data.get('organization', '无组织')
+
+            # 创建并保存新实例
+            try:
+                char = Character(
+                    name=name,
+                    race=race,
+                    ability=ability,
+                    intro=intro,
+                    organization=organization
+                    # image 默认 None，无需指定
+                )
+                char.save()
+                print(f"成功插入新人物: {name}")
+            except Exception as e:
+                print(f"插入人物 {name} 时出错: {str(e)}")
 
 
     def initialize_character_relationship(self):
-        with open(r".\initial_data\character.json", 'r', encoding='utf-8') as file:
-            data_dict = json.load(file)
+        """人物关系的逐条导入，同 build_relationship_from_characters。"""
+        self.build_relationship_from_characters()
 
 
     def initialize_weapon(self):
@@ -283,18 +290,13 @@ class Initialize:
         假设 JSON 是列表格式，每个元素是一个字典，包含 'name', 'introduction', 'owner'。
         如果拥有者为空或不存在于 Character 中，或武器已存在（基于名称），则跳过插入并打印记录。
         """
-        file_path = r".\initial_data\weapon.json"
+        file_path = self.data_path('weapon.json')
         skipped_count = 0
         inserted_count = 0
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data_list = json.load(file)
-
-            # 假设 data_list 是列表形式
-            if not isinstance(data_list, list):
-                print("警告: JSON 数据不是列表格式，跳过处理。")
-                return
+            # 流式读取，不把整个文件载入内存；文件不是列表格式时在遍历时抛出 ValueError
+            data_list = self._records('weapon.json')
 
             for data in data_list:
                 try:
@@ -353,6 +355,8 @@ class Initialize:
             print(f"错误: 文件未找到 - {file_path}")
         except json.JSONDecodeError as e:
             print(f"错误: JSON 解析失败 - {e}")
+        except ValueError as e:
+            print(f"警告: {e}，跳过处理。")
         except Exception as e:
             print(f"错误: 初始化武器时发生未知异常 - {e}")
 
@@ -360,7 +364,8 @@ class Initialize:
         """
         1.首先需要判断两角色是否存在,若不存在则不插入
         2.判断关系类型是否存在,不存在创建该关系类型后再插入
-        3.若都存在则直接插入
+        3.同一对角色（不分方向）已有同类关系则跳过
+        4.若都存在则直接插入
         """
         try:
             # 1. 判断发起方角色是否存在
@@ -387,7 +392,14 @@ class Initialize:
             )
             print(f"创建新关系类型: {rel_type}")
 
-        # 3. 插入关系
+        # 3. 无向规范键 + 关系类型已存在（A→B 或 B→A）则跳过，走唯一索引，代价很低
+        pair_low, pair_high = Character_Relationship.canonical_pair(from_char.id, to_char.id)
+        if Character_Relationship.objects.filter(pair_low=pair_low, pair_high=pair_high,
+                                                 relationship_type=rel_type_obj).exists():
+            print(f"跳过重复关系: {from_character} ↔ {to_character} ({rel_type})")
+            return
+
+        # 4. 插入关系
         relationship = Character_Relationship(
             from_character=from_char,
             to_character=to_char,
@@ -404,18 +416,13 @@ class Initialize:
         对于 superiors: 调用 build_single_relationship(superior_name, current_name, rel_type)。
         对于 subordinates: 调用 build_single_relationship(current_name, subordinate_name, rel_type)。
         """
-        file_path = r".\initial_data\character.json"
+        file_path = self.data_path('character.json')
         processed_count = 0
         skipped_count = 0
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-
-            # 假设 data 是列表形式
-            if not isinstance(data, list):
-                print("警告: JSON 数据不是列表格式，跳过处理。")
-                return
+            # 流式读取，不把整个文件载入内存；文件不是列表格式时在遍历时抛出 ValueError
+            data = self._records('character.json')
 
             for char_data in data:
                 try:
@@ -447,10 +454,255 @@ class Initialize:
             print(f"错误: 文件未找到 - {file_path}")
         except json.JSONDecodeError as e:
             print(f"错误: JSON 解析失败 - {e}")
+        except ValueError as e:
+            print(f"警告: {e}，跳过处理。")
         except Exception as e:
             print(f"错误: 构建关系时发生未知异常 - {e}")
 
 
+    # ------------------------------------------------------------------
+    # 批量模式：每个阶段先一次性预载 名称→id 映射，在内存中校验去重，
+    # 再用 bulk_create 分批写入；所有阶段在同一个事务中完成。
+    # 逐条模式每条记录要 1~3 次查询，50 万行需数小时；批量模式每批只有一次 INSERT。
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _stage(self, name: str):
+        """计时一个阶段；阶段内通过 yield 出的字典记录 read / written 条数。"""
+        counter = {'read': 0, 'written': 0}
+        start = time.perf_counter()
+        yield counter
+        self.timings.append((name, counter['read'], counter['written'], time.perf_counter() - start))
+
+    def _records(self, file_name: str, required: tuple = ()) -> RecordReader:
+        """流式读取 JSON 数组（每次遍历重新读文件），内存占用与文件大小无关。"""
+        return RecordReader(self.data_path(file_name), required)
+
+    def bulk_continent(self):
+        with self._stage('大洲') as c:
+            existing = set(Continent.objects.values_list('name', flat=True))
+            used_ids = set(Continent.objects.values_list('id', flat=True))
+            rows = []
+            for continent_id, (name, description) in enumerate(CONTINENTS, 1):
+                c['read'] += 1
+                if name in existing or continent_id in used_ids:
+                    continue
+                rows.append(Continent(id=continent_id, name=name, description=description))
+            Continent.objects.bulk_create(rows)
+            c['written'] = len(rows)
+
+    def bulk_relation_types(self):
+        with self._stage('关系类型') as c:
+            existing = set(Relationship_Type.objects.values_list('type', flat=True))
+            rows = [Relationship_Type(type=item['type'], description=item['description'])
+                    for item in RELATION_TYPES if item['type'] not in existing]
+            c['read'] = len(RELATION_TYPES)
+            Relationship_Type.objects.bulk_create(rows)
+            c['written'] = len(rows)
+
+    def bulk_calamity(self):
+        with self._stage('磨难') as c:
+            records = self._records('calamity.json', ('title', 'summary'))
+            Calamity.objects.all().delete()
+            # 磨难以序号（从 1 开始）为主键
+            for batch in batched(records, BULK_BATCH_SIZE):
+                Calamity.objects.bulk_create([Calamity(id=c['written'] + i, title=item['title'], summary=item['summary'])
+                                              for i, item in enumerate(batch, 1)])
+                c['written'] += len(batch)
+            c['read'] = records.read
+
+    def bulk_location(self):
+        with self._stage('地点') as c:
+            records = self._records('place.json', ('地名', '介绍'))
+            continent_ids = dict(Continent.objects.values_list('name', 'id'))
+            default_continent = continent_ids.get('无')
+            seen = set(Location.objects.values_list('name', flat=True))
+            for batch in batched(records, BULK_BATCH_SIZE):
+                rows = []
+                for item in batch:
+                    name = item['地名']
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                    rows.append(Location(name=name, description=item['介绍'],
+                                         continent_id=continent_ids.get(item.get('所属大洲'), default_continent)))
+                Location.objects.bulk_create(rows)
+                c['written'] += len(rows)
+            c['read'] = records.read
+
+    def bulk_chapter(self):
+        with self._stage('章节') as c:
+            records = self._records('chapter.json', ('chapter', 'title', 'summary'))
+            existing = set(Chapter.objects.values_list('chapter_number', flat=True))
+            for batch in batched(records, BULK_BATCH_SIZE):
+                rows = []
+                for item in batch:
+                    if item['chapter'] in existing:
+                        continue
+                    existing.add(item['chapter'])
+                    rows.append(Chapter(chapter_number=item['chapter'], title=item['title'], summary=item['summary']))
+                Chapter.objects.bulk_create(rows)
+                c['written'] += len(rows)
+            c['read'] = records.read
+
+    def bulk_chapter_location(self):
+        with self._stage('章节-地点') as c:
+            chapter_ids = dict(Chapter.objects.values_list('title', 'chapter_number'))
+            location_ids = dict(Location.objects.values_list('name', 'id'))
+            links = set(Chapter_Location.objects.values_list('chapter_id', 'location_id'))
+            touched = set()
+            for batch in batched(self._records('chapter.json', ('title',)), BULK_BATCH_SIZE):
+                # 章节里出现、但地点表中没有的地名先补建（description 默认“暂无”）
+                missing = {name for item in batch for name in item.get('locations', []) if name not in location_ids}
+                if missing:
+                    Location.objects.bulk_create([Location(name=name, description='暂无') for name in missing])
+                    location_ids.update(Location.objects.filter(name__in=missing).values_list('name', 'id'))
+                    c['written'] += len(missing)
+                rows = []
+                for item in batch:
+                    chapter_id = chapter_ids.get(item['title'])
+                    if chapter_id is None:
+                        print(f"跳过章节-地点: 章节标题 '{item['title']}' 不存在")
+                        continue
+                    for name in item.get('locations', []):
+                        c['read'] += 1
+                        key = (chapter_id, location_ids[name])
+                        if key in links:
+                            continue
+                        links.add(key)
+                        rows.append(Chapter_Location(chapter_id=key[0], location_id=key[1]))
+                Chapter_Location.objects.bulk_create(rows)
+                c['written'] += len(rows)
+                touched.update(row.chapter_id for row in rows)
+            self._touched_chapters = touched
+
+    def bulk_character(self):
+        with self._stage('人物') as c:
+            records = self._records('character.json', ('name',))
+            db_names = set(Character.objects.values_list('name', flat=True))
+            json_names, seen = set(), set(db_names)
+            prepared = pipeline.parallel_map(pipeline.prepare_characters,
+                                             batched(records, BULK_BATCH_SIZE), self.workers)
+            for fields, _ in prepared:
+                rows = []
+                for item in fields:
+                    json_names.add(item['name'])
+                    if item['name'] in seen:
+                        continue
+                    seen.add(item['name'])
+                    rows.append(Character(**item))
+                Character.objects.bulk_create(rows)
+                c['written'] += len(rows)
+            c['read'] = records.read
+
+            # 与逐条模式一致：删除 JSON 中不存在的人物（级联删除其武器 / 关系）
+            to_delete = list(db_names - json_names)
+            for start in range(0, len(to_delete), BULK_BATCH_SIZE):
+                Character.objects.filter(name__in=to_delete[start:start + BULK_BATCH_SIZE]).delete()
+            if to_delete:
+                print(f"删除不存在于JSON中的人物: {len(to_delete)} 个")
+
+    def bulk_weapon(self):
+        with self._stage('武器') as c:
+            records = self._records('weapon.json', ('name', 'introduction'))
+            owner_ids = dict(Character.objects.values_list('name', 'id'))
+            existing = set(Weapon.objects.values_list('name', flat=True))
+            skipped = 0
+            prepared = pipeline.parallel_map(pipeline.prepare_weapons, batched(records, BULK_BATCH_SIZE),
+                                             self.workers, frozenset(owner_ids))
+            for weapons, invalid in prepared:
+                skipped += invalid
+                rows = []
+                for name, description, owner in weapons:
+                    if name in existing:
+                        skipped += 1
+                        continue
+                    existing.add(name)
+                    rows.append(Weapon(name=name, description=description, owner_character_id=owner_ids[owner]))
+                Weapon.objects.bulk_create(rows)
+                c['written'] += len(rows)
+            c['read'] = records.read
+            skipped += records.invalid
+            if skipped:
+                print(f"跳过武器 {skipped} 条（缺少名称 / 拥有者不存在 / 已存在）")
+
+    def bulk_relationship(self):
+        with self._stage('人物关系') as c:
+            character_ids = dict(Character.objects.values_list('name', 'id'))
+            type_ids = dict(Relationship_Type.objects.values_list('type', 'id'))
+            seen = set(Character_Relationship.objects.values_list('pair_low', 'pair_high', 'relationship_type_id'))
+            touched, skipped = set(), 0
+            prepared = pipeline.parallel_map(pipeline.expand_relationships,
+                                             batched(self._records('character.json', ('name',)), BULK_BATCH_SIZE),
+                                             self.workers, frozenset(character_ids))
+            for edges, missing in prepared:
+                c['read'] += len(edges) + missing
+                skipped += missing
+
+                new_types = {rel for _, _, rel in edges if rel not in type_ids}
+                if new_types:
+                    Relationship_Type.objects.bulk_create([Relationship_Type(type=t, description='') for t in new_types])
+                    type_ids = dict(Relationship_Type.objects.values_list('type', 'id'))
+                    print(f"创建新关系类型: {'、'.join(sorted(new_types))}")
+
+                rows = []
+                for from_name, to_name, rel in edges:
+                    from_id, to_id = character_ids[from_name], character_ids[to_name]
+                    # bulk_create 不经过 save()，需自行填充无向规范键
+                    pair_low, pair_high = Character_Relationship.canonical_pair(from_id, to_id)
+                    key = (pair_low, pair_high, type_ids[rel])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    rows.append(Character_Relationship(from_character_id=from_id, to_character_id=to_id,
+                                                       relationship_type_id=key[2],
+                                                       pair_low=pair_low, pair_high=pair_high))
+                Character_Relationship.objects.bulk_create(rows)
+                c['written'] += len(rows)
+                touched.update(cid for row in rows for cid in (row.from_character_id, row.to_character_id))
+            self._touched_characters = touched
+            if skipped:
+                print(f"跳过关系 {skipped} 条（人物不存在）")
+
+    def _bump_stamps(self):
+        """bulk_create 不触发 signals：手动刷新所有读模型的变更戳，使缓存与进程内索引失效。"""
+        from create.signals import bump_after_bulk
+        bump_after_bulk([f'chapter:{n}' for n in self._touched_chapters] +
+                        [f'character_rel:{cid}' for cid in self._touched_characters])
+
+    def print_timing_report(self):
+        total = sum(seconds for _, _, _, seconds in self.timings)
+        print(f"{'读入':>10}{'写入':>10}{'耗时(s)':>10}  阶段")
+        for name, read, written, seconds in self.timings:
+            print(f"{read:>10}{written:>10}{seconds:>10.2f}  {name}")
+        print(f"{'':>10}{'':>10}{total:>10.2f}  合计")
+
+    def main_bulk(self):
+        """批量模式：与 main() 导入同样的数据，全部阶段在一个事务中完成，结束后打印各阶段耗时。"""
+        self.timings = []
+        with transaction.atomic():
+            self.bulk_continent()
+            self.bulk_relation_types()
+            self.bulk_calamity()
+            self.bulk_location()
+            self.bulk_chapter()
+            self.bulk_chapter_location()
+            self.bulk_character()
+            self.bulk_weapon()
+            self.bulk_relationship()
+        with self._stage('刷新变更戳'):
+            self._bump_stamps()
+        self.print_timing_report()
+
+    def main_sync(self, dry_run: bool = False, full: bool = False):
+        """增量同步模式：只写入与上次同步相比发生变化的记录（见 create/seeding.py）。"""
+        from create import seeding
+        if not dry_run:
+            self.timings = []
+            with transaction.atomic():
+                self.bulk_continent()
+                self.bulk_relation_types()
+        seeding.print_plan(seeding.sync(self.data_dir, dry_run=dry_run, full=full), dry_run=dry_run)
+
     def main(self):
         self.initialize_continent()  #非自增 重新创建大洲
         self.initialize_relation_types()
@@ -465,5 +717,16 @@ class Initialize:
 
 
 if __name__ == '__main__':
-     initial = Initialize()
-     initial.main()
+     # python initialize_databases.py          逐条导入
+     # python initialize_databases.py --bulk   批量导入（大数据量时使用）
+     # python initialize_databases.py --sync   增量同步（--dry-run 只打印计划，--full 忽略整文件哈希逐条对比）
+     # 批量模式可加 --workers N 指定规整 / 校验阶段的进程数
+     args = sys.argv[1:]
+     workers = int(args[args.index('--workers') + 1]) if '--workers' in args else None
+     initial = Initialize(workers=workers)
+     if '--sync' in args:
+         initial.main_sync(dry_run='--dry-run' in args, full='--full' in args)
+     elif '--bulk' in args:
+         initial.main_bulk()
+     else:
+         initial.main()
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+ASGI 部署：read/ 使用 async 视图，数据库查询在线程池中并发执行（见 read/async_views.py）。
+    pip install uvicorn
+    uvicorn jtw_info_management.asgi:application --workers 4
 """
 
 import os
@@ -12,5 +16,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "jtw_info_management.settings")
+# 让 settings.READ_ASYNC_VIEWS 生效
+os.environ.setdefault("JTW_SERVER", "asgi")
 
 application = get_asgi_application()
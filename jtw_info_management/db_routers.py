@@ -0,0 +1,169 @@
+"""
+读写分离的数据库路由：read/ 页面与 Query 的只读查询走只读副本（settings.REPLICA_DATABASE，默认 'replica'），
+其余读写一律走主库 'default'。DATABASES 中没有副本别名时全部走主库，行为与原来相同。
+
+副本存在复制延迟，以下情况即使处于只读范围内也改读主库：
+- 本次请求已经写过库（如写完后立刻渲染详情页）；
+- 本会话最近 REPLICA_LAG_SECONDS 秒内写过库：写请求的响应带上 PIN_COOKIE，浏览器随后的请求读主库，
+  保证“写完即可读到自己的修改”；
+- 所读的表在最近 REPLICA_LAG_SECONDS 秒内有写入（按 create/stamps 的表级变更戳判断）：
+  Query 结果缓存、内存索引等在各会话之间共享，不能用可能落后的副本数据填充。
+  变更戳在所有进程间共享（settings.CACHES['stamps']），其他 worker 的写入同样能看到；
+  变更戳缓存若被配置成进程内的 LocMemCache，看不到其他进程的写入，此时一律读主库。
+
+启用：
+    DATABASE_ROUTERS = ['jtw_info_management.db_routers.PrimaryReplicaRouter']
+    MIDDLEWARE += ['jtw_info_management.db_routers.ReplicaRoutingMiddleware']
+本地无第二个 MySQL 时，可设环境变量 JTW_DB_PROFILE=sqlite-replica 使用两个 SQLite 文件，
+并用 python manage.py sync_replica 把主库复制到副本（见 settings.py）。
+"""
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+
+from create import stamps
+
+# 写过库的会话在该 Cookie 有效期内读主库（值为到期时间，秒）
+PIN_COOKIE = 'jtw_primary_until'
+# 允许读副本的应用（其余应用的模型，如 sessions / auth，总是读主库）
+REPLICA_APPS = ('create',)
+
+# 只读范围的嵌套层数；当前请求是否写过库 / 是否被 Cookie 固定到主库
+_replica_depth: ContextVar[int] = ContextVar('jtw_replica_depth', default=0)
+_wrote: ContextVar[bool] = ContextVar('jtw_wrote', default=False)
+_pinned: ContextVar[bool] = ContextVar('jtw_pinned', default=False)
+
+
+def replica_alias() -> Optional[str]:
+    """已配置的副本别名；未配置副本时返回 None。"""
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def replica_lag_seconds() -> float:
+    return getattr(settings, 'REPLICA_LAG_SECONDS', 2.0)
+
+
+def stamps_shared() -> bool:
+    """变更戳是否存放在进程间共享的缓存中（否则无法得知其他进程刚写过哪些表）。"""
+    return not isinstance(stamps.stamp_cache(), LocMemCache)
+
+
+class replica_reads(ContextDecorator):
+    """
+    标记只读范围：其中的 ORM 读查询可以走副本（仍受上面的延迟规则约束）。
+    既可作上下文管理器，也可作函数装饰器，可嵌套。
+    """
+
+    def __enter__(self):
+        _replica_depth.set(_replica_depth.get() + 1)
+        return self
+
+    def __exit__(self, *exc):
+        _replica_depth.set(_replica_depth.get() - 1)
+        return False
+
+
+def replica_methods(cls):
+    """类装饰器：把类的公开方法都包在 replica_reads 中（用于 Query）。"""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith('_') or not callable(attr):
+            continue
+        setattr(cls, name, replica_reads()(attr))
+    return cls
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if (alias is None or not _replica_depth.get() or _wrote.get() or _pinned.get()
+                or model._meta.app_label not in REPLICA_APPS or not stamps_shared()):
+            return 'default'
+        # 表刚写过：副本可能还没追上
+        written = stamps.get_stamp(model._meta.model_name)
+        if time.time_ns() - written < replica_lag_seconds() * 1e9:
+            return 'default'
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 副本的表结构随复制（或 sync_replica）而来，不单独迁移
+        return db != replica_alias()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    read/ 应用的视图在只读范围内执行；读取 / 设置 PIN_COOKIE，让刚写过库的会话在复制延迟内读主库。
+    同时支持 WSGI 与 ASGI（async 视图链中不额外切换线程）。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        tokens = self._enter(request)
+        try:
+            return self._pin(self.get_response(request))
+        finally:
+            self._exit(tokens)
+
+    async def __acall__(self, request):
+        tokens = self._enter(request)
+        try:
+            return self._pin(await self.get_response(request))
+        finally:
+            self._exit(tokens)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # 只读范围在请求结束时随 _exit 一并复位
+        if getattr(view_func, '__module__', '').startswith('read.'):
+            _replica_depth.set(_replica_depth.get() + 1)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return ReplicaRoutingMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    @staticmethod
+    def _enter(request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        return _replica_depth.set(0), _wrote.set(False), _pinned.set(pinned_until > time.time())
+
+    @staticmethod
+    def _exit(tokens):
+        depth_token, wrote_token, pinned_token = tokens
+        _replica_depth.reset(depth_token)
+        _wrote.reset(wrote_token)
+        _pinned.reset(pinned_token)
+
+    @staticmethod
+    def _pin(response):
+        if _wrote.get():
+            lag = replica_lag_seconds()
+            response.set_cookie(PIN_COOKIE, f'{time.time() + lag:.3f}', max_age=max(int(lag + 0.999), 1),
+                                httponly=True, samesite='Lax')
+        return response
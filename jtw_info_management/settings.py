@@ -19,6 +19,41 @@ MEDIA_ROOT = BASE_DIR / 'media'  # 或直接用 'C:/Users/32939/Desktop/github_r
 
 # 媒体 URL 前缀：浏览器访问路径（必须是相对 URL）
 MEDIA_URL = '/media/'
+# 上传文件按内容哈希去重存储（create/storage.py）：同一内容只存一份，URL 不可变
+STORAGES = {
+    "default": {"BACKEND": "create.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# 媒体文件服务（read/media.py）：非内容寻址文件的缓存秒数；设为 nginx internal location 前缀
+# （如 '/protected-media/'）时由 nginx 经 X-Accel-Redirect 发送文件
+MEDIA_CACHE_SECONDS = 3600
+MEDIA_ACCEL_REDIRECT = None
+# 后台任务队列（create/jobs.py）：图片衍生图、快照重建等写入后的重活登记到 Job 表，
+# 由 python manage.py run_jobs 执行；JOBS_INLINE=True 时不经队列，事务提交后在当前线程直接执行（开发用）
+JOBS_INLINE = False
+JOB_WORKERS = 2
+JOB_POOL = "thread"          # thread / process
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 5          # 首次重试等待秒数，之后每次翻倍
+JOB_RETRY_MAX_DELAY = 3600
+JOB_TIMEOUT = 600            # running 超过这么多秒视为 worker 已退出，任务可被重新领取
+JOB_KEEP_DAYS = 7            # 已完成任务保留天数
+
+# 缓存：'stamps' 保存各表 / 各行的变更戳（见 create/stamps.py），必须是所有进程（Web worker、run_jobs、
+# build_snapshot 等）共享、且不淘汰条目的后端，默认用本机文件目录；部署到多台机器时改为共享的 redis（noeviction）
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "stamps": {
+        "BACKEND": "create.stamps.StampFileCache",
+        "LOCATION": BASE_DIR / "var" / "stamps",
+        "TIMEOUT": None,
+    },
+}
+# Query 结果缓存（create/tools.py）每个进程最多保存的条目数，超过时按 LRU 淘汰
+QUERY_CACHE_MAX_ENTRIES = 4096
+# 读模型快照文件（见 create/snapshot.py）：设为路径（如 BASE_DIR / 'var' / 'read_model.snap'）后，
+# read/ 页面从该文件的 mmap 作答，写入后自动重新生成；None 表示关闭，始终查询数据库
+READ_SNAPSHOT_PATH = None
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
@@ -55,6 +90,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "jtw_info_management.db_routers.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "jtw_info_management.urls"
@@ -93,6 +129,34 @@ DATABASES = {
     }
 }
 
+# 读写分离（见 jtw_info_management/db_routers.py）：DATABASES 中有 REPLICA_DATABASE 别名时，
+# read/ 页面与 Query 的只读查询走该副本；没有时全部走 default
+REPLICA_DATABASE = "replica"
+# 副本复制延迟上限（秒）：写过库的会话、刚写过的表在此时间内仍读主库
+REPLICA_LAG_SECONDS = 2.0
+DATABASE_ROUTERS = ["jtw_info_management.db_routers.PrimaryReplicaRouter"]
+
+# ASGI 部署（asgi.py 会设置 JTW_SERVER=asgi）：read/ 使用 async 视图（read/async_views.py），
+# 数据库访问交给 ASYNC_DB_THREADS 个线程的线程池，即异步读路径最多占用这么多个数据库连接
+READ_ASYNC_VIEWS = os.environ.get("JTW_SERVER") == "asgi"
+ASYNC_DB_THREADS = 8
+
+# 本地读写分离演练：JTW_DB_PROFILE=sqlite-replica 时改用两个 SQLite 文件作主库 / 副本，
+# 先 python manage.py migrate，再用 python manage.py sync_replica 把主库复制到副本
+if os.environ.get("JTW_DB_PROFILE") == "sqlite-replica":
+    SQLITE_DIR = Path(os.environ.get("JTW_SQLITE_DIR", BASE_DIR))
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": SQLITE_DIR / "db.sqlite3",
+        },
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": SQLITE_DIR / "db_replica.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -15,8 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
+from read.media import serve_media
 from . import  views
 
 urlpatterns = [
@@ -26,4 +28,6 @@ urlpatterns = [
     path("delete/" , include('delete.urls') , name = "delete" ),
     path("update/" , include('update.urls') , name = "update" ),
     path("read/" , include('read.urls') , name = "read" ),
+    # 上传的图片（开发与生产模式均由 serve_media 提供，支持 Range / ETag / X-Accel-Redirect）
+    path(settings.MEDIA_URL.lstrip('/') + "<path:path>", serve_media, name = "media" ),
 ]
@@ -0,0 +1,193 @@
+"""
+read/ 视图的 async 版本：ASGI 部署（settings.READ_ASYNC_VIEWS）时由 read/urls.py 选用，
+URL、参数与返回内容与 read/views.py 完全一致。
+
+数据库访问都经 create/async_query.py 交给数据库线程池，事件循环只做参数解析、模板渲染与等待；
+一个慢查询只占用线程池中的一个线程，不会阻塞同一进程里其他请求。
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse, Http404
+from django.shortcuts import render
+from django.urls import reverse
+
+from create import async_query
+from create.async_query import in_db_thread
+from create.autocomplete import name_indexes, TOP_K
+from create.graph import relation_graph
+from create.models import Character
+from create.search import search_index, DOC_SOURCES
+from create.stamps import conditional_on
+from .views import (Query, SUBGRAPH_DEFAULT_DEPTH, SUBGRAPH_MAX_DEPTH, SUBGRAPH_DEFAULT_NODES, SUBGRAPH_MAX_NODES,
+                    _page_params, _search_result_url,
+                    main_page, get_page_read_main, get_query_cache_stats, get_fragment_cache_stats,
+                    get_job_stats)  # noqa: F401
+
+#全局变量：与同步视图共用同一个 Query（及其结果缓存 / 快照）
+AsyncQuery = async_query.AsyncQuery(Query)
+
+_JSON = {'ensure_ascii': False}
+# 模板中的 entity_links 过滤器首次使用 / 名字变化后会从数据库重建名字表，{% fragment %} 标签要读取变更戳，
+# 这类模板放进线程池渲染
+render_in_db_thread = in_db_thread(render)
+
+
+@conditional_on('calamity', 'entity_names')
+async def get_page_read_calamity(request):
+    calamities = await AsyncQuery.all_calamity()
+    return await render_in_db_thread(request, "read_calamity.html", {'calamities': calamities})
+
+
+@conditional_on('character')
+async def get_page_read_character(request):
+    page = await AsyncQuery.page_character()
+    card_ids = [item['id'] for item in page['items']]
+    return await render_in_db_thread(request, "read_character.html",
+                                     {'characters': page['items'], 'next_cursor': page['next'], 'card_ids': card_ids})
+
+
+@conditional_on('character')
+async def read_character_list(request):
+    params = _page_params(request)
+    if params is None:
+        return JsonResponse({'error': 'after / limit 必须为整数'}, status=400, json_dumps_params=_JSON)
+    page = await AsyncQuery.page_character(*params)
+    for item in page['items']:
+        item['url'] = reverse('read_single_character', args=[item['id']])
+    return JsonResponse(page, json_dumps_params=_JSON)
+
+
+@conditional_on('character:{id}', 'character_rel:{id}', 'character_weapon:{id}', 'relationship_type')
+async def read_single_character(request, id):
+    character = await AsyncQuery.single_character(id)
+    return await render_in_db_thread(request, "read_single_character.html", {'character': character})
+
+
+@conditional_on('chapter')
+async def get_page_read_chapter(request):
+    page = await AsyncQuery.page_chaptertitle()
+    return render(request, "read_chapter.html", {'chapters': page['items'], 'next_cursor': page['next']})
+
+
+@conditional_on('chapter')
+async def read_chapter_list(request):
+    params = _page_params(request)
+    if params is None:
+        return JsonResponse({'error': 'after / limit 必须为整数'}, status=400, json_dumps_params=_JSON)
+    page = await AsyncQuery.page_chaptertitle(*params)
+    for item in page['items']:
+        item['url'] = reverse('read_single_chapter', args=[item['chapter_number']])
+    return JsonResponse(page, json_dumps_params=_JSON)
+
+
+@conditional_on('weapon', 'character')
+async def read_weapon_list(request):
+    params = _page_params(request)
+    if params is None:
+        return JsonResponse({'error': 'after / limit 必须为整数'}, status=400, json_dumps_params=_JSON)
+    return JsonResponse(await AsyncQuery.page_weapon(*params), json_dumps_params=_JSON)
+
+
+@conditional_on('chapter:{chapter_number}', 'location', 'entity_names')
+async def read_single_chapter(request, chapter_number: int):
+    chapter = await AsyncQuery.single_chapter(chapter_number)
+    return await render_in_db_thread(request, "read_single_chapter.html", {'chapter': chapter})
+
+
+@conditional_on('location', 'continent', 'chapter_location', 'chapter')
+async def read_single_location(request, id):
+    try:
+        location = await AsyncQuery.single_location(id)
+    except ObjectDoesNotExist:
+        raise Http404(f"未找到ID为 {id} 的地点")
+    return render(request, "read_single_location.html", {'location': location})
+
+
+@conditional_on('character_relationship')
+async def get_page_read_relationship(request):
+    center = request.GET.get('center', '')
+    # 关系图首次使用时从数据库载入，放进线程池
+    center = int(center) if center.isdigit() else await in_db_thread(relation_graph.hub)()
+    depth = request.GET.get('depth', '')
+    depth = min(int(depth), SUBGRAPH_MAX_DEPTH) if depth.isdigit() else SUBGRAPH_DEFAULT_DEPTH
+    return render(request, "read_relationship.html", {"center": center, "depth": depth})
+
+
+@conditional_on('character_relationship', 'character', 'relationship_type')
+async def read_subgraph(request, id):
+    try:
+        depth = min(max(int(request.GET.get('depth', SUBGRAPH_DEFAULT_DEPTH)), 1), SUBGRAPH_MAX_DEPTH)
+        limit = min(max(int(request.GET.get('limit', SUBGRAPH_DEFAULT_NODES)), 1), SUBGRAPH_MAX_NODES)
+    except ValueError:
+        return JsonResponse({'error': 'depth / limit 必须为整数'}, status=400, json_dumps_params=_JSON)
+    types = request.GET.getlist('type')
+    data = await AsyncQuery.relationship_subgraph(id, depth, limit, types or None)
+    return JsonResponse(data, json_dumps_params=_JSON)
+
+
+@conditional_on('chapter', 'calamity', 'character', 'location', 'weapon')
+async def search(request):
+    q = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    kinds = [kind for kind in request.GET.getlist('kind') if kind in DOC_SOURCES]
+
+    # 索引过期时会从数据库增量重建，放进线程池
+    results = await in_db_thread(search_index.search)(q, limit=limit, kinds=kinds or None)
+    for item in results:
+        item['url'] = _search_result_url(item)
+    return JsonResponse({'query': q, 'count': len(results), 'results': results}, json_dumps_params=_JSON)
+
+
+@conditional_on('character_mention', 'character')
+async def read_cooccurrence(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 200)
+        character = request.GET.get('character')
+        character = int(character) if character not in (None, '') else None
+    except ValueError:
+        return JsonResponse({'error': 'limit / character 必须为整数'}, status=400, json_dumps_params=_JSON)
+    pairs = await AsyncQuery.cooccurrence(limit, character)
+    return JsonResponse({'count': len(pairs), 'pairs': pairs}, json_dumps_params=_JSON)
+
+
+async def autocomplete(request):
+    kind = request.GET.get('kind', 'character')
+    if kind not in name_indexes:
+        return JsonResponse({'error': f'kind 只能是 {"/".join(name_indexes)}'}, status=400, json_dumps_params=_JSON)
+    q = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), TOP_K)
+    except ValueError:
+        limit = 10
+    results = await in_db_thread(name_indexes[kind].complete)(q, limit)
+    return JsonResponse({'kind': kind, 'query': q, 'results': results}, json_dumps_params=_JSON)
+
+
+def _character_id(value: str):
+    return Character.objects.filter(name=value).values_list('id', flat=True).first()
+
+
+@conditional_on('character_relationship', 'character', 'relationship_type')
+async def read_relationship_path(request):
+    ids = []
+    for param in ('from', 'to'):
+        value = request.GET.get(param, '').strip()
+        if value.isdigit():
+            ids.append(int(value))
+            continue
+        character_id = await in_db_thread(_character_id)(value) if value else None
+        if character_id is None:
+            return JsonResponse({'error': f'未找到角色：{value}'}, status=404, json_dumps_params=_JSON)
+        ids.append(character_id)
+
+    path = await AsyncQuery.relationship_path(*ids)
+    return JsonResponse({
+        'from': ids[0],
+        'to': ids[1],
+        'found': path is not None,
+        'length': len(path) if path is not None else None,
+        'path': path or [],
+        'types': [step['type'] for step in path or []],
+    }, json_dumps_params=_JSON)
@@ -0,0 +1,146 @@
+"""
+媒体文件（MEDIA_ROOT 下的上传图片及其衍生图）服务视图，挂在 MEDIA_URL 下（见 jtw_info_management/urls.py），
+取代开发模式下才有的 django.conf.urls.static.static()。
+
+- 整个文件用 FileResponse 返回打开的文件：gunicorn 等提供 wsgi.file_wrapper 的服务器直接 os.sendfile，
+  文件内容不经过 Python；
+- 支持单段 Range（bytes=a-b / a- / -n）与 If-Range，返回 206 / 416；多段 Range 按整个文件返回；
+- ETag：内容寻址的文件（create/storage.py，blobs/...）用内容哈希，其余用 mtime + 大小；
+  If-None-Match / If-Modified-Since 命中时返回 304；
+- Cache-Control：内容寻址的文件内容永不改变，一年 + immutable；其余 MEDIA_CACHE_SECONDS 秒；
+- 上传临时目录（create/storage.py 的 TEMP_DIR，写到一半的文件）返回 404；用 nginx 直接 alias MEDIA_ROOT 时
+  同样要排除该目录（location /media/tmp/ { return 404; }）；
+- 配置 MEDIA_ACCEL_REDIRECT（如 '/protected-media/'）时只返回响应头与 X-Accel-Redirect，
+  由前面的 nginx（internal location，alias 到 MEDIA_ROOT）发送文件，Range 也由 nginx 处理：
+      location /protected-media/ { internal; alias /srv/jtw/media/; }
+ASGI 下 Django 逐块读文件发送（没有 sendfile），生产环境建议配合 MEDIA_ACCEL_REDIRECT 使用。
+压测见 benchmarks/bench_media.py。
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from create.storage import is_immutable, is_staging
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """只读出文件 [start, start + length) 的文件对象，供 206 响应使用。"""
+
+    def __init__(self, file, start: int, length: int):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _etag(path: str, stat) -> str:
+    if is_immutable(path):
+        return '"%s"' % os.path.splitext(os.path.basename(path))[0]
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def _byte_range(header: str, size: int):
+    """解析单段 Range，返回 (start, length)；不是单段字节范围时返回 None，范围不可满足时返回 (None, None)。"""
+    match = _RANGE.match(header.replace(' ', ''))
+    if match is None or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-n：最后 n 字节
+        length = min(int(last), size)
+        return (size - length, length) if length else (None, None)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None, None
+    return start, end - start + 1
+
+
+def _headers(response, path: str, stat, etag: str, content_type: str):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if is_immutable(path) else \
+        f"public, max-age={getattr(settings, 'MEDIA_CACHE_SECONDS', 3600)}"
+    response.headers['Accept-Ranges'] = 'bytes'
+    if content_type:
+        response.headers['Content-Type'] = content_type
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404(f"媒体文件不存在: {path}")
+    path = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    if is_staging(path):
+        raise Http404(f"媒体文件不存在: {path}")
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404(f"媒体文件不存在: {path}")
+    if not os.path.isfile(full_path):
+        raise Http404(f"媒体文件不存在: {path}")
+    etag = _etag(path, stat)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    # 条件请求：有 If-None-Match 时只看 ETag，否则看 If-Modified-Since
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        not_modified = etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    else:
+        not_modified = 'HTTP_IF_MODIFIED_SINCE' in request.META and \
+            not was_modified_since(request.META['HTTP_IF_MODIFIED_SINCE'], stat.st_mtime)
+    if not_modified:
+        return _headers(HttpResponseNotModified(), path, stat, etag, None)
+
+    accel = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+    if accel:
+        response = HttpResponse()
+        response.headers['X-Accel-Redirect'] = accel.rstrip('/') + '/' + path
+        return _headers(response, path, stat, etag, content_type)
+
+    # If-Range 与当前 ETag 不一致时（文件已变）忽略 Range，返回整个文件
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = _byte_range(request.META['HTTP_RANGE'], stat.st_size)
+    if byte_range == (None, None):
+        response = HttpResponse(status=416)
+        response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+        return _headers(response, path, stat, etag, None)
+
+    if request.method == 'HEAD':
+        response = HttpResponse()
+        response.headers['Content-Length'] = stat.st_size
+        return _headers(response, path, stat, etag, content_type)
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(FileRange(file, start, length), content_type=content_type, status=206)
+        response.headers['Content-Length'] = length
+        response.headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{stat.st_size}'
+    return _headers(response, path, stat, etag, content_type)
@@ -0,0 +1,24 @@
+"""
+{% link_entities %} 模板标签：把章节 / 磨难概要中的角色名、地名渲染成链接（见 create/linker.py）。
+
+用法（先 {% load entity_links %}）：
+    {% link_entities "chapter" chapter.chapter_number chapter.summary as linked %}
+    {{ linked|linebreaks }}
+
+返回的是已转义的 SafeString，可以直接接 |linebreaks。
+名字集合的变更戳每次渲染只读一次（记在 render_context 中），磨难列表页逐条标注时不会每条都读一次。
+"""
+from django import template
+
+from create import stamps
+from create.linker import entity_linker, NAMES_STAMP
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def link_entities(context, doc_kind, doc_id, text):
+    names_stamp = context.render_context.get(NAMES_STAMP)
+    if names_stamp is None:
+        names_stamp = context.render_context[NAMES_STAMP] = stamps.get_stamp(NAMES_STAMP)
+    return entity_linker.link(doc_kind, doc_id, text, names_stamp)
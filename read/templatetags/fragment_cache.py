@@ -0,0 +1,55 @@
+"""
+{% fragment %} 模板标签：把一段模板渲染结果放进 create.fragments.fragment_cache。
+
+用法（先 {% load fragment_cache %}）：
+    {% fragment "chapter_body" "location" chapter=chapter.chapter_number %}
+        ...章节正文...
+    {% endfragment %}
+
+- 第一个参数是片段名，用于命中统计；
+- 其余位置参数是整表依赖（变更戳名，如 "location"）；
+- 关键字参数是实体依赖：character=12 依赖 'character:12'；值为列表时依赖其中每个 id，
+  如 character=character_ids 表示卡片网格依赖这一页上的每个角色。
+"""
+from django import template
+from django.template.base import token_kwargs
+
+from create.fragments import fragment_cache
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, tables, entities):
+        self.nodelist = nodelist
+        self.name = name
+        self.tables = tables
+        self.entities = entities
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        depends = [str(table.resolve(context)) for table in self.tables]
+        for prefix, value in self.entities.items():
+            value = value.resolve(context)
+            ids = value if isinstance(value, (list, tuple, set)) else [value]
+            depends.extend(f'{prefix}:{entity_id}' for entity_id in ids)
+        return fragment_cache.get_or_render(name, depends, lambda: self.nodelist.render(context))
+
+
+@register.tag('fragment')
+def do_fragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError("'fragment' 标签至少需要一个片段名参数")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+
+    name = parser.compile_filter(bits[1])
+    tables = []
+    remaining = bits[2:]
+    while remaining and '=' not in remaining[0]:
+        tables.append(parser.compile_filter(remaining.pop(0)))
+    entities = token_kwargs(remaining, parser, support_legacy=False)
+    if remaining:
+        raise template.TemplateSyntaxError(f"'fragment' 标签无法解析参数: {' '.join(remaining)}")
+    return FragmentNode(nodelist, name, tables, entities)
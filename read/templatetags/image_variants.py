@@ -0,0 +1,37 @@
+"""
+{% picture %} 模板标签：按显示宽度输出图片衍生图（见 create/images.py）的 <picture>。
+
+用法（先 {% load image_variants %}）：
+    {% picture character.images character.image 300 alt="悟空 图片" %}
+
+- 支持 WebP 的浏览器取 <source type="image/webp">，其余取 JPEG；
+- srcset 列出各尺寸，浏览器按 sizes（显示宽度）和屏幕像素比选最小的够用尺寸；
+- src 为宽度不小于显示宽度的最小 JPEG 衍生图（不认识 srcset 的浏览器用它）；
+- 衍生图尚未生成（images 为 None）时输出指向原图 fallback 的普通 <img>。
+其余关键字参数原样作为 <img> 的属性。
+"""
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def _srcset(variants, fmt):
+    return ', '.join(f"{entry[fmt]} {width}w" for width, entry in variants)
+
+
+@register.simple_tag
+def picture(images, fallback, width, **attrs):
+    width = int(width)
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    if not images:
+        return format_html('<img src="{}"{}>', fallback, extra)
+    # 按宽度去重（原图本身很小时几种尺寸宽度相同），从小到大
+    variants = sorted({entry['width']: entry for entry in images.values()}.items())
+    chosen = next((entry for w, entry in variants if w >= width), variants[-1][1])
+    sizes = f'{width}px'
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" decoding="async"{}></picture>',
+        _srcset(variants, 'webp'), sizes, chosen['jpeg'], _srcset(variants, 'jpeg'), sizes,
+        chosen['width'], chosen['height'], extra)
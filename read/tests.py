@@ -1,3 +1,205 @@
-from django.test import TestCase
+import contextvars
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import override_settings, RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from create import stamps
+from create.autocomplete import name_stamp
+from create.models import Character
+from jtw_info_management.db_routers import PIN_COOKIE, PrimaryReplicaRouter, replica_reads, ReplicaRoutingMiddleware
+from .media import _byte_range
+
+
+# 测试使用独立的进程内缓存：变更戳不写入 var/stamps
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jtw-read-tests'},
+    'stamps': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'jtw-read-tests-stamps'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.character = Character.objects.create(name='孙悟空', race='猴', ability='七十二变', intro='')
+        stamps.bump(f'character:{self.character.id}')
+        self.url = reverse('read_single_character', args=[self.character.id])
+
+    def test_not_modified_until_write(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 无关的写入不影响
+        stamps.bump('character:0', 'chapter')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.character.ability = '筋斗云'
+            self.character.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertContains(response, '筋斗云')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AutocompleteViewTests(TestCase):
+
+    def setUp(self):
+        stamps.bump(name_stamp('character'))
+
+    def test_results(self):
+        for name in ('孙悟空', '孙悟', '猪八戒'):
+            Character.objects.create(name=name, race='人', ability='', intro='')
+        response = self.client.get(reverse('autocomplete'), {'kind': 'character', 'q': '孙', 'limit': 1})
+        self.assertEqual(response.json()['results'], ['孙悟'])
+
+    def test_bad_kind(self):
+        response = self.client.get(reverse('autocomplete'), {'kind': 'chapter', 'q': '孙'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        # 变更戳放在文件缓存中，视为进程间共享
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches = dict(TEST_CACHES, stamps={'BACKEND': 'create.stamps.StampFileCache', 'LOCATION': location})
+        settings = override_settings(CACHES=caches, REPLICA_LAG_SECONDS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch('jtw_info_management.db_routers.replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = PrimaryReplicaRouter()
+
+    def route(self, model=Character):
+        with replica_reads():
+            return self.router.db_for_read(model)
+
+    def run_isolated(self, func):
+        # 路由状态保存在 ContextVar 中：在空白上下文里执行，不受本线程之前写库的影响
+        return contextvars.Context().run(func)
+
+    def test_reads_use_replica_only_inside_replica_reads(self):
+        self.assertEqual(self.run_isolated(lambda: self.router.db_for_read(Character)), 'default')
+        self.assertEqual(self.run_isolated(self.route), 'replica')
+
+    def test_recently_written_table_reads_primary(self):
+        with override_settings(REPLICA_LAG_SECONDS=60):
+            stamps.bump('character')
+            self.assertEqual(self.run_isolated(self.route), 'default')
+
+    def test_write_pins_request_to_primary(self):
+        def write_then_read():
+            self.router.db_for_write(Character)
+            return self.route()
+        self.assertEqual(self.run_isolated(write_then_read), 'default')
+
+    def test_other_apps_and_local_stamps_read_primary(self):
+        self.assertEqual(self.run_isolated(lambda: self.route(Session)), 'default')
+        with override_settings(CACHES=TEST_CACHES):
+            self.assertEqual(self.run_isolated(self.route), 'default')
+
+    def test_middleware_pin_cookie(self):
+        routes = []
+
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Character)
+            else:
+                routes.append(self.route())
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        with override_settings(REPLICA_LAG_SECONDS=5):
+            response = self.run_isolated(lambda: middleware(RequestFactory().post('/')))
+        pinned_until = float(response.cookies[PIN_COOKIE].value)
+        self.assertGreater(pinned_until, time.time())
+        # 带着 Cookie 的后续请求读主库，其他会话照常读副本
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = str(pinned_until)
+        self.run_isolated(lambda: middleware(request))
+        self.run_isolated(lambda: middleware(RequestFactory().get('/')))
+        self.assertEqual(routes, ['default', 'replica'])
+
+
+class ByteRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        cases = {
+            'bytes=0-99': (0, 100),
+            'bytes=10-': (10, 90),
+            'bytes=-10': (90, 10),
+            'bytes=99-99': (99, 1),
+            'bytes = 0 - 9': (0, 10),
+            # 结尾超出文件时截到最后一字节；后缀长度超出时返回整个文件
+            'bytes=50-1000': (50, 50),
+            'bytes=-1000': (0, 100),
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(_byte_range(header, 100), expected)
+
+    def test_unsatisfiable(self):
+        for header, size in (('bytes=100-', 100), ('bytes=200-300', 100), ('bytes=5-2', 100),
+                             ('bytes=-0', 100), ('bytes=0-', 0), ('bytes=-5', 0)):
+            with self.subTest(header=header, size=size):
+                self.assertEqual(_byte_range(header, size), (None, None))
+
+    def test_not_a_single_byte_range(self):
+        for header in ('bytes=-', 'bytes=0-1,5-6', 'items=0-1', 'bytes=a-b', ''):
+            with self.subTest(header=header):
+                self.assertIsNone(_byte_range(header, 100))
+
+
+class ServeMediaTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        os.makedirs(os.path.join(self.root, 'characters'))
+        with open(os.path.join(self.root, 'characters', 'a.txt'), 'wb') as f:
+            f.write(b'0123456789')
+        settings = override_settings(MEDIA_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.url = reverse('media', args=['characters/a.txt'])
+
+    def test_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 2-4/10')
+
+    def test_stale_if_range_returns_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */10')
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url).headers['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_path_outside_media_root(self):
+        self.assertEqual(self.client.get(reverse('media', args=['../etc/passwd'])).status_code, 404)
+
+    def test_staging_files_not_served(self):
+        os.makedirs(os.path.join(self.root, 'tmp'))
+        with open(os.path.join(self.root, 'tmp', 'upload.jpg'), 'wb') as f:
+            f.write(b'partial')
+        self.assertEqual(self.client.get(reverse('media', args=['tmp/upload.jpg'])).status_code, 404)
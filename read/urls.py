@@ -1,19 +1,33 @@
 from django.urls import path, include
-from . import  views
-from django.conf.urls.static import static
 from django.conf import settings
 
+# ASGI 部署时使用 async 版本的视图（见 read/async_views.py），URL 与返回内容相同
+if getattr(settings, 'READ_ASYNC_VIEWS', False):
+    from . import async_views as views
+else:
+    from . import  views
+
 urlpatterns = [
     path("mainpage/", views.main_page, name="main_page"),
     path("", views.get_page_read_main , name = "read_mainpage" ),
     path("read_character", views.get_page_read_character, name = "read_character" ),
+    path("read_character_list", views.read_character_list, name = "read_character_list" ),
     path("read_single_character/<int:id>", views.read_single_character, name = "read_single_character" ),
     path("read_calamity", views.get_page_read_calamity, name = "read_calamity" ),
     path("read_chapter", views.get_page_read_chapter, name = "read_chapter" ),
+    path("read_chapter_list", views.read_chapter_list, name = "read_chapter_list" ),
+    path("read_weapon_list", views.read_weapon_list, name = "read_weapon_list" ),
     path("read_single_chapter/<int:chapter_number>/", views.read_single_chapter, name="read_single_chapter"),
+    path("read_single_location/<int:id>", views.read_single_location, name = "read_single_location" ),
     path("read_relationship", views.get_page_read_relationship, name = "read_relationship" ),
+    path("read_subgraph/<int:id>", views.read_subgraph, name = "read_subgraph" ),
+    path("read_path", views.read_relationship_path, name = "read_path" ),
+    path("search", views.search, name = "search" ),
+    path("autocomplete", views.autocomplete, name = "autocomplete" ),
+    path("read_cooccurrence", views.read_cooccurrence, name = "read_cooccurrence" ),
+    path("cache_stats", views.get_query_cache_stats, name = "query_cache_stats" ),
+    path("fragment_stats", views.get_fragment_cache_stats, name = "fragment_cache_stats" ),
+    path("job_stats", views.get_job_stats, name = "job_stats" ),
 ]
 
-# 仅在开发模式下服务媒体文件（DEBUG=True 时）
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# 媒体文件由 read/media.py 的 serve_media 提供，挂在项目 urls 的 MEDIA_URL 下
\ No newline at end of file
@@ -1,8 +1,27 @@
 from django.shortcuts import render
-from create.tools import Query
+from django.http import JsonResponse, Http404
+from django.core.exceptions import ObjectDoesNotExist
+from django.urls import reverse
+from create.tools import PAGE_SIZE
+from create.snapshot import read_query
+from create.stamps import conditional_on
+from create.fragments import fragment_cache
+from create import jobs
+from create.models import Character
+from create.graph import relation_graph
+from create.search import search_index, DOC_SOURCES
+from create.autocomplete import name_indexes, TOP_K
 
-#全局变量
-Query = Query()
+# k 跳子图的默认 / 最大深度与角色数
+SUBGRAPH_DEFAULT_DEPTH = 2
+SUBGRAPH_MAX_DEPTH = 4
+SUBGRAPH_DEFAULT_NODES = 200
+SUBGRAPH_MAX_NODES = 1000
+
+#全局变量（配置了 READ_SNAPSHOT_PATH 时从 mmap 快照作答，见 create/snapshot.py）
+Query = read_query()
+
+# 读页面均以 @conditional_on 声明所依赖的变更戳：数据未变时条件 GET 直接返回 304
 
 def main_page(request):
     return render(request, "main_page.html")
@@ -11,6 +30,7 @@ def main_page(request):
 def get_page_read_main(request):
     return render(request,"read_mainpage.html")
 
+@conditional_on('calamity', 'entity_names')
 def get_page_read_calamity(request):
     """
     渲染九九八十一难页面。
@@ -20,11 +40,31 @@ def get_page_read_calamity(request):
     return render(request, "read_calamity.html", {'calamities': calamities})
 
 
+@conditional_on('character')
 def get_page_read_character(request):
-    characters = Query.all_character()
-    print(characters)
-    return render(request,"read_character.html",{'characters': characters})
+    """
+    角色殿堂：只渲染第一页，后续页由模板滚动到底部时请求 read_character_list 追加。
+    """
+    page = Query.page_character()
+    # card_ids：卡片网格片段缓存所依赖的角色
+    card_ids = [item['id'] for item in page['items']]
+    return render(request,"read_character.html",{'characters': page['items'], 'next_cursor': page['next'], 'card_ids': card_ids})
+
+@conditional_on('character')
+def read_character_list(request):
+    """
+    角色列表 JSON（键集分页）：/read/read_character_list?after=<游标>&limit=<条数>
+    返回 {'items': [{'id', 'name', 'url'}, ...], 'next': 游标 | null}
+    """
+    params = _page_params(request)
+    if params is None:
+        return JsonResponse({'error': 'after / limit 必须为整数'}, status=400, json_dumps_params={'ensure_ascii': False})
+    page = Query.page_character(*params)
+    for item in page['items']:
+        item['url'] = reverse('read_single_character', args=[item['id']])
+    return JsonResponse(page, json_dumps_params={'ensure_ascii': False})
 
+@conditional_on('character:{id}', 'character_rel:{id}', 'character_weapon:{id}', 'relationship_type')
 def read_single_character(request, id):
     print(id)
     character = Query.single_character(id)
@@ -32,63 +72,198 @@ def read_single_character(request, id):
     return render(request,"read_single_character.html",{'character': character})
 
 
+@conditional_on('chapter')
 def get_page_read_chapter(request):
-    chapters = Query.all_chaptertitle()
-    #print(chapters)
-    return render(request, "read_chapter.html", {'chapters': chapters})
+    page = Query.page_chaptertitle()
+    return render(request, "read_chapter.html", {'chapters': page['items'], 'next_cursor': page['next']})
+
+@conditional_on('chapter')
+def read_chapter_list(request):
+    """
+    章节列表 JSON（按回合号键集分页）：/read/read_chapter_list?after=<回合号>&limit=<条数>
+    """
+    params = _page_params(request)
+    if params is None:
+        return JsonResponse({'error': 'after / limit 必须为整数'}, status=400, json_dumps_params={'ensure_ascii': False})
+    page = Query.page_chaptertitle(*params)
+    for item in page['items']:
+        item['url'] = reverse('read_single_chapter', args=[item['chapter_number']])
+    return JsonResponse(page, json_dumps_params={'ensure_ascii': False})
 
+@conditional_on('weapon', 'character')
+def read_weapon_list(request):
+    """
+    武器列表 JSON（按 id 键集分页）：/read/read_weapon_list?after=<游标>&limit=<条数>
+    """
+    params = _page_params(request)
+    if params is None:
+        return JsonResponse({'error': 'after / limit 必须为整数'}, status=400, json_dumps_params={'ensure_ascii': False})
+    return JsonResponse(Query.page_weapon(*params), json_dumps_params={'ensure_ascii': False})
+
+def _page_params(request):
+    """
+    解析分页参数 (after, limit)；参数不是整数时返回 None。
+    """
+    try:
+        after = request.GET.get('after')
+        after = int(after) if after not in (None, '') else None
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        return None
+    return after, limit
+
+@conditional_on('chapter:{chapter_number}', 'location', 'entity_names')
 def read_single_chapter(request,chapter_number: int):
     chapter =Query.single_chapter(chapter_number)
     print(chapter)
     return render(request, "read_single_chapter.html",{'chapter': chapter})
 
+@conditional_on('location', 'continent', 'chapter_location', 'chapter')
+def read_single_location(request, id):
+    """
+    地点详情：所属大陆 + 出场时间线（该地点出现过的各回，按回合号升序）。
+    """
+    try:
+        location = Query.single_location(id)
+    except ObjectDoesNotExist:
+        raise Http404(f"未找到ID为 {id} 的地点")
+    return render(request, "read_single_location.html", {'location': location})
+
+@conditional_on('character_relationship')
 def get_page_read_relationship(request):
     """
-    1.获取Character_Relationship所有实例
+    关系图谱页面：不再内嵌整张关系表，只传入中心角色，由页面请求 read_subgraph 获取 k 跳邻域子图。
+    /read/read_relationship?center=<角色 id>&depth=<跳数>，未指定中心时以关系最多的角色为中心。
     """
-    data = Query.all_relationship()
-    print(data)
-    new_data = rm_repeated_relationship(data)
-    print(new_data)
-    return render(request,"read_relationship.html",{"relationships" : new_data})
+    center = request.GET.get('center', '')
+    center = int(center) if center.isdigit() else relation_graph.hub()
+    depth = request.GET.get('depth', '')
+    depth = min(int(depth), SUBGRAPH_MAX_DEPTH) if depth.isdigit() else SUBGRAPH_DEFAULT_DEPTH
+    return render(request,"read_relationship.html",{"center": center, "depth": depth})
 
-def rm_repeated_relationship(data):
+@conditional_on('character_relationship', 'character', 'relationship_type')
+def read_subgraph(request, id):
     """
-    检测并删除对称重复的关系（即 A→B 和 B→A 同时存在的情况）
+    k 跳关系子图（JSON）：/read/read_subgraph/<角色 id>?depth=2&limit=200&type=师徒&type=父子
+    depth 不超过 SUBGRAPH_MAX_DEPTH，limit（角色数）不超过 SUBGRAPH_MAX_NODES。
     """
-    if not data:
-        return data, []
-    # 用来快速判断“反向关系是否已存在”
-    seen_pairs = set()
-    # 最终保留的关系
-    cleaned = []
-    # 被删除的关系 id
-    removed = []
+    try:
+        depth = min(max(int(request.GET.get('depth', SUBGRAPH_DEFAULT_DEPTH)), 1), SUBGRAPH_MAX_DEPTH)
+        limit = min(max(int(request.GET.get('limit', SUBGRAPH_DEFAULT_NODES)), 1), SUBGRAPH_MAX_NODES)
+    except ValueError:
+        return JsonResponse({'error': 'depth / limit 必须为整数'}, status=400, json_dumps_params={'ensure_ascii': False})
+    types = request.GET.getlist('type')
 
-    for item in data:
-        fid = item['from_character']['id']
-        tid = item['to_character']['id']
-        rel_id = item['id']
+    data = Query.relationship_subgraph(id, depth=depth, max_nodes=limit, types=types or None)
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
 
-        # 构造两个方向的“标准化键”：始终让较小的 ID 在前
-        forward = (min(fid, tid), max(fid, tid))
-        backward = (max(fid, tid), min(fid, tid))  # 其实和 forward 一样
+@conditional_on('chapter', 'calamity', 'character', 'location', 'weapon')
+def search(request):
+    """
+    全文检索接口（JSON）：/read/search?q=关键词&limit=20&kind=chapter&kind=character
+    覆盖章节、磨难、角色、地点、武器，按 BM25 得分排序。
+    """
+    q = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    kinds = [kind for kind in request.GET.getlist('kind') if kind in DOC_SOURCES]
+
+    results = search_index.search(q, limit=limit, kinds=kinds or None)
+    for item in results:
+        item['url'] = _search_result_url(item)
+    return JsonResponse({'query': q, 'count': len(results), 'results': results},
+                        json_dumps_params={'ensure_ascii': False})
+
+@conditional_on('character_mention', 'character')
+def read_cooccurrence(request):
+    """
+    角色共现接口（JSON）：/read/read_cooccurrence?limit=20&character=<角色id>
+    返回共同出现章节最多的角色对；带 character 时只返回与该角色同时出现的角色。
+    提及表需先用 python manage.py build_mentions 生成。
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 200)
+        character = request.GET.get('character')
+        character = int(character) if character not in (None, '') else None
+    except ValueError:
+        return JsonResponse({'error': 'limit / character 必须为整数'}, status=400, json_dumps_params={'ensure_ascii': False})
+    pairs = Query.cooccurrence(limit, character)
+    return JsonResponse({'count': len(pairs), 'pairs': pairs}, json_dumps_params={'ensure_ascii': False})
+
+def autocomplete(request):
+    """
+    名称自动补全接口（JSON）：/read/autocomplete?kind=character&q=孙&limit=10
+    kind 为 character / weapon / location；q 为名字前缀或拼音首字母前缀（需安装 pypinyin）。
+    返回 {'kind', 'query', 'results': [名字, ...]}，名字越短越靠前。
+    """
+    kind = request.GET.get('kind', 'character')
+    if kind not in name_indexes:
+        return JsonResponse({'error': f'kind 只能是 {"/".join(name_indexes)}'}, status=400,
+                            json_dumps_params={'ensure_ascii': False})
+    q = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), TOP_K)
+    except ValueError:
+        limit = 10
+    results = name_indexes[kind].complete(q, limit)
+    return JsonResponse({'kind': kind, 'query': q, 'results': results}, json_dumps_params={'ensure_ascii': False})
 
-        key = forward  # 只需要一个方向的键即可
+def _search_result_url(item):
+    if item['kind'] == 'chapter':
+        return reverse('read_single_chapter', args=[item['id']])
+    if item['kind'] == 'character':
+        return reverse('read_single_character', args=[item['id']])
+    if item['kind'] == 'calamity':
+        return reverse('read_calamity')
+    if item['kind'] == 'location':
+        return reverse('read_single_location', args=[item['id']])
+    return None
 
-        if key in seen_pairs:
-            # 已经出现过反向关系 → 当前这条是重复的，丢弃
-            removed.append(rel_id)
+@conditional_on('character_relationship', 'character', 'relationship_type')
+def read_relationship_path(request):
+    """
+    两个角色之间的最短关系链（JSON）：/read/read_path?from=孙悟空&to=红孩儿
+    from / to 可以是角色 id 或角色名。返回沿途每一跳的人物与关系类型。
+    """
+    ids = []
+    for param in ('from', 'to'):
+        value = request.GET.get(param, '').strip()
+        if value.isdigit():
+            ids.append(int(value))
             continue
-        else:
-            # 第一次遇到这个无向对，直接保留
-            seen_pairs.add(key)
-            cleaned.append(item)
+        character_id = Character.objects.filter(name=value).values_list('id', flat=True).first() if value else None
+        if character_id is None:
+            return JsonResponse({'error': f'未找到角色：{value}'}, status=404, json_dumps_params={'ensure_ascii': False})
+        ids.append(character_id)
 
-    print(f"检测到 {len(removed)} 条对称重复关系，已自动移除（保留 id 较小的那条）")
-    print("被移除的关系 ID：", removed)
+    path = Query.relationship_path(*ids)
+    return JsonResponse({
+        'from': ids[0],
+        'to': ids[1],
+        'found': path is not None,
+        'length': len(path) if path is not None else None,
+        'path': path or [],
+        'types': [step['type'] for step in path or []],
+    }, json_dumps_params={'ensure_ascii': False})
 
-    return cleaned
+def get_query_cache_stats(request):
+    """
+    返回 Query 结果缓存的命中 / 未命中计数（JSON），用于确认读页面稳定后不再访问 MySQL。
+    """
+    return JsonResponse(Query.cache_stats())
 
 
+def get_fragment_cache_stats(request):
+    """
+    返回模板片段缓存的条目数、占用字符数及各片段的命中 / 未命中计数（JSON）。
+    """
+    return JsonResponse(fragment_cache.stats())
+
 
+def get_job_stats(request):
+    """
+    返回后台任务队列的深度（JSON）：各状态任务数、各类型待执行数、最早的待执行任务已等待的秒数。
+    """
+    return JsonResponse(jobs.stats())
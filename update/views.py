@@ -1,4 +1,4 @@
-from create.models import Location, Character, Weapon
+from create.models import Character
 import base64  # 用于base64编码
 from django.shortcuts import render, redirect  # Django渲染模板
 from django.contrib import messages  # 用于添加消息提示
@@ -11,9 +11,7 @@ def get_page_update_main(request):
     return render(request,"update_mainpage.html")
 
 def get_page_update_character(request):
-    characters = list(Character.objects.values_list('name', flat=True).distinct())
-    context = {'characters': characters}
-    return render(request,"update_character.html",context)
+    return render(request,"update_character.html")
 
 def update_character_img(request):
     # 初始化变量
@@ -46,13 +44,11 @@ def update_character_img(request):
                 # 其他异常处理
                 messages.error(request, f'更新失败：{str(e)}')
                 print(f"后台错误: {str(e)}")
-    # 为后台提供角色选择选项(数据库中select所有角色名)
-    characters = list(Character.objects.values_list('name', flat=True).distinct())
+    # 角色名由表单边输入边请求 read/autocomplete 补全，不再整表查询所有角色名
     # 如果是GET请求或无character，character_name为None
     # 构建上下文字典
     context = {
         'character': character_name,
-        'characters': characters,
     }
     # 渲染模板并返回响应（模板需包含messages显示）
     return render(request, "update_character_img.html", context)
@@ -77,32 +73,19 @@ def update_character_introduction(request):
                 # 其他异常处理
                 messages.error(request, f'更新失败：{str(e)}')
                 print(f"后台错误: {str(e)}")
-    # 为后台提供角色选择选项(数据库中select所有角色名)
-    characters = list(Character.objects.values_list('name', flat=True).distinct())
-    # 构建上下文字典
-    context = {
-        'characters': characters,
-    }
+    # 角色名由表单边输入边请求 read/autocomplete 补全，不再整表查询所有角色名
     # 渲染模板并返回响应（模板需包含messages显示）
-    return render(request, "update_character_introduction.html", context)
+    return render(request, "update_character_introduction.html")
 
 
 def get_page_update_weapon(request):
-    weapons = list(Weapon.objects.values_list('name', flat=True).distinct())
-    context = {'weapons': weapons}
-    return render(request, "update_weapon.html",context)
+    return render(request, "update_weapon.html")
 
 def update_weapon_submit(request):
-    weapons = list(Weapon.objects.values_list('name', flat=True).distinct())
-    context = {'weapons': weapons}
-    return render(request, "update_weapon.html", context)
+    return render(request, "update_weapon.html")
 
 def get_page_update_location(request):
-    locations = list(Location.objects.values_list('name', flat=True).distinct())
-    context = {'locations': locations}
-    return render(request, "update_location_info.html", context)
+    return render(request, "update_location_info.html")
 
 def update_location_submit(request):
-    locations = list(Location.objects.values_list('name', flat=True).distinct())
-    context = {'locations': locations}
-    return render(request, "update_location_info.html", context)
\ No newline at end of file
+    return render(request, "update_location_info.html")
\ No newline at end of file